@@ -7,12 +7,16 @@ from pathlib import Path
 from typing import Iterable
 
 from . import compat
+from . import tokenizer as _tokenizer
 from .errors import (
     SpecialTokenCollisionError,
     TokenLimitError,
     TokenizerError,
     UnsupportedModelError,
 )
+from .prefix import PreparedPrefix
+from .results import TokenizationResult, TokenWindow
+from .streaming import EncoderUpdate, IncrementalDecoder, IncrementalEncoder
 from .tokenizer import Encoding, build_encoding_from_model, build_encoding_from_name
 
 def _local_version() -> str:
@@ -47,6 +51,12 @@ __all__ = [
     "UnsupportedModelError",
     "SpecialTokenCollisionError",
     "TokenLimitError",
+    "TokenizationResult",
+    "TokenWindow",
+    "PreparedPrefix",
+    "IncrementalEncoder",
+    "EncoderUpdate",
+    "IncrementalDecoder",
     "__version__",
 ]
 
@@ -56,11 +66,11 @@ def list_supported_models() -> list[str]:
 
 
 def encoding_for_model(model_name: str) -> Encoding:
-    return build_encoding_from_model(model_name)
+    return _tokenizer.encoding_for_model(model_name)
 
 
 def get_encoding(encoding_name: str) -> Encoding:
-    return build_encoding_from_name(encoding_name)
+    return _tokenizer.get_encoding(encoding_name)
 
 
 def list_encoding_names() -> list[str]:
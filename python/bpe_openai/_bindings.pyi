@@ -1,14 +1,48 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+
+class DisallowedSpecialTokenError(ValueError): ...
+
+class SpecialMatcher:
+    def find_disallowed(self, text: str) -> Optional[str]: ...
+    def split(self, text: str) -> List[Tuple[str, Optional[str]]]: ...
 
 class PyTokenizer:
     def encode(self, text: str) -> List[int]: ...
-    def decode(self, tokens: List[int]) -> str: ...
+    def encode_till_limit(self, text: str, token_limit: int) -> Optional[List[int]]: ...
+    def encode_batch(
+        self, texts: List[str], token_limit: Optional[int] = None
+    ) -> List[Optional[List[int]]]: ...
+    def encode_to_bytes(self, text: str, token_limit: Optional[int] = None) -> Optional[bytes]: ...
+    def encode_batch_to_bytes(
+        self, texts: List[str], token_limit: Optional[int] = None
+    ) -> Optional[Tuple[bytes, bytes]]: ...
+    def with_special_tokens(self, special_tokens: Dict[str, int]) -> PyTokenizer: ...
+    def with_piece_cache(self, capacity: int) -> PyTokenizer: ...
+    def piece_cache_stats(self) -> Optional[Dict[str, int]]: ...
+    def special_matcher(self, allowed: List[str], disallowed: List[str]) -> SpecialMatcher: ...
+    def encode_with_special(
+        self, text: str, matcher: SpecialMatcher, token_limit: Optional[int] = None
+    ) -> Optional[List[int]]: ...
+    def count_with_special(
+        self, text: str, matcher: SpecialMatcher, token_limit: Optional[int] = None
+    ) -> Optional[int]: ...
+    def decode(self, tokens: Sequence[int]) -> str: ...
+    def decode_bytes(self, tokens: Sequence[int]) -> bytes: ...
+    def decode_bytes_batch(self, batch: Sequence[Sequence[int]]) -> List[bytes]: ...
+    def decode_tokens_bytes(self, tokens: Sequence[int]) -> List[bytes]: ...
+    def encode_bytes(self, data: bytes) -> List[int]: ...
     def count(self, text: str) -> int: ...
+    def count_batch(self, texts: List[str]) -> List[int]: ...
     def count_till_limit(self, text: str, token_limit: int) -> Optional[int]: ...
+    def normalize(self, text: str) -> Optional[str]: ...
+    def encode_head(self, text: str, max_tokens: int) -> Tuple[List[int], int, bool]: ...
+    def encode_tail(self, text: str, max_tokens: int) -> Tuple[List[int], int, bool]: ...
+    def encode_pieces(self, text: str) -> List[Tuple[int, List[int]]]: ...
     def pretokenize(self, text: str) -> List[str]: ...
 
 def tokenizer_for_model(model_name: str) -> PyTokenizer: ...
 def tokenizer_for_encoding(encoding_name: str) -> PyTokenizer: ...
+def load_legacy_encoding(encoding_name: str, tokens: List[bytes]) -> PyTokenizer: ...
 def supported_models() -> List[str]: ...
 def supported_encodings() -> List[str]: ...
 
@@ -0,0 +1,27 @@
+"""Small helpers shared by the modules that read and write token files."""
+
+from __future__ import annotations
+
+import sys
+from array import array
+
+
+def require_numpy():
+    """Return the ``numpy`` module, imported on first use.
+
+    numpy is an optional dependency, so only the functions that return or
+    write arrays import it.
+    """
+    import numpy
+
+    return numpy
+
+
+def to_little_endian(values: array) -> array:
+    """Byteswap ``values`` in place on big-endian hosts and return it.
+
+    Token, offset and vocabulary files are always little-endian.
+    """
+    if sys.byteorder != "little":  # pragma: no cover - big-endian hosts
+        values.byteswap()
+    return values
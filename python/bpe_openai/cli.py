@@ -0,0 +1,394 @@
+"""``bpe-openai`` command-line tool for bulk encoding, counting and decoding.
+
+Inputs are files, directories (searched recursively) or ``-`` for stdin, and
+are read in blocks whose tokens are written as soon as they are stable, so
+memory stays bounded regardless of file size (``--format npy`` is the
+exception: its header records the length, so tokens are kept until the end).
+Only the selected vocabulary is loaded. Special tokens are treated as
+ordinary text.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import queue
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from ._util import require_numpy, to_little_endian
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_BLOCK_CHARS = 1 << 20
+_LINE_BATCH = 1_024
+# Token batches buffered per file while encoding files ahead with --jobs.
+_STREAM_DEPTH = 2
+_STDIN = "-"
+_END = object()
+
+
+def _resolve_encoding(args: argparse.Namespace):
+    from . import compat, get_encoding
+
+    name = args.encoding or "cl100k_base"
+    if args.model:
+        name = compat.get_metadata(args.model).encoding
+    return get_encoding(name)
+
+
+def _iter_paths(paths: Sequence[str]) -> Iterator[str]:
+    for path in paths or [_STDIN]:
+        if path != _STDIN and os.path.isdir(path):
+            for child in sorted(Path(path).rglob("*")):
+                if child.is_file():
+                    yield os.fspath(child)
+        else:
+            yield path
+
+
+def _open_text(path: str) -> IO[str]:
+    if path == _STDIN:
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def _read_blocks(handle: IO[str]) -> Iterator[str]:
+    while True:
+        block = handle.read(_BLOCK_CHARS)
+        if not block:
+            return
+        yield block
+
+
+def _encode_stream(encoding, blocks: Iterable[str]) -> Iterator[List[int]]:
+    """Yield tokens of the concatenated ``blocks`` as soon as they are stable."""
+    encoder = encoding.incremental_encoder()
+    for block in blocks:
+        committed = encoder.append(block).committed
+        if committed:
+            yield committed
+    tail = encoder.flush()
+    if tail:
+        yield tail
+
+
+def _count_file(encoding, path: str) -> int:
+    with _open_text(path) as handle:
+        return sum(len(tokens) for tokens in _encode_stream(encoding, _read_blocks(handle)))
+
+
+def _encode_file(encoding, path: str) -> Iterator[List[int]]:
+    with _open_text(path) as handle:
+        yield from _encode_stream(encoding, _read_blocks(handle))
+
+
+def _line_batches(paths: Iterable[str]) -> Iterator[Tuple[str, int, List[str]]]:
+    """Yield ``(path, first_line_number, lines)`` batches without newlines."""
+    for path in paths:
+        with _open_text(path) as handle:
+            batch: List[str] = []
+            first = 1
+            for number, line in enumerate(handle, start=1):
+                batch.append(line.rstrip("\r\n"))
+                if len(batch) >= _LINE_BATCH:
+                    yield path, first, batch
+                    batch = []
+                    first = number + 1
+            if batch:
+                yield path, first, batch
+
+
+def _map_files(func: Callable[[str], R], paths: List[str], jobs: int) -> Iterator[R]:
+    """Yield ``func(path)`` for each path in order, up to ``jobs`` at a time.
+
+    The pool is local to the command so ``--jobs`` never resizes the shared
+    worker pool used by Encoding batch calls.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        yield from map(func, paths)
+        return
+    pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="bpe-openai-cli")
+    try:
+        yield from pool.map(func, paths)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _stream_files(
+    func: Callable[[str], Iterable[T]], paths: List[str], jobs: int
+) -> Iterator[Iterator[T]]:
+    """Like ``_map_files`` for ``func`` returning a stream of items per path.
+
+    Each path's stream must be consumed before the next one is requested.
+    Files ahead of the current one are produced on worker threads into
+    queues of ``_STREAM_DEPTH`` items, so memory stays bounded by ``jobs``.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield iter(func(path))
+        return
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=_STREAM_DEPTH) for _ in paths]
+
+    def produce(path: str, out: queue.Queue) -> None:
+        try:
+            for item in func(path):
+                if not _put(out, item, stop):
+                    return
+            _put(out, _END, stop)
+        except BaseException as exc:  # re-raised on the consuming thread
+            _put(out, exc, stop)
+
+    # Paths are submitted in order and the pool runs them first in, first out,
+    # so the stream being consumed always has a worker.
+    pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="bpe-openai-cli")
+    try:
+        for path, out in zip(paths, queues):
+            pool.submit(produce, path, out)
+        for out in queues:
+            yield _drain(out)
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _put(out: queue.Queue, item: object, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(out: queue.Queue) -> Iterator:
+    while True:
+        item = out.get()
+        if item is _END:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+class _TokenSink:
+    """Writes encoded documents in the requested ``--format``."""
+
+    def __init__(self, fmt: str, output: Optional[str], offsets: Optional[str]) -> None:
+        self._format = fmt
+        self._offsets_path = offsets
+        self._offsets = array("Q", [0])
+        self._tokens = array("I")
+        if fmt == "npy" and output is None and sys.stdout.isatty():
+            raise SystemExit("refusing to write .npy data to a terminal; use -o")
+        self._stream = open(output, "wb") if output else sys.stdout.buffer
+
+    def write(self, tokens: Sequence[int], **fields: object) -> None:
+        self.write_batches([tokens], **fields)
+
+    def write_batches(self, batches: Iterable[Sequence[int]], **fields: object) -> None:
+        """Write one document whose tokens arrive in ``batches``, as they arrive."""
+        if self._format == "jsonl":
+            # Same bytes as json.dumps of the whole record, written piecewise.
+            head = json.dumps(dict(fields, tokens=[]))
+            self._stream.write(head[:-2].encode("utf-8"))
+            separator = ""
+            for tokens in batches:
+                if len(tokens):
+                    text = ", ".join(map(str, tokens))
+                    self._stream.write(f"{separator}{text}".encode("utf-8"))
+                    separator = ", "
+            self._stream.write(b"]}\n")
+            return
+        count = 0
+        for tokens in batches:
+            values = array("I", tokens)
+            count += len(values)
+            if self._format == "npy":
+                # The .npy header records the length, so tokens are kept until close.
+                self._tokens.extend(values)
+                continue
+            self._stream.write(to_little_endian(values).tobytes())
+        self._offsets.append(self._offsets[-1] + count)
+
+    def close(self) -> None:
+        if self._format == "npy":
+            np = require_numpy()
+            np.save(self._stream, np.frombuffer(self._tokens, dtype=np.uint32).astype("<u4"))
+        if self._offsets_path and self._format != "jsonl":
+            if self._format == "npy":
+                np = require_numpy()
+                offsets = np.frombuffer(self._offsets, dtype=np.uint64)
+                np.save(self._offsets_path, offsets.astype("<u8"))
+            else:
+                Path(self._offsets_path).write_bytes(to_little_endian(self._offsets).tobytes())
+        self._stream.flush()
+        if self._stream is not sys.stdout.buffer:
+            self._stream.close()
+
+
+def _cmd_encode(args: argparse.Namespace) -> int:
+    encoding = _resolve_encoding(args)
+    sink = _TokenSink(args.format, args.output, args.offsets)
+    try:
+        if args.lines:
+            from .pipeline import encode_documents
+
+            for path, first, lines in _line_batches(_iter_paths(args.paths)):
+                batch = encode_documents(encoding, lines, num_threads=args.jobs)
+                for number, tokens in enumerate(batch, start=first):
+                    sink.write(tokens, path=path, line=number)
+        else:
+            paths = list(_iter_paths(args.paths))
+            streams = _stream_files(lambda path: _encode_file(encoding, path), paths, args.jobs)
+            for path, batches in zip(paths, streams):
+                sink.write_batches(batches, path=path)
+    finally:
+        sink.close()
+    return 0
+
+
+def _cmd_count(args: argparse.Namespace) -> int:
+    encoding = _resolve_encoding(args)
+    out = sys.stdout
+    total = 0
+
+    def emit(count: int, **fields: object) -> None:
+        if args.format == "jsonl":
+            out.write(json.dumps(dict(fields, tokens=count)) + "\n")
+        else:
+            label = fields["path"]
+            if "line" in fields:
+                label = f"{label}:{fields['line']}"
+            out.write(f"{count}\t{label}\n")
+
+    if args.lines:
+        for path, first, lines in _line_batches(_iter_paths(args.paths)):
+            # Special tokens count as ordinary text, as in whole-file mode.
+            counts = encoding.count_batch(lines, num_threads=args.jobs, disallowed_special=())
+            for number, count in enumerate(counts, start=first):
+                emit(count, path=path, line=number)
+                total += count
+    else:
+        paths = list(_iter_paths(args.paths))
+        counts = _map_files(lambda path: _count_file(encoding, path), paths, args.jobs)
+        for path, count in zip(paths, counts):
+            emit(count, path=path)
+            total += count
+    if args.format != "jsonl":
+        out.write(f"{total}\ttotal\n")
+    return 0
+
+
+def _read_token_documents(fmt: str, path: str) -> Iterator[Sequence[int]]:
+    stream = sys.stdin.buffer if path == _STDIN else open(path, "rb")
+    try:
+        if fmt == "jsonl":
+            for line in stream:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["tokens"] if isinstance(record, dict) else record
+        elif fmt == "npy":
+            np = require_numpy()
+            yield np.load(io.BytesIO(stream.read())).tolist()
+        else:
+            while True:
+                block = stream.read(4 * _BLOCK_CHARS)
+                if not block:
+                    return
+                values = array("I")
+                values.frombytes(block[: len(block) - len(block) % 4])
+                yield to_little_endian(values)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def _cmd_decode(args: argparse.Namespace) -> int:
+    encoding = _resolve_encoding(args)
+    out = sys.stdout
+    for path in args.paths or [_STDIN]:
+        if args.format == "jsonl":
+            for tokens in _read_token_documents("jsonl", path):
+                out.write(json.dumps({"text": encoding.decode(tokens)}) + "\n")
+            continue
+        # Raw token streams are one document; decode incrementally so that
+        # characters split across blocks come out intact.
+        decoder = encoding.incremental_decoder()
+        for tokens in _read_token_documents(args.format, path):
+            out.write(decoder.decode(tokens))
+        out.write(decoder.flush())
+    return 0
+
+
+def _cmd_pipeline(args: argparse.Namespace) -> int:
+    from . import pipeline
+
+    return pipeline.run(args)
+
+
+def _add_common(parser: argparse.ArgumentParser) -> None:
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--encoding", help="encoding name (default: cl100k_base)")
+    target.add_argument("--model", help="model name to resolve the encoding from")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="parallel workers (default: %(default)s)"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bpe-openai", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encode = commands.add_parser("encode", help="encode text files to tokens")
+    encode.add_argument("paths", nargs="*", help="files, directories or - for stdin")
+    _add_common(encode)
+    encode.add_argument("--lines", action="store_true", help="encode each line separately")
+    encode.add_argument("--format", choices=("jsonl", "npy", "bin"), default="jsonl")
+    encode.add_argument("-o", "--output", help="output file (default: stdout)")
+    encode.add_argument("--offsets", help="write uint64 document offsets here (npy/bin)")
+    encode.set_defaults(handler=_cmd_encode)
+
+    count = commands.add_parser("count", help="count tokens per file or line")
+    count.add_argument("paths", nargs="*", help="files, directories or - for stdin")
+    _add_common(count)
+    count.add_argument("--lines", action="store_true", help="count each line separately")
+    count.add_argument("--format", choices=("text", "jsonl"), default="text")
+    count.set_defaults(handler=_cmd_count)
+
+    decode = commands.add_parser("decode", help="decode tokens back to text")
+    decode.add_argument("paths", nargs="*", help="token files or - for stdin")
+    _add_common(decode)
+    decode.add_argument("--format", choices=("jsonl", "npy", "bin"), default="jsonl")
+    decode.set_defaults(handler=_cmd_decode)
+
+    from . import pipeline
+
+    tokenize = commands.add_parser("pipeline", help="tokenize a corpus into sharded token files")
+    pipeline.add_arguments(tokenize)
+    tokenize.set_defaults(handler=_cmd_pipeline)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.jobs is not None and args.jobs <= 0:
+        raise SystemExit("--jobs must be positive")
+    try:
+        return args.handler(args)
+    except BrokenPipeError:  # pragma: no cover - e.g. piping into `head`
+        sys.stderr.close()
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
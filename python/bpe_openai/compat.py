@@ -20,7 +20,7 @@ def _metadata(
 ) -> ModelMetadata:
     tokens = special_tokens
     if tokens is None:
-        tokens = registry.ENCODING_CONSTRUCTORS[encoding]()["special_tokens"]
+        tokens = registry.SPECIAL_TOKENS[encoding]
     return ModelMetadata(
         encoding=encoding,
         chunk_limit=chunk_limit,
@@ -1,11 +1,32 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Callable, Mapping, MutableMapping, Optional, Set
+from typing import Callable, List, Mapping, MutableMapping, Optional, Sequence, Set, TypeVar
 
-from . import compat, errors
+from . import compat, errors, executor
+from .cache import ResultCache
+from .metrics import MetricsHook, MetricsRecorder
+from .stats import OperationStats
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 DEFAULT_CHUNK_LIMIT = 200_000
+# Async calls on inputs up to this many characters (tokens for decode) run
+# inline on the event loop; larger ones go to the shared worker pool.
+DEFAULT_ASYNC_INLINE_THRESHOLD = 4_096
+# Batches whose total size (characters, or tokens for decode) stays within this
+# run on the calling thread; larger ones are split across the shared pool.
+DEFAULT_BATCH_INLINE_THRESHOLD = 65_536
+# Pretokenized pieces whose tokens are cached per Encoding; 0 disables the
+# cache. Worth enabling for templated traffic where the same words recur.
+DEFAULT_PIECE_CACHE_SIZE = 0
+# Approximate bytes of memoized encode/count results kept per Encoding; 0
+# disables the cache. Entries older than the TTL (seconds) are not reused.
+DEFAULT_RESULT_CACHE_BYTES = 0
+DEFAULT_RESULT_CACHE_TTL: Optional[float] = None
+# Whether calls feed the per-operation latency and throughput stats.
+DEFAULT_COLLECT_STATS = False
 
 
 SUPPORTED_MODELS: Mapping[str, str] = {
@@ -23,10 +44,26 @@ class TokenizerConfiguration:
     allowed_special: Set[str] = field(default_factory=set)
     disallowed_special: Set[str] = field(default_factory=set)
     chunk_limit: int = DEFAULT_CHUNK_LIMIT
+    async_inline_threshold: int = DEFAULT_ASYNC_INLINE_THRESHOLD
+    batch_inline_threshold: int = DEFAULT_BATCH_INLINE_THRESHOLD
+    piece_cache_size: int = DEFAULT_PIECE_CACHE_SIZE
+    result_cache_bytes: int = DEFAULT_RESULT_CACHE_BYTES
+    result_cache_ttl: Optional[float] = DEFAULT_RESULT_CACHE_TTL
+    collect_stats: bool = DEFAULT_COLLECT_STATS
 
     def validate(self) -> None:
         if self.chunk_limit <= 0:
             raise ValueError("chunk_limit must be positive")
+        if self.async_inline_threshold < 0:
+            raise ValueError("async_inline_threshold must be non-negative")
+        if self.batch_inline_threshold < 0:
+            raise ValueError("batch_inline_threshold must be non-negative")
+        if self.piece_cache_size < 0:
+            raise ValueError("piece_cache_size must be non-negative")
+        if self.result_cache_bytes < 0:
+            raise ValueError("result_cache_bytes must be non-negative")
+        if self.result_cache_ttl is not None and self.result_cache_ttl <= 0:
+            raise ValueError("result_cache_ttl must be positive")
 
         collisions = set(self.allowed_special) & set(self.disallowed_special)
         if collisions:
@@ -71,19 +108,99 @@ class TokenizerRuntime:
 
     def __init__(self, config: TokenizerConfiguration) -> None:
         self.config = config
-        self._metrics_hook: Optional[Callable[[dict[str, object]], None]] = None
-
-    def set_metrics_hook(self, callback: Optional[Callable[[dict[str, object]], None]]) -> None:
-        self._metrics_hook = callback
+        self._metrics: Optional[MetricsRecorder] = None
+        self._result_cache: Optional[ResultCache] = None
+        if config.result_cache_bytes:
+            self._result_cache = ResultCache(config.result_cache_bytes, config.result_cache_ttl)
+        self._stats: Optional[OperationStats] = OperationStats() if config.collect_stats else None
+
+    def set_metrics_hook(self, callback: Optional[MetricsHook]) -> None:
+        recorder = None
+        if callback is not None:
+            recorder = MetricsRecorder(callback, model=self.config.model_name)
+        self.set_metrics_recorder(recorder)
+
+    def set_metrics_recorder(self, recorder: Optional[MetricsRecorder]) -> None:
+        """Install ``recorder``; calls aggregated by the previous one are flushed."""
+        previous, self._metrics = self._metrics, recorder
+        if previous is not None:
+            previous.flush()
 
-    def emit_metrics(self, payload: dict[str, object]) -> None:
-        if self._metrics_hook:
-            self._metrics_hook(payload)
+    @property
+    def metrics(self) -> Optional[MetricsRecorder]:
+        return self._metrics
 
     @property
     def chunk_limit(self) -> int:
         return self.config.chunk_limit
 
+    @property
+    def async_inline_threshold(self) -> int:
+        return self.config.async_inline_threshold
+
+    def set_async_inline_threshold(self, threshold: int) -> None:
+        if threshold < 0:
+            raise ValueError("async_inline_threshold must be non-negative")
+        self.config.async_inline_threshold = threshold
+
+    @property
+    def batch_inline_threshold(self) -> int:
+        return self.config.batch_inline_threshold
+
+    def set_batch_inline_threshold(self, threshold: int) -> None:
+        if threshold < 0:
+            raise ValueError("batch_inline_threshold must be non-negative")
+        self.config.batch_inline_threshold = threshold
+
+    @property
+    def piece_cache_size(self) -> int:
+        return self.config.piece_cache_size
+
+    def set_piece_cache_size(self, size: int) -> None:
+        if size < 0:
+            raise ValueError("piece_cache_size must be non-negative")
+        self.config.piece_cache_size = size
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self._result_cache
+
+    def set_result_cache(self, max_bytes: int, ttl: Optional[float] = None) -> None:
+        """Replace the result cache with an empty one; ``max_bytes=0`` disables it."""
+        if max_bytes < 0:
+            raise ValueError("result_cache_bytes must be non-negative")
+        cache = ResultCache(max_bytes, ttl) if max_bytes else None
+        self.config.result_cache_bytes = max_bytes
+        self.config.result_cache_ttl = ttl
+        self._result_cache = cache
+
+    @property
+    def stats(self) -> Optional[OperationStats]:
+        return self._stats
+
+    def set_collect_stats(self, enabled: bool) -> None:
+        """Start collecting into fresh stats, or stop and drop them."""
+        self.config.collect_stats = enabled
+        self._stats = OperationStats() if enabled else None
+
+    def configure_backend(self, backend):
+        """Return ``backend`` with this runtime's piece cache attached.
+
+        The cache lives in the backend so lookups happen with the GIL
+        released; a new cache replaces (and drops) the previous one.
+        """
+        return backend.with_piece_cache(self.piece_cache_size)
+
+    def map_batch(
+        self,
+        func: Callable[[Sequence[T]], List[R]],
+        items: Sequence[T],
+        num_threads: int,
+        weights: Sequence[int],
+    ) -> List[R]:
+        """Run ``func(slice)`` over up to ``num_threads`` slices of ``items`` on the shared pool."""
+        return executor.map_slices(func, items, num_threads, weights, self.batch_inline_threshold)
+
     def register_special_tokens(self, mapping: Mapping[str, int]) -> None:
         raise NotImplementedError(
             "Custom special tokens are not supported; the underlying tokenizer is fixed."
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, Sequence
+from typing import Iterable, NoReturn, Sequence
 
 
 class TokenizerError(RuntimeError):
@@ -39,10 +39,13 @@ class SpecialTokenCollisionError(TokenizerError):
 class TokenLimitError(ValueError, TokenizerError):
     token_count: int
     chunk_limit: int
+    # ``False`` when encoding stopped early and ``token_count`` is a lower bound.
+    exact: bool = True
 
     def __post_init__(self) -> None:
+        count = self.token_count if self.exact else f"at least {self.token_count}"
         super().__init__(
-            f"Input produces {self.token_count} tokens which exceeds chunk limit {self.chunk_limit}"
+            f"Input produces {count} tokens which exceeds chunk limit {self.chunk_limit}"
         )
 
 
@@ -50,5 +53,5 @@ def raise_unsupported_model(model_name: str, supported: Iterable[str]) -> None:
     raise UnsupportedModelError(model_name=model_name, supported_models=tuple(sorted(supported)))
 
 
-def raise_token_limit(token_count: int, chunk_limit: int) -> None:
-    raise TokenLimitError(token_count=token_count, chunk_limit=chunk_limit)
+def raise_token_limit(token_count: int, chunk_limit: int, *, exact: bool = True) -> NoReturn:
+    raise TokenLimitError(token_count=token_count, chunk_limit=chunk_limit, exact=exact)
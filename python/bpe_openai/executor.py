@@ -0,0 +1,126 @@
+"""Process-wide worker pool for offloading tokenizer calls.
+
+The pool is created lazily, shared by every Encoding and rebuilt after
+``fork()`` because worker threads do not survive into the child process.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_MAX_WORKERS: Optional[int] = None
+_LOCK = threading.Lock()
+_WORKER = threading.local()
+
+
+def default_workers() -> int:
+    return min(32, os.cpu_count() or 1)
+
+
+def max_workers() -> int:
+    return _MAX_WORKERS or default_workers()
+
+
+def set_max_workers(workers: Optional[int]) -> None:
+    """Resize the shared pool; ``None`` restores the CPU-based default.
+
+    The current pool finishes its queued work in the background and a new one
+    is created on next use.
+    """
+    global _EXECUTOR, _MAX_WORKERS
+    if workers is not None and workers <= 0:
+        raise ValueError("workers must be positive")
+    with _LOCK:
+        previous, _EXECUTOR = _EXECUTOR, None
+        _MAX_WORKERS = workers
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _mark_worker() -> None:
+    _WORKER.active = True
+
+
+def in_worker() -> bool:
+    return getattr(_WORKER, "active", False)
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Return the bounded pool shared by every Encoding.
+
+    The backend releases the GIL while it tokenizes, so the workers run in
+    parallel without contending with the event loop thread.
+    """
+    global _EXECUTOR
+    executor = _EXECUTOR
+    if executor is not None:
+        return executor
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max_workers(),
+                thread_name_prefix="bpe-openai",
+                initializer=_mark_worker,
+            )
+        return _EXECUTOR
+
+
+def map_slices(
+    func: Callable[[Sequence[T]], List[R]],
+    items: Sequence[T],
+    num_threads: int,
+    weights: Sequence[int],
+    inline_threshold: int,
+) -> List[R]:
+    """Apply ``func`` to contiguous slices of ``items`` and join the results.
+
+    Batches whose total ``weights`` stay within ``inline_threshold`` run inline
+    on the calling thread. Larger ones are cut into up to ``num_threads``
+    slices of similar weight that run on the shared pool; this is the only
+    place batches are parallelised, the backend runs each slice on one
+    thread. Calls made from a pool worker (for example an offloaded async
+    call) run inline so that workers never block waiting on each other.
+    """
+    total = sum(weights)
+    workers = min(num_threads, max_workers(), len(items))
+    if workers <= 1 or total <= inline_threshold or in_worker():
+        return func(items)
+
+    pool = shared_executor()
+    futures = [pool.submit(func, items[start:stop]) for start, stop in _slices(weights, workers)]
+    results: List[R] = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def _slices(weights: Sequence[int], workers: int) -> List[tuple[int, int]]:
+    total = sum(weights)
+    bounds: List[tuple[int, int]] = []
+    start = 0
+    running = 0
+    for index, weight in enumerate(weights):
+        running += weight
+        if running * workers >= total * (len(bounds) + 1) and len(bounds) < workers - 1:
+            bounds.append((start, index + 1))
+            start = index + 1
+    if start < len(weights):
+        bounds.append((start, len(weights)))
+    return bounds
+
+
+def _reset_after_fork() -> None:
+    global _EXECUTOR, _LOCK
+    _EXECUTOR = None
+    _LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,35 +1,173 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import atexit
+import functools
+import random
+import threading
+import time
+import weakref
+from bisect import bisect_left
 from importlib import import_module
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional
 
+MetricsHook = Callable[[Dict[str, object]], None]
 
-@dataclass(frozen=True)
-class MetricsPayload:
-    model: str
-    total_tokens: int
-    elapsed_ms: float
-    rust_backend_version: str = "unknown"
+# Upper bounds (ms) of the latency buckets in aggregated payloads; the last
+# bucket is unbounded.
+LATENCY_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1_000)
 
-    def to_dict(self) -> Dict[str, object]:
-        return {
+
+@functools.lru_cache(maxsize=None)
+def _bindings_version() -> str:
+    try:
+        bindings = import_module("bpe_openai._bindings")
+    except ModuleNotFoundError:  # pragma: no cover - best effort
+        return "unknown"
+    return getattr(bindings, "RUST_BACKEND_VERSION", "unknown")
+
+
+# Aggregating recorders, flushed at interpreter exit so the last window is not lost.
+_AGGREGATING: "weakref.WeakSet[MetricsRecorder]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    for recorder in list(_AGGREGATING):
+        recorder.flush()
+
+
+class MetricsRecorder:
+    """Feeds per-call observations to a metrics hook.
+
+    Only a ``sample_rate`` fraction of calls is observed; callers check
+    ``sample()`` before starting a timer so unsampled calls cost one random
+    draw. Without ``flush_interval`` every sampled call is passed to the hook
+    straight away. With it, calls are aggregated in process (call and token
+    totals, latency histogram) and the hook receives one payload per interval.
+    It is sent by the first call after the interval ends or, when no call
+    comes, by a timer thread at the end of the interval; ``flush()`` sends it
+    early, and pending calls are flushed at interpreter exit. The hook may
+    therefore run on the timer thread.
+    """
+
+    def __init__(
+        self,
+        hook: MetricsHook,
+        *,
+        model: str,
+        backend_version: str = "unknown",
+        sample_rate: float = 1.0,
+        flush_interval: Optional[float] = None,
+        snapshot: Optional[Callable[[], Dict[str, object]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if flush_interval is not None and flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        self.hook = hook
+        self.model = model
+        self.backend_version = (
+            backend_version if backend_version != "unknown" else _bindings_version()
+        )
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self._snapshot = snapshot
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._window = 0
+        self._reset(clock())
+        if flush_interval is not None:
+            _AGGREGATING.add(self)
+
+    def sample(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, total_tokens: int, elapsed_ms: float) -> None:
+        if self.flush_interval is None:
+            data: Dict[str, object] = {
+                "model": self.model,
+                "total_tokens": total_tokens,
+                "elapsed_ms": elapsed_ms,
+                "rust_backend_version": self.backend_version,
+            }
+            if self._snapshot is not None:
+                data.update(self._snapshot())
+            self.hook(data)
+            return
+
+        bucket = bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+        now = self._clock()
+        with self._lock:
+            self._calls += 1
+            self._tokens += total_tokens
+            self._elapsed_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+            self._buckets[bucket] += 1
+            due = now - self._started >= self.flush_interval
+            payload = self._drain(now) if due else None
+            if payload is None and self._timer is None:
+                self._schedule(self._started + self.flush_interval - now)
+        if payload is not None:
+            self._send(payload)
+
+    def flush(self) -> None:
+        """Send the calls aggregated so far, if any."""
+        if self.flush_interval is None:
+            return
+        with self._lock:
+            payload = self._drain(self._clock()) if self._calls else None
+        if payload is not None:
+            self._send(payload)
+
+    def _schedule(self, delay: float) -> None:
+        # One timer per window, started by its first call, so an idle
+        # recorder keeps no thread alive.
+        timer = threading.Timer(max(delay, 0.0), self._flush_window, args=(self._window,))
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _flush_window(self, window: int) -> None:
+        with self._lock:
+            if self._window != window:
+                return  # already sent by a later call or flush()
+            self._timer = None
+            payload = self._drain(self._clock()) if self._calls else None
+        if payload is not None:
+            self._send(payload)
+
+    def _reset(self, now: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._window += 1
+        self._started = now
+        self._calls = 0
+        self._tokens = 0
+        self._elapsed_ms = 0.0
+        self._max_ms = 0.0
+        self._buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def _drain(self, now: float) -> Dict[str, object]:
+        bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+        payload: Dict[str, object] = {
             "model": self.model,
-            "total_tokens": self.total_tokens,
-            "elapsed_ms": self.elapsed_ms,
-            "rust_backend_version": self.rust_backend_version,
+            "rust_backend_version": self.backend_version,
+            "interval_s": now - self._started,
+            "sample_rate": self.sample_rate,
+            "calls": self._calls,
+            "estimated_calls": round(self._calls / self.sample_rate),
+            "total_tokens": self._tokens,
+            "elapsed_ms": self._elapsed_ms,
+            "max_elapsed_ms": self._max_ms,
+            "latency_ms_buckets": dict(zip(bounds, self._buckets)),
         }
+        self._reset(now)
+        return payload
 
-
-def dispatch(hook: Optional[Callable[[Dict[str, object]], None]], payload: MetricsPayload) -> None:
-    if hook:
-        data = payload.to_dict()
-        if data["rust_backend_version"] == "unknown":
-            try:
-                bindings = import_module("bpe_openai._bindings")
-                data["rust_backend_version"] = getattr(
-                    bindings, "RUST_BACKEND_VERSION", "unknown"
-                )
-            except ModuleNotFoundError:  # pragma: no cover - best effort
-                pass
-        hook(data)
+    def _send(self, payload: Dict[str, object]) -> None:
+        if self._snapshot is not None:
+            payload.update(self._snapshot())
+        self.hook(payload)
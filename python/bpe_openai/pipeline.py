@@ -0,0 +1,447 @@
+"""Tokenize large text corpora into memory-mapped token files.
+
+Input files are cut into byte-range shards aligned to line boundaries and the
+shards are tokenized by a pool of worker processes. Each shard produces::
+
+    <name>.bin   uint32 tokens of every document, concatenated
+    <name>.idx   uint64 offsets; document ``i`` is ``tokens[idx[i]:idx[i + 1]]``
+    <name>.done  JSON statistics, written last
+
+A shard with a ``.done`` file recording the same source range, encoding and
+field is skipped when the run is repeated, so an interrupted run resumes where
+it stopped; any other shard is tokenized again. ``manifest.json`` lists every shard
+in input order once all of them are finished.
+
+Run ``python -m bpe_openai.pipeline --help`` for the command-line interface.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+from . import compat, errors, registry
+from ._util import require_numpy, to_little_endian
+
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 1_024
+
+_TOKEN_SUFFIX = ".bin"
+_INDEX_SUFFIX = ".idx"
+_DONE_SUFFIX = ".done"
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Lines of ``path`` that start within ``[start, end)``."""
+
+    path: str
+    start: int
+    end: int
+    name: str
+
+
+@dataclass(frozen=True)
+class ShardStats:
+    name: str
+    documents: int
+    tokens: int
+    bytes_read: int
+    skipped: bool = False
+
+
+@dataclass(frozen=True)
+class PipelineReport:
+    shards: int
+    shards_skipped: int
+    documents: int
+    tokens: int
+    bytes_read: int
+    elapsed_s: float
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_read / 1e6 / self.elapsed_s if self.elapsed_s else 0.0
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "shards": self.shards,
+            "shards_skipped": self.shards_skipped,
+            "documents": self.documents,
+            "tokens": self.tokens,
+            "bytes_read": self.bytes_read,
+            "elapsed_s": self.elapsed_s,
+            "tokens_per_second": self.tokens_per_second,
+            "megabytes_per_second": self.megabytes_per_second,
+        }
+
+
+class MmapWriter:
+    """Append-only writer that grows a memory-mapped file geometrically."""
+
+    def __init__(self, path: Path, initial_bytes: int = 1 << 20) -> None:
+        self._handle = open(path, "w+b")
+        self._capacity = max(initial_bytes, mmap.PAGESIZE)
+        self._handle.truncate(self._capacity)
+        self._map = mmap.mmap(self._handle.fileno(), self._capacity)
+        self._size = 0
+
+    def write(self, data: Union[bytes, memoryview]) -> None:
+        end = self._size + len(data)
+        if end > self._capacity:
+            self._grow(end)
+        self._map[self._size : end] = data
+        self._size = end
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._map.close()
+        self._handle.truncate(capacity)
+        self._map = mmap.mmap(self._handle.fileno(), capacity)
+        self._capacity = capacity
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        self._handle.truncate(self._size)
+        self._handle.close()
+
+    def __enter__(self) -> "MmapWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def plan_shards(inputs: Sequence[PathLike], shard_bytes: int = DEFAULT_SHARD_BYTES) -> List[Shard]:
+    """Split ``inputs`` into byte ranges of roughly ``shard_bytes`` each."""
+    if shard_bytes <= 0:
+        raise ValueError("shard_bytes must be positive")
+    shards: List[Shard] = []
+    for file_index, path in enumerate(inputs):
+        size = os.path.getsize(path)
+        for shard_index, start in enumerate(range(0, max(size, 1), shard_bytes)):
+            shards.append(
+                Shard(
+                    path=os.fspath(path),
+                    start=start,
+                    end=min(start + shard_bytes, size),
+                    name=f"{file_index:05d}-{shard_index:06d}",
+                )
+            )
+    return shards
+
+
+def _read_lines(shard: Shard) -> Iterator[bytes]:
+    with open(shard.path, "rb") as handle:
+        position = shard.start
+        if position > 0:
+            # The line that straddles ``start`` belongs to the previous shard.
+            handle.seek(position - 1)
+            position += len(handle.readline()) - 1
+        while position < shard.end:
+            line = handle.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def _documents(shard: Shard, field: Optional[str]) -> Iterator[tuple[str, int]]:
+    for line in _read_lines(shard):
+        if field is None:
+            yield line.rstrip(b"\r\n").decode("utf-8", "replace"), len(line)
+            continue
+        if not line.strip():
+            continue
+        yield json.loads(line)[field], len(line)
+
+
+_ENCODING = None
+
+
+def _init_worker(encoding_name: str) -> None:
+    global _ENCODING
+    from . import get_encoding
+
+    _ENCODING = get_encoding(encoding_name)
+
+
+def encode_documents(encoding, documents: List[str], num_threads: int = 1) -> List[List[int]]:
+    """``encode_ordinary_batch`` that also accepts documents beyond the chunk limit."""
+    try:
+        return encoding.encode_ordinary_batch(documents, num_threads=num_threads)
+    except ValueError:
+        # A document exceeds the chunk limit or the length guard; encode the
+        # oversized ones in windows, which yields the same tokens.
+        return [_encode_document(encoding, document) for document in documents]
+
+
+def _encode_document(encoding, document: str) -> List[int]:
+    try:
+        return encoding.encode_ordinary(document)
+    except ValueError:
+        limit = encoding._runtime.chunk_limit
+        return [token for window in encoding.chunk(document, limit) for token in window.token_ids]
+
+
+def _output_paths(output_dir: Path, name: str) -> tuple[Path, Path, Path]:
+    return (
+        output_dir / f"{name}{_TOKEN_SUFFIX}",
+        output_dir / f"{name}{_INDEX_SUFFIX}",
+        output_dir / f"{name}{_DONE_SUFFIX}",
+    )
+
+
+def _process_shard(task: tuple[Shard, str, Optional[str], int]) -> ShardStats:
+    shard, output_dir, field, batch_size = task
+    tokens_path, index_path, done_path = _output_paths(Path(output_dir), shard.name)
+    partial_tokens = tokens_path.with_name(tokens_path.name + ".partial")
+    partial_index = index_path.with_name(index_path.name + ".partial")
+
+    documents = 0
+    total_tokens = 0
+    bytes_read = 0
+    offsets = array("Q", [0])
+    with MmapWriter(partial_tokens) as writer:
+        batch: List[str] = []
+
+        def flush() -> None:
+            nonlocal total_tokens
+            for tokens in encode_documents(_ENCODING, batch):
+                values = to_little_endian(array("I", tokens))
+                writer.write(memoryview(values).cast("B"))
+                total_tokens += len(tokens)
+                offsets.append(total_tokens)
+            batch.clear()
+
+        for text, size in _documents(shard, field):
+            batch.append(text)
+            documents += 1
+            bytes_read += size
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    partial_index.write_bytes(to_little_endian(offsets).tobytes())
+    os.replace(partial_tokens, tokens_path)
+    os.replace(partial_index, index_path)
+    stats = ShardStats(shard.name, documents, total_tokens, bytes_read)
+    # Written last and replaced atomically: a marker is either complete or absent.
+    partial_done = done_path.with_name(done_path.name + ".partial")
+    partial_done.write_text(
+        json.dumps(
+            {
+                "source": shard.path,
+                "start": shard.start,
+                "end": shard.end,
+                "encoding": _ENCODING.name,
+                "field": field,
+                "documents": documents,
+                "tokens": total_tokens,
+                "bytes_read": bytes_read,
+            }
+        ),
+        encoding="utf-8",
+    )
+    os.replace(partial_done, done_path)
+    return stats
+
+
+def _load_done(
+    done_path: Path, shard: Shard, encoding: str, field: Optional[str]
+) -> Optional[ShardStats]:
+    """Return the recorded stats if ``done_path`` describes this exact shard.
+
+    A marker that cannot be read or lacks a field counts as not done.
+    """
+    try:
+        data = json.loads(done_path.read_text(encoding="utf-8"))
+        recorded = [data["documents"], data["tokens"], data["bytes_read"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not all(isinstance(value, int) for value in recorded):
+        return None
+    planned = {
+        "source": shard.path,
+        "start": shard.start,
+        "end": shard.end,
+        "encoding": encoding.lower(),
+        "field": field,
+    }
+    # Output from a different shard layout, input or encoding is stale.
+    if any(data.get(key) != value for key, value in planned.items()):
+        return None
+    return ShardStats(done_path.stem, *recorded, skipped=True)
+
+
+def tokenize_corpus(
+    inputs: Sequence[PathLike],
+    output_dir: PathLike,
+    *,
+    encoding: str = "cl100k_base",
+    field: Optional[str] = "text",
+    jobs: Optional[int] = None,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    resume: bool = True,
+    progress: Optional[Callable[[ShardStats], None]] = None,
+) -> PipelineReport:
+    """Tokenize ``inputs`` into ``output_dir`` and return throughput statistics.
+
+    ``field`` names the JSON key holding the text of each JSONL line; pass
+    ``None`` to treat every line of a plain-text file as one document. Workers
+    are forked after the vocabulary is loaded where the platform allows it,
+    and otherwise map the same packaged vocabulary file, so it is shared
+    rather than rebuilt per process.
+    """
+    from . import get_encoding
+
+    if encoding.lower() not in registry.ENCODING_CONSTRUCTORS:
+        errors.raise_unsupported_model(encoding, registry.ENCODING_CONSTRUCTORS)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    shards = plan_shards(inputs, shard_bytes)
+
+    start = time.perf_counter()
+    results: dict[str, ShardStats] = {}
+    pending: List[Shard] = []
+    for shard in shards:
+        done_path = _output_paths(output, shard.name)[2]
+        done = _load_done(done_path, shard, encoding, field) if resume else None
+        if done is not None:
+            results[shard.name] = done
+            if progress:
+                progress(done)
+        else:
+            pending.append(shard)
+
+    if pending:
+        get_encoding(encoding)
+        tasks = [(shard, os.fspath(output), field, batch_size) for shard in pending]
+        workers = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+        context = _mp_context()
+        with context.Pool(workers, initializer=_init_worker, initargs=(encoding,)) as pool:
+            for stats in pool.imap_unordered(_process_shard, tasks):
+                results[stats.name] = stats
+                if progress:
+                    progress(stats)
+
+    elapsed = time.perf_counter() - start
+    manifest = [
+        {"name": shard.name, "source": shard.path, "start": shard.start, "end": shard.end}
+        for shard in shards
+    ]
+    (output / "manifest.json").write_text(
+        json.dumps({"encoding": encoding, "field": field, "shards": manifest}, indent=2),
+        encoding="utf-8",
+    )
+
+    processed = [stats for stats in results.values() if not stats.skipped]
+    return PipelineReport(
+        shards=len(shards),
+        shards_skipped=len(results) - len(processed),
+        documents=sum(stats.documents for stats in processed),
+        tokens=sum(stats.tokens for stats in processed),
+        bytes_read=sum(stats.bytes_read for stats in processed),
+        elapsed_s=elapsed,
+    )
+
+
+def _mp_context():
+    # Forked workers inherit the already-loaded vocabulary.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()  # pragma: no cover - spawn-only platforms
+
+
+def load_shard(output_dir: PathLike, name: str):
+    """Return ``(tokens, offsets)`` numpy views of a finished shard."""
+    np = require_numpy()
+
+    tokens_path, index_path, _ = _output_paths(Path(output_dir), name)
+    if tokens_path.stat().st_size:
+        tokens = np.memmap(tokens_path, dtype="<u4", mode="r")
+    else:  # numpy cannot map an empty file
+        tokens = np.empty(0, dtype="<u4")
+    offsets = np.fromfile(index_path, dtype="<u8")
+    return tokens, offsets
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("inputs", nargs="+", help="JSONL or text files to tokenize")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for token shards")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--encoding", help="encoding name (default: cl100k_base)")
+    target.add_argument("--model", help="model name to resolve the encoding from")
+    parser.add_argument(
+        "--field", default="text", help="JSON field holding the text (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--raw", action="store_true", help="treat each input line as a plain-text document"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_BYTES // (1024 * 1024),
+        help="shard size in MiB (default: %(default)s)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--no-resume", action="store_true", help="re-tokenize finished shards")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress on stderr")
+
+
+def run(args: argparse.Namespace) -> int:
+    encoding = args.encoding or "cl100k_base"
+    if args.model:
+        encoding = compat.get_metadata(args.model).encoding
+
+    def report_progress(stats: ShardStats) -> None:
+        state = "skipped" if stats.skipped else f"{stats.tokens} tokens"
+        sys.stderr.write(f"shard {stats.name}: {stats.documents} documents, {state}\n")
+
+    report = tokenize_corpus(
+        args.inputs,
+        args.output_dir,
+        encoding=encoding,
+        field=None if args.raw else args.field,
+        jobs=args.jobs,
+        shard_bytes=args.shard_size * 1024 * 1024,
+        batch_size=args.batch_size,
+        resume=not args.no_resume,
+        progress=None if args.quiet else report_progress,
+    )
+    json.dump(report.to_dict(), sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bpe_openai.pipeline", description=__doc__.splitlines()[0]
+    )
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""Reusable encodings of a shared prompt prefix."""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from time import perf_counter
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # pragma: no cover - imported for annotations only
+    from .tokenizer import Encoding
+
+
+class PreparedPrefix:
+    """A prefix encoded once and reused for every ``prefix + suffix`` encode.
+
+    Created by ``Encoding.prepare_prefix``. Appending text can only change how
+    the pieces near the end of the prefix are split (see
+    ``Encoding._stable_length``), and a special token can only straddle the
+    join if it starts within the longest token's length of the end. Tokens
+    before that point are kept; the rest of the prefix is
+    re-encoded together with each suffix, so ``encode(suffix)`` equals
+    ``Encoding.encode(prefix + suffix)`` with the same special-token arguments.
+    Instances are immutable and safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        encoding: Encoding,
+        text: str,
+        allowed_special: frozenset[str],
+        disallowed_special: frozenset[str],
+    ) -> None:
+        self._encoding = encoding
+        self._allowed = allowed_special
+        self._disallowed = disallowed_special
+        encoding._check_disallowed_special(text, disallowed_special)
+
+        # Piece boundaries as parallel character and token offsets, over the
+        # text the backend sees (sanitized, and normalized between special
+        # tokens) so character offsets line up.
+        parts: list[str] = []
+        chars = [0]
+        ends = [0]
+        tokens: list[int] = []
+        sanitized = encoding._sanitize_text(text)
+        for pieces, segment, special in encoding._special_segments(sanitized, allowed_special):
+            parts.append(segment)
+            for char_len, piece_tokens in pieces:
+                tokens.extend(piece_tokens)
+                chars.append(chars[-1] + char_len)
+                ends.append(len(tokens))
+            if special is not None:
+                parts.append(special)
+                tokens.append(encoding._special_tokens[special])
+                chars.append(chars[-1] + len(special))
+                ends.append(len(tokens))
+        text = "".join(parts)
+
+        longest = max(map(len, allowed_special | disallowed_special), default=1)
+        # Pieces the suffix could still change stay open, as does anything a
+        # special token that continues into the suffix could start in.
+        open_from = min(encoding._stable_length(text), len(text) - (longest - 1))
+        cut = bisect_right(chars, max(open_from, 0)) - 1
+
+        self._text = text
+        self._stable_tokens = tuple(tokens[: ends[cut]])
+        self._tail = text[chars[cut] :]
+
+    @property
+    def text(self) -> str:
+        """The prefix as the backend sees it (normalized for ``voyage3_base``)."""
+        return self._text
+
+    @property
+    def token_count(self) -> int:
+        """Tokens reused from the cache on every call."""
+        return len(self._stable_tokens)
+
+    def encode(self, suffix: str = "") -> list[int]:
+        """Return ``encoding.encode(prefix + suffix)``."""
+        encoding = self._encoding
+        metrics = encoding._runtime.metrics
+        observe = metrics is not None and metrics.sample()
+        start = perf_counter() if observe else 0.0
+        tokens = list(self._stable_tokens)
+        tokens += encoding._encode_with_special(
+            self._tail + suffix, self._allowed, self._disallowed, self._budget(suffix)
+        )
+        if observe:
+            encoding._record_result(tokens, (perf_counter() - start) * 1_000)
+        return tokens
+
+    def count(self, suffix: str = "") -> int:
+        """Return ``len(self.encode(suffix))``."""
+        encoding = self._encoding
+        tail = self._tail + suffix
+        if not self._allowed and not self._disallowed:
+            counted = encoding._native(encoding._backend.count, tail)
+        else:
+            counted = encoding._count_with_special(tail, self._allowed, self._disallowed, None)
+        return len(self._stable_tokens) + counted
+
+    def _budget(self, suffix: str) -> Optional[int]:
+        if len(self._text) + len(suffix) >= 1_000_000:
+            raise ValueError("Input too long to encode safely")
+        limit = self._encoding._runtime.chunk_limit
+        if not limit:
+            return None
+        if len(self._stable_tokens) > limit:
+            self._encoding._raise_chunk_limit_exceeded()
+        return limit - len(self._stable_tokens)
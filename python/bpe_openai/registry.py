@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import base64
-import gzip
 from functools import lru_cache
 from importlib import import_module
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Mapping, Optional
+
+from . import vocabulary
 
 try:  # Python >= 3.9
     from importlib import resources
@@ -35,48 +35,83 @@ def _open_tokenizer_data(stem: str):
         return open(fallback, "rb")
 
 
+def _find_packaged_file(resource_name: str):
+    try:
+        candidate = resources.files(_DATA_PACKAGE).joinpath(resource_name)
+    except (ModuleNotFoundError, AttributeError):  # pragma: no cover - defensive
+        return None
+    return candidate if candidate.is_file() else None
+
+
 @lru_cache(maxsize=None)
 def _load_mergeable_ranks(stem: str) -> Dict[bytes, int]:
-    mergeable: Dict[bytes, int] = {}
-    with _open_tokenizer_data(stem) as raw, gzip.open(raw, "rt", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            token_b64, rank_str = line.split(" ")
-            mergeable[base64.b64decode(token_b64)] = int(rank_str)
-    return mergeable
+    if _find_packaged_file(f"{stem}{vocabulary.SUFFIX}") is not None:
+        return load_token_table(stem).to_dict()
+    with _open_tokenizer_data(stem) as raw:
+        return vocabulary.read_tiktoken(raw)
+
+
+def _load_packaged_table(stem: str) -> Optional[vocabulary.TokenTable]:
+    packaged = _find_packaged_file(f"{stem}{vocabulary.SUFFIX}")
+    if packaged is None:
+        return None
+    if isinstance(packaged, Path):
+        return vocabulary.TokenTable.open(packaged)
+    return vocabulary.TokenTable(packaged.read_bytes())  # pragma: no cover - zipped installs
 
 
 @lru_cache(maxsize=None)
-def cl100k_base() -> dict:
-    mergeable_ranks = _load_mergeable_ranks("cl100k_base")
-    special_tokens = {
+def load_token_table(encoding_name: str) -> vocabulary.TokenTable:
+    """Return the shared, read-only rank table for ``encoding_name``.
+
+    The precompiled ``.tiktoken.bin`` file is memory-mapped when it is bundled;
+    otherwise the table is built once from the rank dictionary.
+    """
+    table = _load_packaged_table(_VOCABULARY_STEMS.get(encoding_name, encoding_name))
+    if table is None:
+        table = vocabulary.TokenTable.from_ranks(
+            ENCODING_CONSTRUCTORS[encoding_name]()["mergeable_ranks"]
+        )
+    return table
+
+
+# Special tokens are kept apart from the rank tables so that model metadata can
+# be resolved without decoding any vocabulary file.
+SPECIAL_TOKENS: Dict[str, Mapping[str, int]] = {
+    "cl100k_base": {
         "<|endoftext|>": 100_257,
         "<|fim_prefix|>": 100_258,
         "<|fim_middle|>": 100_259,
         "<|fim_suffix|>": 100_260,
         "<|endofprompt|>": 100_276,
-    }
-    pat_str = (
-        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
-    )
-    return {
-        "name": "cl100k_base",
-        "pat_str": pat_str,
-        "mergeable_ranks": mergeable_ranks,
-        "special_tokens": special_tokens,
-    }
-
-
-@lru_cache(maxsize=None)
-def o200k_base() -> dict:
-    mergeable_ranks = _load_mergeable_ranks("o200k_base")
-    special_tokens = {
+    },
+    "o200k_base": {
         "<|endoftext|>": 199_999,
         "<|endofprompt|>": 200_018,
-    }
-    pat_str = "|".join(
+    },
+    "voyage3_base": {
+        "<|endoftext|>": 160_255,
+        "<|fim_prefix|>": 160_256,
+        "<|fim_middle|>": 160_257,
+        "<|fim_suffix|>": 160_258,
+    },
+    "gpt2": {"<|endoftext|>": 50_256},
+    "r50k_base": {"<|endoftext|>": 50_256},
+    "p50k_base": {"<|endoftext|>": 50_256},
+    "p50k_edit": {
+        "<|endoftext|>": 50_256,
+        "<|fim_prefix|>": 50_281,
+        "<|fim_middle|>": 50_282,
+        "<|fim_suffix|>": 50_283,
+    },
+}
+
+
+PATTERNS: Dict[str, str] = {
+    "cl100k_base": (
+        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+    ),
+    "o200k_base": "|".join(
         [
             r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
             r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
@@ -86,32 +121,63 @@ def o200k_base() -> dict:
             r"""\s+(?!\S)""",
             r"""\s+""",
         ]
-    )
+    ),
+    "voyage3_base": (
+        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+    ),
+    # Shared by gpt2, r50k_base, p50k_base and p50k_edit.
+    "legacy": (
+        r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}++| ?\p{N}++| ?[^\s\p{L}\p{N}]++|\s++$|\s+(?!\S)|\s"""
+    ),
+}
+
+_LEGACY_ENCODINGS = ("gpt2", "r50k_base", "p50k_base", "p50k_edit")
+
+
+def get_special_tokens(encoding_name: str) -> Dict[str, int]:
+    return dict(SPECIAL_TOKENS[encoding_name])
+
+
+def is_legacy(encoding_name: str) -> bool:
+    return encoding_name in _LEGACY_ENCODINGS
+
+
+def get_pattern(encoding_name: str) -> str:
+    if is_legacy(encoding_name):
+        return PATTERNS["legacy"]
+    pattern = PATTERNS.get(encoding_name)
+    if pattern is None:
+        pattern = ENCODING_CONSTRUCTORS[encoding_name]()["pat_str"]
+    return pattern
+
+
+@lru_cache(maxsize=None)
+def cl100k_base() -> dict:
+    return {
+        "name": "cl100k_base",
+        "pat_str": PATTERNS["cl100k_base"],
+        "mergeable_ranks": _load_mergeable_ranks("cl100k_base"),
+        "special_tokens": get_special_tokens("cl100k_base"),
+    }
+
+
+@lru_cache(maxsize=None)
+def o200k_base() -> dict:
     return {
         "name": "o200k_base",
-        "pat_str": pat_str,
-        "mergeable_ranks": mergeable_ranks,
-        "special_tokens": special_tokens,
+        "pat_str": PATTERNS["o200k_base"],
+        "mergeable_ranks": _load_mergeable_ranks("o200k_base"),
+        "special_tokens": get_special_tokens("o200k_base"),
     }
 
 
 @lru_cache(maxsize=None)
 def voyage3_base() -> dict:
-    mergeable_ranks = _load_mergeable_ranks("voyage3_base")
-    special_tokens = {
-        "<|endoftext|>": 160_255,
-        "<|fim_prefix|>": 160_256,
-        "<|fim_middle|>": 160_257,
-        "<|fim_suffix|>": 160_258,
-    }
-    pat_str = (
-        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
-    )
     return {
         "name": "voyage3_base",
-        "pat_str": pat_str,
-        "mergeable_ranks": mergeable_ranks,
-        "special_tokens": special_tokens,
+        "pat_str": PATTERNS["voyage3_base"],
+        "mergeable_ranks": _load_mergeable_ranks("voyage3_base"),
+        "special_tokens": get_special_tokens("voyage3_base"),
     }
 
 
@@ -122,39 +188,63 @@ ENCODING_CONSTRUCTORS = {
 }
 
 
+# Legacy encodings that reuse another encoding's vocabulary file.
+_VOCABULARY_STEMS = {
+    "gpt2": "r50k_base",
+    "p50k_edit": "p50k_base",
+}
+
+
+def _has_bundled_vocabulary(stem: str) -> bool:
+    if _find_packaged_file(f"{stem}{vocabulary.SUFFIX}") is not None:
+        return True
+    if _find_packaged_file(f"{stem}.tiktoken.gz") is not None:
+        return True
+    return (_VENDOR_DATA_DIR / f"{stem}.tiktoken.gz").is_file()
+
+
 @lru_cache(maxsize=None)
 def _openai_public():
     try:
         return import_module("tiktoken_ext.openai_public")
     except ModuleNotFoundError as exc:  # pragma: no cover - depends on install
         raise RuntimeError(
-            "tiktoken_ext is required to load legacy encodings (gpt2/r50k/p50k)."
+            "tiktoken_ext is required to load legacy encodings (gpt2/r50k/p50k) "
+            "when their vocabulary files are not bundled."
         ) from exc
 
 
-def _load_openai_public(name: str) -> dict:
-    constructor = getattr(_openai_public(), name)
-    return constructor()
+def _load_legacy(name: str) -> dict:
+    stem = _VOCABULARY_STEMS.get(name, name)
+    if not _has_bundled_vocabulary(stem):
+        constructor = getattr(_openai_public(), name)
+        return constructor()
+    return {
+        "name": name,
+        "pat_str": PATTERNS["legacy"],
+        "mergeable_ranks": _load_mergeable_ranks(stem),
+        "special_tokens": get_special_tokens(name),
+    }
 
 
 @lru_cache(maxsize=None)
 def gpt2() -> dict:
-    return _load_openai_public("gpt2")
+    return _load_legacy("gpt2")
 
 
 @lru_cache(maxsize=None)
 def r50k_base() -> dict:
-    return _load_openai_public("r50k_base")
+    return _load_legacy("r50k_base")
 
 
 @lru_cache(maxsize=None)
 def p50k_base() -> dict:
-    return _load_openai_public("p50k_base")
+    return _load_legacy("p50k_base")
 
 
 @lru_cache(maxsize=None)
 def p50k_edit() -> dict:
-    return _load_openai_public("p50k_edit")
+    return _load_legacy("p50k_edit")
 
 
 ENCODING_CONSTRUCTORS.update(
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Optional, Sequence
 
 
 @dataclass(frozen=True)
@@ -11,6 +11,10 @@ class TokenizationResult:
     total_tokens: int
     truncated: bool
     elapsed_ms: float
+    # Set by ``Encoding.truncate``: the text covered by ``token_ids`` and where
+    # it ends (``side="head"``) or starts (``side="tail"``) in the input.
+    text: Optional[str] = None
+    char_offset: Optional[int] = None
 
     def to_dict(self) -> dict[str, object]:
         return {
@@ -19,6 +23,26 @@ class TokenizationResult:
             "total_tokens": self.total_tokens,
             "truncated": self.truncated,
             "elapsed_ms": self.elapsed_ms,
+            "text": self.text,
+            "char_offset": self.char_offset,
+        }
+
+
+@dataclass(frozen=True)
+class TokenWindow:
+    """One window produced by ``Encoding.chunk``; ``text == input[start:end]``."""
+
+    token_ids: Sequence[int]
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "token_ids": list(self.token_ids),
+            "text": self.text,
+            "start": self.start,
+            "end": self.end,
         }
 
 
@@ -0,0 +1,139 @@
+"""Stateful helpers for encoding and decoding streamed text."""
+
+from __future__ import annotations
+
+import codecs
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Sequence,
+    Union,
+)
+
+if TYPE_CHECKING:  # pragma: no cover - imported for annotations only
+    from .tokenizer import Encoding
+
+
+class EncoderUpdate(NamedTuple):
+    """Result of ``IncrementalEncoder.append``."""
+
+    token_count: int
+    """Tokens in ``encode_ordinary`` of everything appended so far."""
+    committed: list[int]
+    """Tokens that became stable during this call."""
+
+
+class IncrementalEncoder:
+    """Encode text that arrives in deltas without re-encoding the whole string.
+
+    Only the pretokenization pieces near the end of the text can still change
+    when more text arrives (a trailing whitespace run, or a word that may gain
+    a contraction suffix), so everything before them is committed and only
+    they are re-tokenized on the next ``append``. Special tokens are encoded as
+    ordinary text, as in ``Encoding.encode_ordinary``, and text is normalized
+    as the encoding requires before it is split.
+    """
+
+    def __init__(self, encoding: Encoding) -> None:
+        self._encoding = encoding
+        self._committed: list[int] = []
+        self._pending = ""
+        self._pending_tokens: list[int] = []
+
+    def append(self, text_delta: str) -> EncoderUpdate:
+        """Add ``text_delta`` and return the token count and newly committed tokens."""
+        if not text_delta:
+            return EncoderUpdate(self.token_count, [])
+        pieces, text = self._encoding._encode_pieces(self._pending + text_delta)
+        limit = self._encoding._stable_length(text)
+
+        committed: list[int] = []
+        pending_tokens: list[int] = []
+        position = 0
+        for char_len, tokens in pieces:
+            if pending_tokens or position + char_len > limit:
+                pending_tokens.extend(tokens)
+            else:
+                committed.extend(tokens)
+                position += char_len
+        self._committed.extend(committed)
+        self._pending = text[position:]
+        self._pending_tokens = pending_tokens
+        return EncoderUpdate(self.token_count, committed)
+
+    def flush(self) -> list[int]:
+        """Commit the held-back pieces once the stream has ended and return their tokens."""
+        committed = self._pending_tokens
+        self._committed.extend(committed)
+        self._pending = ""
+        self._pending_tokens = []
+        return committed
+
+    @property
+    def token_count(self) -> int:
+        return len(self._committed) + len(self._pending_tokens)
+
+    @property
+    def committed_tokens(self) -> list[int]:
+        """Tokens that later deltas can no longer change."""
+        return list(self._committed)
+
+    @property
+    def tokens(self) -> list[int]:
+        """``encode_ordinary`` of everything appended so far."""
+        return self._committed + self._pending_tokens
+
+
+class IncrementalDecoder:
+    """Decode a stream of tokens, emitting only complete characters.
+
+    Bytes of a multi-byte character that is split across tokens are buffered
+    until the character is complete, so each step costs O(1) amortized instead
+    of re-decoding everything seen so far. ``errors`` applies to invalid UTF-8
+    as in ``Encoding.decode``.
+    """
+
+    def __init__(self, encoding: Encoding, errors: str = "replace") -> None:
+        self._encoding = encoding
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors)
+
+    def decode(self, tokens: Union[int, Sequence[int]]) -> str:
+        """Feed one token or a sequence of tokens and return the completed text."""
+        if isinstance(tokens, int):
+            data = self._encoding.decode_single_token_bytes(tokens)
+        else:
+            data = self._encoding.decode_bytes(tokens)
+        return self._decoder.decode(data)
+
+    def flush(self) -> str:
+        """Return whatever is still buffered once the stream has ended."""
+        return self._decoder.decode(b"", final=True)
+
+    def reset(self) -> None:
+        self._decoder.reset()
+
+    def stream(self, tokens: Iterable[Union[int, Sequence[int]]]) -> Iterator[str]:
+        """Decode ``tokens`` lazily, yielding non-empty text as it completes."""
+        for step in tokens:
+            text = self.decode(step)
+            if text:
+                yield text
+        tail = self.flush()
+        if tail:
+            yield tail
+
+    async def astream(
+        self, tokens: AsyncIterable[Union[int, Sequence[int]]]
+    ) -> AsyncIterator[str]:
+        """Async counterpart of ``stream`` for token streams from asyncio clients."""
+        async for step in tokens:
+            text = self.decode(step)
+            if text:
+                yield text
+        tail = self.flush()
+        if tail:
+            yield tail
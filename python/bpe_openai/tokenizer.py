@@ -2,72 +2,162 @@ from __future__ import annotations
 
 import functools
 import importlib
-from concurrent.futures import ThreadPoolExecutor
-from time import perf_counter
-from typing import AbstractSet, Collection, Literal, Mapping, NoReturn, Optional, Sequence
-
-from . import compat, errors, registry
+import threading
+import unicodedata
+from collections import deque
+from time import perf_counter, perf_counter_ns
+from types import MappingProxyType
+from typing import (
+    AbstractSet,
+    Callable,
+    Collection,
+    Generator,
+    Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    NoReturn,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from . import compat, errors, executor, registry
+from ._util import require_numpy
+from .cache import result_size
 from .configuration import TokenizerConfiguration, TokenizerRuntime
-from .metrics import MetricsPayload, dispatch
-from .results import TokenizationResult
+from .metrics import MetricsHook, MetricsRecorder
+from .results import TokenizationResult, TokenWindow
+from .stats import OperationStats, StatsTarget, deliver
+from .prefix import PreparedPrefix
+from .streaming import IncrementalDecoder, IncrementalEncoder
+from .vocabulary import TokenTable
+
 
+T = TypeVar("T")
 
 _ALLOWED_SPECIAL_ALL = "all"
 _DISALLOWED_SPECIAL_ALL = "all"
+# Characters handed to the backend per call when chunking large inputs.
+_CHUNK_SEGMENT_CHARS = 1 << 16
+
+# Distinct (allowed, disallowed) special-token sets cached per Encoding.
+_MAX_SPECIAL_MATCHERS = 64
+
+_Piece = tuple[int, str, list[int]]
 
 
 def _load_backend():
     return importlib.import_module("bpe_openai._bindings")
 
 
-def _bpe_encode_bytes(mergeable_ranks: Mapping[bytes, int], data: bytes) -> list[int]:
-    if not data:
-        return []
-    parts = [bytes([b]) for b in data]
-    while True:
-        min_rank = None
-        min_idx = None
-        for idx in range(len(parts) - 1):
-            pair = parts[idx] + parts[idx + 1]
-            rank = mergeable_ranks.get(pair)
-            if rank is not None and (min_rank is None or rank < min_rank):
-                min_rank = rank
-                min_idx = idx
-        if min_rank is None:
-            break
-        parts[min_idx : min_idx + 2] = [parts[min_idx] + parts[min_idx + 1]]
-    return [mergeable_ranks[part] for part in parts]
+@functools.lru_cache(maxsize=None)
+def _disallowed_special_error() -> type[ValueError]:
+    # Only looked up once the backend has raised, so the hot path never pays
+    # for the import.
+    return _load_backend().DisallowedSpecialTokenError
 
 
-class Encoding:
-    """tiktoken-compatible encoding interface backed by the Rust tokenizer."""
+class _VocabularyTables:
+    """Read-only lookup tables for one vocabulary, shared by every Encoding."""
 
     def __init__(
         self,
         *,
         name: str,
+        pat_str: str,
+        token_table: TokenTable,
+        special_tokens: Mapping[str, int],
+    ) -> None:
+        self.name = name
+        self.pat_str = pat_str
+        # The token table is usually a memory-mapped file, so rank lookups and
+        # decoding never materialise a per-token Python dictionary.
+        self.mergeable_ranks: TokenTable = token_table
+        self.special_tokens: Mapping[str, int] = MappingProxyType(dict(special_tokens))
+        self.special_token_values = frozenset(special_tokens.values())
+        self.max_token_value = max(token_table.slots - 1, max(self.special_token_values, default=-1))
+        self._special_bytes = {value: token.encode("utf-8") for token, value in special_tokens.items()}
+
+    def token_bytes(self, token: int) -> bytes:
+        special = self._special_bytes.get(token)
+        if special is not None:
+            return special
+        try:
+            chunk = self.mergeable_ranks.token_bytes(token)
+        except IndexError as exc:
+            raise KeyError(f"Token id {token} is out of range for {self.name}") from exc
+        if not chunk:
+            raise KeyError(f"Token id {token} is not defined for {self.name}")
+        return chunk
+
+    def token_byte_values(self) -> list[bytes]:
+        values: list[bytes] = []
+        for token in range(self.max_token_value + 1):
+            special = self._special_bytes.get(token)
+            if special is not None:
+                values.append(special)
+            elif token < self.mergeable_ranks.slots:
+                values.append(self.mergeable_ranks.token_bytes(token))
+            else:
+                values.append(b"")
+        return values
+
+
+_TABLES: dict[str, _VocabularyTables] = {}
+_BACKENDS: dict[str, tuple[object, str]] = {}
+_CACHE_LOCK = threading.RLock()
+
+
+def _load_tables(encoding_name: str) -> _VocabularyTables:
+    tables = _TABLES.get(encoding_name)
+    if tables is not None:
+        return tables
+    with _CACHE_LOCK:
+        tables = _TABLES.get(encoding_name)
+        if tables is None:
+            tables = _VocabularyTables(
+                name=encoding_name,
+                pat_str=registry.get_pattern(encoding_name),
+                token_table=registry.load_token_table(encoding_name),
+                special_tokens=registry.SPECIAL_TOKENS[encoding_name],
+            )
+            _TABLES[encoding_name] = tables
+        return tables
+
+
+class Encoding:
+    """tiktoken-compatible encoding interface backed by the Rust tokenizer.
+
+    Vocabulary tables and the backend are shared and read-only. Per-instance
+    state (the runtime with its metrics hook and caches, and the thread-local
+    ``last_result``) is kept on the instance, so configuring one instance
+    never affects another.
+    """
+
+    def __init__(
+        self,
+        *,
         model: str,
         runtime: TokenizerRuntime,
         backend,
         backend_version: str,
-        pat_str: str,
-        mergeable_ranks: dict[bytes, int],
-        special_tokens: dict[str, int],
+        tables: _VocabularyTables,
     ) -> None:
-        self.name = name
+        self.name = tables.name
         self._model = model
         self._runtime = runtime
         self._backend = backend
         self._backend_version = backend_version
-        self._pat_str = pat_str
-        # Copy to guard against accidental mutation of cached dictionaries.
-        self._mergeable_ranks = dict(mergeable_ranks)
-        self._special_tokens = dict(special_tokens)
-
-        self._metrics_hook = None
-        self._last_result: Optional[TokenizationResult] = None
+        self._tables = tables
+        self._pat_str = tables.pat_str
+        self._mergeable_ranks = tables.mergeable_ranks
+        self._special_tokens = tables.special_tokens
+        self._special_token_values = tables.special_token_values
+        self.max_token_value = tables.max_token_value
 
-        self._build_rank_tables()
+        self._local = threading.local()
+        self._matchers: dict[tuple[frozenset[str], frozenset[str]], object] = {}
 
     def __repr__(self) -> str:  # pragma: no cover - formatting helper
         return f"<Encoding {self.name!r}>"
@@ -77,11 +167,25 @@ class Encoding:
     # ---------------------------------------------------------------------
 
     def encode_ordinary(self, text: str) -> list[int]:
-        text = self._sanitize_text(text)
-        tokens = self._encode_plain(text)
-        self._check_chunk_limit(len(tokens))
+        stats = self._runtime.stats
+        if stats is None:
+            return self._encode_ordinary(text)
+        start = perf_counter_ns()
+        tokens = self._encode_ordinary(text)
+        stats.observe("encode", len(text), len(tokens), perf_counter_ns() - start, chars=len(text))
         return tokens
 
+    def _encode_ordinary(self, text: str) -> list[int]:
+        if self._runtime.result_cache is None:
+            return self._encode_plain(text, self._runtime.chunk_limit)
+        return self._memoized(
+            "encode",
+            text,
+            frozenset(),
+            frozenset(),
+            lambda: self._encode_plain(text, self._runtime.chunk_limit),
+        )
+
     def encode(
         self,
         text: str,
@@ -89,56 +193,131 @@ class Encoding:
         allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
         disallowed_special: Literal["all"] | Collection[str] = "all",
     ) -> list[int]:
-        text = self._sanitize_text(text)
         allowed = self._normalize_allowed_special(allowed_special)
         disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
 
-        if disallowed:
-            regex = _special_token_regex(disallowed)
-            match = regex.search(text)
-            if match:
-                raise_disallowed_special_token(match.group())
+        stats = self._runtime.stats
+        metrics = self._runtime.metrics
+        observe = metrics is not None and metrics.sample()
+        if stats is None and not observe:
+            return self._encode_text(text, allowed, disallowed)
+        start = perf_counter_ns()
+        tokens = self._encode_text(text, allowed, disallowed)
+        elapsed_ns = perf_counter_ns() - start
+        if stats is not None:
+            stats.observe("encode", len(text), len(tokens), elapsed_ns, chars=len(text))
+        if observe:
+            self._record_result(tokens, elapsed_ns / 1e6)
+        return tokens
 
-        start = perf_counter()
-        tokens = self._encode_with_special(text, allowed)
-        elapsed_ms = (perf_counter() - start) * 1_000
+    def encode_to_numpy(
+        self,
+        text: str,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ):
+        np = require_numpy()
 
-        result = TokenizationResult(
-            token_ids=tokens,
-            token_strings=[],
-            total_tokens=len(tokens),
-            truncated=False,
-            elapsed_ms=elapsed_ms,
-        )
-        self._last_result = result
+        allowed = self._normalize_allowed_special(allowed_special)
+        if allowed:
+            tokens = self.encode(
+                text,
+                allowed_special=allowed,
+                disallowed_special=disallowed_special,
+            )
+            return np.asarray(tokens, dtype=np.uint32)
 
-        dispatch(
-            self._metrics_hook,
-            MetricsPayload(
-                model=self._model,
-                total_tokens=len(tokens),
-                elapsed_ms=elapsed_ms,
-                rust_backend_version=self._backend_version,
-            ),
+        self._check_disallowed_special(
+            text, self._normalize_disallowed_special(allowed, disallowed_special)
         )
 
+        _check_text_length(text)
+        limit = self._runtime.chunk_limit or None
+        stats = self._runtime.stats
+        metrics = self._runtime.metrics
+        observe = metrics is not None and metrics.sample()
+        start = perf_counter_ns() if observe or stats is not None else 0
+        # The backend hands back the raw u32 buffer, so wrapping it is free and
+        # no Python int is created per token.
+        buffer = self._native(self._backend.encode_to_bytes, text, limit)
+        if buffer is None:
+            self._raise_chunk_limit_exceeded()
+        tokens = np.frombuffer(buffer, dtype=np.uint32)
+        if stats is not None or observe:
+            elapsed_ns = perf_counter_ns() - start
+            if stats is not None:
+                stats.observe("encode", len(text), len(tokens), elapsed_ns, chars=len(text))
+            if observe:
+                self._record_result(tokens, elapsed_ns / 1e6)
         return tokens
 
-    def encode_to_numpy(
+    def encode_batch_to_numpy(
         self,
-        text: str,
+        text: Sequence[str],
         *,
+        num_threads: int = 8,
         allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
         disallowed_special: Literal["all"] | Collection[str] = "all",
     ):
-        tokens = self.encode(
-            text,
-            allowed_special=allowed_special,
-            disallowed_special=disallowed_special,
-        )
-        import numpy as np  # Local import to avoid hard dependency unless needed.
+        """Encode a batch into one flat ``uint32`` array plus ``uint64`` offsets.
+
+        Item ``i`` occupies ``tokens[offsets[i]:offsets[i + 1]]``.
+        """
+        np = require_numpy()
+
+        allowed = self._normalize_allowed_special(allowed_special)
+        if allowed:
+            batch = self.encode_batch(
+                text,
+                num_threads=num_threads,
+                allowed_special=allowed,
+                disallowed_special=disallowed_special,
+            )
+            lengths = np.fromiter((len(tokens) for tokens in batch), dtype=np.uint64, count=len(batch))
+            offsets = np.zeros(len(batch) + 1, dtype=np.uint64)
+            np.cumsum(lengths, out=offsets[1:])
+            flat = np.fromiter(
+                (token for tokens in batch for token in tokens),
+                dtype=np.uint32,
+                count=int(offsets[-1]),
+            )
+            return flat, offsets
+
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        stats = self._runtime.stats
+        start = perf_counter_ns() if stats is not None else 0
+        items = list(text)
+        for item in items:
+            _check_text_length(item)
+            self._check_disallowed_special(item, disallowed)
 
-        return np.asarray(tokens, dtype=np.uint32)
+        limit = self._runtime.chunk_limit or None
+
+        def encode_slice(batch: Sequence[str]) -> list[Optional[tuple[bytes, bytes]]]:
+            return [self._native_batch(self._backend.encode_batch_to_bytes, batch, limit)]
+
+        parts = self._runtime.map_batch(
+            encode_slice, items, num_threads, [len(item) for item in items]
+        )
+        if any(part is None for part in parts):
+            self._raise_chunk_limit_exceeded()
+        flats = [np.frombuffer(flat_buffer, dtype=np.uint32) for flat_buffer, _ in parts]
+        if len(parts) == 1:
+            flat, offsets = flats[0], np.frombuffer(parts[0][1], dtype=np.uint64)
+        else:
+            # Each slice's offsets start at zero; shift them past the slices before it.
+            shifted = [np.zeros(1, dtype=np.uint64)]
+            base = 0
+            for part_flat, (_, offsets_buffer) in zip(flats, parts):
+                shifted.append(np.frombuffer(offsets_buffer, dtype=np.uint64)[1:] + np.uint64(base))
+                base += len(part_flat)
+            flat, offsets = np.concatenate(flats), np.concatenate(shifted)
+        if stats is not None:
+            chars = sum(len(item) for item in items)
+            elapsed_ns = perf_counter_ns() - start
+            stats.observe("encode_batch", chars, len(flat), elapsed_ns, len(items), chars=chars)
+        return flat, offsets
 
     def encode_ordinary_batch(
         self,
@@ -146,13 +325,14 @@ class Encoding:
         *,
         num_threads: int = 8,
     ) -> list[list[int]]:
-        def worker(item: str) -> list[int]:
-            tokens = self._encode_plain(self._sanitize_text(item))
-            self._check_chunk_limit(len(tokens))
-            return tokens
-
-        with ThreadPoolExecutor(max_workers=num_threads) as pool:
-            return list(pool.map(worker, text))
+        items = list(text)
+        stats = self._runtime.stats
+        if stats is None:
+            return self._encode_plain_batch(items, num_threads)
+        start = perf_counter_ns()
+        batch = self._encode_plain_batch(items, num_threads)
+        self._observe_batch(stats, "encode_batch", items, batch, perf_counter_ns() - start)
+        return batch
 
     def encode_batch(
         self,
@@ -164,16 +344,235 @@ class Encoding:
     ) -> list[list[int]]:
         allowed = self._normalize_allowed_special(allowed_special)
         disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        items = list(text)
+
+        stats = self._runtime.stats
+        metrics = self._runtime.metrics
+        observe = metrics is not None and metrics.sample()
+        if stats is None and not observe:
+            return self._encode_batch(items, num_threads, allowed, disallowed)
+        start = perf_counter_ns()
+        batch = self._encode_batch(items, num_threads, allowed, disallowed)
+        elapsed_ns = perf_counter_ns() - start
+
+        # The whole batch is one observation: hooks get a single payload with
+        # the batch's total tokens and wall-clock latency.
+        total_tokens = self._observe_batch(stats, "encode_batch", items, batch, elapsed_ns)
+        if observe:
+            metrics.record(total_tokens, elapsed_ns / 1e6)
+        return batch
+
+    def _encode_batch(
+        self,
+        items: list[str],
+        num_threads: int,
+        allowed: frozenset[str],
+        disallowed: frozenset[str],
+    ) -> list[list[int]]:
+        if allowed:
+            # Special tokens split each item into segments, so fall back to
+            # per-item encoding rather than the native batch entry point.
+            def encode_slice(batch: Sequence[str]) -> list[list[int]]:
+                return [self._encode_text(item, allowed, disallowed) for item in batch]
+
+            return self._runtime.map_batch(
+                encode_slice, items, num_threads, [len(item) for item in items]
+            )
 
-        def worker(item: str) -> list[int]:
-            return self.encode(
-                item,
-                allowed_special=allowed,
-                disallowed_special=disallowed,
+        for item in items:
+            self._check_disallowed_special(item, disallowed)
+        return self._encode_plain_batch(items, num_threads)
+
+    # ---------------------------------------------------------------------
+    # Counting helpers
+    # ---------------------------------------------------------------------
+
+    def count(
+        self,
+        text: str,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> int:
+        """Return ``len(self.encode(text, ...))`` without materialising the tokens."""
+        allowed = self._normalize_allowed_special(allowed_special)
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        stats = self._runtime.stats
+        if stats is None:
+            return self._count_text(text, allowed, disallowed)
+        start = perf_counter_ns()
+        count = self._count_text(text, allowed, disallowed)
+        stats.observe("count", len(text), count, perf_counter_ns() - start, chars=len(text))
+        return count
+
+    def _count_text(self, text: str, allowed: frozenset[str], disallowed: frozenset[str]) -> int:
+        if self._runtime.result_cache is not None:
+            return self._memoized(
+                "count", text, allowed, disallowed, lambda: self._count(text, allowed, disallowed)
             )
+        return self._count(text, allowed, disallowed)
+
+    def _count(self, text: str, allowed: frozenset[str], disallowed: frozenset[str]) -> int:
+        if not allowed and not disallowed:
+            return self._native(self._backend.count, text)
+        return self._count_with_special(text, allowed, disallowed, None)
+
+    def count_batch(
+        self,
+        text: Sequence[str],
+        *,
+        num_threads: int = 8,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> list[int]:
+        allowed = self._normalize_allowed_special(allowed_special)
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        items = list(text)
+        stats = self._runtime.stats
+        if stats is None:
+            return self._count_batch(items, num_threads, allowed, disallowed)
+        start = perf_counter_ns()
+        counts = self._count_batch(items, num_threads, allowed, disallowed)
+        chars = sum(len(item) for item in items)
+        elapsed_ns = perf_counter_ns() - start
+        stats.observe("count_batch", chars, sum(counts), elapsed_ns, len(items), chars=chars)
+        return counts
+
+    def _count_batch(
+        self,
+        items: list[str],
+        num_threads: int,
+        allowed: frozenset[str],
+        disallowed: frozenset[str],
+    ) -> list[int]:
+        if allowed:
+            return [self._count_text(item, allowed, disallowed) for item in items]
+
+        for item in items:
+            self._check_disallowed_special(item, disallowed)
+
+        def count_slice(batch: Sequence[str]) -> list[int]:
+            return self._native_batch(self._backend.count_batch, batch)
+
+        return self._runtime.map_batch(
+            count_slice, items, num_threads, [len(item) for item in items]
+        )
+
+    def is_within_token_limit(
+        self,
+        text: str,
+        limit: int,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> bool:
+        """Return whether ``text`` encodes to at most ``limit`` tokens.
+
+        Counting stops as soon as the limit is exceeded, so the cost is bounded
+        by ``limit`` rather than by the length of ``text``.
+        """
+        if limit < 0:
+            return False
+        allowed = self._normalize_allowed_special(allowed_special)
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        if not allowed and not disallowed:
+            return self._native(self._backend.count_till_limit, text, limit) is not None
+        return self._count_with_special(text, allowed, disallowed, limit) is not None
 
-        with ThreadPoolExecutor(max_workers=num_threads) as pool:
-            return list(pool.map(worker, text))
+    def truncate(
+        self,
+        text: str,
+        max_tokens: int,
+        *,
+        side: Literal["head", "tail"] = "head",
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> TokenizationResult:
+        """Return the first (``side="head"``) or last ``max_tokens`` tokens of ``text``.
+
+        ``token_ids`` equals ``encode(text)[:max_tokens]`` (or ``[-max_tokens:]``)
+        without encoding the rest of the input, so the cost tracks the budget
+        rather than the length of ``text`` and the 1M-character guard does not
+        apply. ``result.text`` is the part of ``text`` fully covered by those
+        tokens and ``result.char_offset`` is where it ends (head) or starts
+        (tail). Disallowed special tokens are only checked in the kept text.
+        For encodings that normalize their input (``voyage3_base`` applies
+        NFC), both refer to the normalized text.
+        """
+        if max_tokens < 0:
+            raise ValueError("max_tokens must be non-negative")
+        if side not in ("head", "tail"):
+            raise ValueError(f"side must be 'head' or 'tail', not {side!r}")
+        allowed = self._normalize_allowed_special(allowed_special)
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+
+        start = perf_counter()
+        text = self._normalized(text)
+        tokens, covered, truncated = self._truncate(text, max_tokens, side, allowed)
+        elapsed_ms = (perf_counter() - start) * 1_000
+
+        if side == "head":
+            char_offset = covered
+            kept = text[:covered]
+        else:
+            char_offset = len(text) - covered
+            kept = text[char_offset:]
+        self._check_disallowed_special(kept, disallowed)
+        metrics = self._runtime.metrics
+        return self._record_result(
+            tokens,
+            elapsed_ms,
+            truncated=truncated,
+            text=kept,
+            char_offset=char_offset,
+            observe=metrics is not None and metrics.sample(),
+        )
+
+    def chunk(
+        self,
+        text: str | Iterable[str],
+        max_tokens: int,
+        *,
+        overlap: int = 0,
+    ) -> Iterator[TokenWindow]:
+        """Yield windows of at most ``max_tokens`` tokens covering ``text``.
+
+        ``text`` may be a string or an iterable of string parts (for example a
+        file read in blocks); character spans refer to their concatenation.
+        Windows are cut at pretokenization boundaries and consecutive windows
+        share up to ``overlap`` tokens of whole pieces. A single piece longer
+        than ``max_tokens`` is split on token boundaries. Input is processed in
+        bounded segments, so memory does not grow with the document and the
+        1M-character encode guard does not apply. Special tokens are encoded as
+        ordinary text, as in ``encode_ordinary``. For encodings that normalize
+        their input (``voyage3_base``), spans refer to the normalized text.
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be non-negative and smaller than max_tokens")
+        return self._chunk(text, max_tokens, overlap)
+
+    def prepare_prefix(
+        self,
+        text: str,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> PreparedPrefix:
+        """Encode a shared prompt prefix once for reuse across many suffixes.
+
+        ``prepare_prefix(prefix).encode(suffix)`` returns exactly
+        ``encode(prefix + suffix)`` with the same special-token arguments, but
+        only re-tokenizes the suffix and the last few pieces of the prefix.
+        """
+        allowed = self._normalize_allowed_special(allowed_special)
+        disallowed = self._normalize_disallowed_special(allowed, disallowed_special)
+        return PreparedPrefix(self, text, allowed, disallowed)
+
+    def incremental_encoder(self) -> IncrementalEncoder:
+        """Return an encoder that tracks ``encode_ordinary`` of a growing string."""
+        return IncrementalEncoder(self)
 
     def encode_with_unstable(
         self,
@@ -199,10 +598,9 @@ class Encoding:
                 return self._special_tokens[decoded]
             raise KeyError(f"{text_or_bytes!r} is not a valid token")
 
-        text = self._sanitize_text(text_or_bytes)
-        if text in self._special_tokens:
-            return self._special_tokens[text]
-        candidate = self._encode_plain(text)
+        if text_or_bytes in self._special_tokens:
+            return self._special_tokens[text_or_bytes]
+        candidate = self._encode_plain(text_or_bytes)
         if len(candidate) != 1:
             raise KeyError(f"{text_or_bytes!r} does not correspond to a single token")
         return candidate[0]
@@ -212,31 +610,97 @@ class Encoding:
             "register_special_tokens is not supported; the underlying tokenizer has a fixed vocabulary"
         )
 
+    # ---------------------------------------------------------------------
+    # Async helpers
+    # ---------------------------------------------------------------------
+    #
+    # Inputs up to ``runtime.async_inline_threshold`` characters (tokens for
+    # decoding) run inline, since a thread hop would cost more than the work.
+    # Larger ones run on the shared worker pool; ``last_result`` is then set on
+    # the worker thread rather than the caller's.
+
+    async def encode_async(
+        self,
+        text: str,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> list[int]:
+        call = functools.partial(
+            self.encode,
+            text,
+            allowed_special=allowed_special,
+            disallowed_special=disallowed_special,
+        )
+        return await self._run_async(call, len(text))
+
+    async def encode_batch_async(
+        self,
+        text: Sequence[str],
+        *,
+        num_threads: int = 8,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> list[list[int]]:
+        call = functools.partial(
+            self.encode_batch,
+            text,
+            num_threads=num_threads,
+            allowed_special=allowed_special,
+            disallowed_special=disallowed_special,
+        )
+        return await self._run_async(call, sum(len(item) for item in text))
+
+    async def count_async(
+        self,
+        text: str,
+        *,
+        allowed_special: Literal["all"] | AbstractSet[str] = frozenset(),
+        disallowed_special: Literal["all"] | Collection[str] = "all",
+    ) -> int:
+        call = functools.partial(
+            self.count,
+            text,
+            allowed_special=allowed_special,
+            disallowed_special=disallowed_special,
+        )
+        return await self._run_async(call, len(text))
+
+    async def decode_async(self, tokens: Sequence[int], errors: str = "replace") -> str:
+        return await self._run_async(functools.partial(self.decode, tokens, errors), len(tokens))
+
     # ---------------------------------------------------------------------
     # Decoding helpers
     # ---------------------------------------------------------------------
 
     def decode_bytes(self, tokens: Sequence[int]) -> bytes:
-        chunks = []
-        for token in tokens:
-            chunk = self._token_to_bytes(token)
-            chunks.append(chunk)
-        return b"".join(chunks)
+        stats = self._runtime.stats
+        if stats is None:
+            return self._backend.decode_bytes(tokens)
+        start = perf_counter_ns()
+        data = self._backend.decode_bytes(tokens)
+        elapsed_ns = perf_counter_ns() - start
+        stats.observe("decode", len(tokens), len(tokens), elapsed_ns, nbytes=len(data))
+        return data
 
     def decode(self, tokens: Sequence[int], errors: str = "replace") -> str:
         return self.decode_bytes(tokens).decode("utf-8", errors=errors)
 
+    def incremental_decoder(self, errors: str = "replace") -> IncrementalDecoder:
+        """Return a decoder for token streams that may split UTF-8 characters."""
+        return IncrementalDecoder(self, errors)
+
     def decode_single_token_bytes(self, token: int) -> bytes:
         return self._token_to_bytes(token)
 
     def decode_tokens_bytes(self, tokens: Sequence[int]) -> list[bytes]:
-        return [self._token_to_bytes(token) for token in tokens]
+        return self._backend.decode_tokens_bytes(tokens)
 
     def decode_with_offsets(
         self,
         tokens: Sequence[int],
     ) -> tuple[str, list[int]]:
-        token_bytes = [self._token_to_bytes(token) for token in tokens]
+        token_bytes = self._backend.decode_tokens_bytes(tokens)
 
         offsets: list[int] = []
         text_len = 0
@@ -257,8 +721,10 @@ class Encoding:
         errors: str = "replace",
         num_threads: int = 8,
     ) -> list[str]:
-        with ThreadPoolExecutor(max_workers=num_threads) as pool:
-            return list(pool.map(lambda seq: self.decode(seq, errors=errors), batch))
+        return [
+            chunk.decode("utf-8", errors=errors)
+            for chunk in self.decode_bytes_batch(batch, num_threads=num_threads)
+        ]
 
     def decode_bytes_batch(
         self,
@@ -266,15 +732,33 @@ class Encoding:
         *,
         num_threads: int = 8,
     ) -> list[bytes]:
-        with ThreadPoolExecutor(max_workers=num_threads) as pool:
-            return list(pool.map(self.decode_bytes, batch))
+        weights = [len(tokens) for tokens in batch]
+        stats = self._runtime.stats
+        if stats is None:
+            return self._runtime.map_batch(
+                self._backend.decode_bytes_batch, batch, num_threads, weights
+            )
+        start = perf_counter_ns()
+        decoded = self._runtime.map_batch(
+            self._backend.decode_bytes_batch, batch, num_threads, weights
+        )
+        tokens = sum(weights)
+        stats.observe(
+            "decode_batch",
+            tokens,
+            tokens,
+            perf_counter_ns() - start,
+            len(decoded),
+            nbytes=sum(len(data) for data in decoded),
+        )
+        return decoded
 
     # ---------------------------------------------------------------------
     # Misc helpers
     # ---------------------------------------------------------------------
 
     def token_byte_values(self) -> list[bytes]:
-        return list(self._rank_to_bytes)
+        return self._tables.token_byte_values()
 
     @property
     def special_tokens_set(self) -> set[str]:
@@ -289,7 +773,12 @@ class Encoding:
 
     @property
     def last_result(self) -> Optional[TokenizationResult]:
-        return self._last_result
+        """Result of the most recent reported encode made by the calling thread.
+
+        Plain encodes only build a result while a metrics hook is set and the
+        call is sampled; ``truncate`` always does, since it returns one.
+        """
+        return getattr(self._local, "last_result", None)
 
     @property
     def eot_token(self) -> int:
@@ -298,14 +787,127 @@ class Encoding:
             raise KeyError("<|endoftext|> token is not defined for this encoding")
         return token
 
-    def set_metrics_hook(self, callback) -> None:
-        self._metrics_hook = callback
-        self._runtime.set_metrics_hook(callback)
+    def set_metrics_hook(
+        self,
+        callback: Optional[MetricsHook],
+        *,
+        sample_rate: float = 1.0,
+        flush_interval: Optional[float] = None,
+    ) -> None:
+        """Report encode calls to ``callback``; ``None`` removes the hook.
+
+        Only a ``sample_rate`` fraction of calls is timed and reported. With
+        ``flush_interval`` (seconds), calls are aggregated in process and the
+        hook receives one summary per interval (call and token totals, latency
+        histogram) instead of one payload per call; the last window is sent
+        from a timer thread when traffic stops, and at interpreter exit.
+        Without a hook, encode calls are not timed and build no result objects.
+        """
+        recorder = None
+        if callback is not None:
+            recorder = MetricsRecorder(
+                callback,
+                model=self._model,
+                backend_version=self._backend_version,
+                sample_rate=sample_rate,
+                flush_interval=flush_interval,
+                snapshot=self._cache_metrics,
+            )
+        self._runtime.set_metrics_recorder(recorder)
+
+    def enable_stats(self, enabled: bool = True) -> None:
+        """Collect per-operation latency and throughput stats for ``stats()``.
+
+        Encode, count and decode calls and their batch variants are timed
+        into per-thread histograms that are merged when read. Re-enabling
+        starts from empty stats; disabling drops them.
+        """
+        self._runtime.set_collect_stats(enabled)
+
+    def stats(self) -> Optional[dict[str, dict[str, object]]]:
+        """Return stats per operation, or ``None`` unless ``enable_stats`` was called.
+
+        Each operation reports call, item and token totals, characters read
+        (encode and count) or bytes produced (decode), time spent in calls
+        (``busy_s``) with the throughput over it, latency quantiles in
+        milliseconds and an input-size histogram. A batch is one call of
+        ``items`` texts.
+        """
+        stats = self._runtime.stats
+        return stats.snapshot() if stats is not None else None
+
+    def export_stats(self, target: Optional[StatsTarget] = None) -> str:
+        """Return the stats in Prometheus text format, also sent to ``target``.
+
+        ``target`` is a callable receiving the text or a path that is
+        replaced atomically (for example for node_exporter's textfile
+        collector). Series are labelled with the encoding name and operation.
+        """
+        stats = self._runtime.stats
+        if stats is None:
+            raise RuntimeError("stats are not enabled; call enable_stats() first")
+        text = stats.to_prometheus({"encoding": self.name})
+        if target is not None:
+            deliver(text, target)
+        return text
+
+    def flush_metrics(self) -> None:
+        """Send calls aggregated since the last ``flush_interval`` to the hook now."""
+        metrics = self._runtime.metrics
+        if metrics is not None:
+            metrics.flush()
+
+    def set_async_inline_threshold(self, threshold: int) -> None:
+        self._runtime.set_async_inline_threshold(threshold)
+
+    def set_batch_inline_threshold(self, threshold: int) -> None:
+        self._runtime.set_batch_inline_threshold(threshold)
+
+    def set_piece_cache_size(self, size: int) -> None:
+        """Cache the tokens of up to ``size`` pretokenized pieces; ``0`` disables it.
+
+        Repeated pieces (template words, JSON keys, identifiers) then skip the
+        BPE merge. Resizing starts from an empty cache.
+        """
+        self._runtime.set_piece_cache_size(size)
+        self._backend = self._runtime.configure_backend(self._backend)
+
+    def set_result_cache(self, max_bytes: int, ttl: Optional[float] = None) -> None:
+        """Memoize ``encode``/``encode_ordinary``/``count`` results for repeated texts.
+
+        The cache holds roughly ``max_bytes`` of texts and token tuples, evicts
+        least recently used entries and ignores entries older than ``ttl``
+        seconds. ``max_bytes=0`` disables it (the default).
+
+        Entries are keyed by the full text, so a hit still hashes and compares
+        the text, and it returns a new list copied from the cached tuple. A hit
+        therefore costs time linear in the text and token count. That is far
+        cheaper than encoding, but not free.
+        """
+        self._runtime.set_result_cache(max_bytes, ttl)
+
+    def result_cache_stats(self) -> Optional[dict[str, float]]:
+        cache = self._runtime.result_cache
+        return cache.stats() if cache is not None else None
+
+    def piece_cache_stats(self) -> Optional[dict[str, int]]:
+        """Return cumulative piece cache counters, or ``None`` when it is disabled."""
+        if not self._runtime.piece_cache_size:
+            return None
+        return self._backend.piece_cache_stats()
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
+    async def _run_async(self, call, size: int):
+        if size <= self._runtime.async_inline_threshold:
+            return call()
+        import asyncio  # Local import: only async callers pay for it.
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor.shared_executor(), call)
+
     def _normalize_allowed_special(
         self, allowed_special: Literal["all"] | AbstractSet[str]
     ) -> frozenset[str]:
@@ -322,103 +924,471 @@ class Encoding:
             return frozenset(self.special_tokens_set - allowed_special)
         return frozenset(disallowed_special or [])
 
-    def _encode_with_special(self, text: str, allowed_special: frozenset[str]) -> list[int]:
+    def _check_disallowed_special(self, text: str, disallowed: frozenset[str]) -> None:
+        if disallowed:
+            matcher = self._special_matcher(frozenset(), disallowed)
+            token = self._native(matcher.find_disallowed, text)
+            if token is not None:
+                raise_disallowed_special_token(token)
+
+    def _special_matcher(self, allowed: frozenset[str], disallowed: frozenset[str]):
+        """Return the backend matcher for this combination of special tokens.
+
+        Building the automaton costs far more than a scan, and callers tend to
+        reuse the same few sets, so matchers are cached on the instance.
+        """
+        key = (allowed, disallowed)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            if len(self._matchers) >= _MAX_SPECIAL_MATCHERS:
+                self._matchers.clear()
+            matcher = self._backend.special_matcher(sorted(allowed), sorted(disallowed))
+            self._matchers[key] = matcher
+        return matcher
+
+    def _record_result(
+        self,
+        tokens: Sequence[int],
+        elapsed_ms: float,
+        *,
+        truncated: bool = False,
+        text: Optional[str] = None,
+        char_offset: Optional[int] = None,
+        observe: bool = True,
+    ) -> TokenizationResult:
+        result = TokenizationResult(
+            token_ids=tokens,
+            token_strings=[],
+            total_tokens=len(tokens),
+            truncated=truncated,
+            elapsed_ms=elapsed_ms,
+            text=text,
+            char_offset=char_offset,
+        )
+        self._local.last_result = result
+        metrics = self._runtime.metrics
+        if observe and metrics is not None:
+            metrics.record(len(tokens), elapsed_ms)
+        return result
+
+    def _observe_batch(
+        self,
+        stats: Optional[OperationStats],
+        operation: str,
+        items: Sequence[str],
+        batch: Sequence[Sequence[int]],
+        elapsed_ns: int,
+    ) -> int:
+        total_tokens = sum(len(tokens) for tokens in batch)
+        if stats is not None:
+            chars = sum(len(item) for item in items)
+            stats.observe(operation, chars, total_tokens, elapsed_ns, len(items), chars=chars)
+        return total_tokens
+
+    def _cache_metrics(self) -> dict[str, object]:
+        data: dict[str, object] = {}
+        piece_cache = self.piece_cache_stats()
+        if piece_cache is not None:
+            data["piece_cache"] = piece_cache
+        result_cache = self.result_cache_stats()
+        if result_cache is not None:
+            data["result_cache"] = result_cache
+        return data
+
+    def _encode_text(
+        self, text: str, allowed: frozenset[str], disallowed: frozenset[str]
+    ) -> list[int]:
+        limit = self._runtime.chunk_limit or None
+        if self._runtime.result_cache is None:
+            return self._encode_with_special(text, allowed, disallowed, limit)
+        return self._memoized(
+            "encode",
+            text,
+            allowed,
+            disallowed,
+            lambda: self._encode_with_special(text, allowed, disallowed, limit),
+        )
+
+    def _memoized(
+        self,
+        kind: str,
+        text: str,
+        allowed: frozenset[str],
+        disallowed: frozenset[str],
+        compute: Callable[[], T],
+    ) -> T:
+        """Return ``compute()`` through the result cache.
+
+        Token lists are stored as tuples shared by every hit; callers get a
+        fresh list so mutating it cannot corrupt the cache, at the cost of one
+        copy per hit. Only successful results are cached, so a hit also means
+        the special-token checks and the chunk limit in the key passed.
+        """
+        cache = self._runtime.result_cache
+        key = (kind, text, allowed, disallowed, self._runtime.chunk_limit)
+        cached = cache.get(key)
+        if cached is not None:
+            return list(cached) if isinstance(cached, tuple) else cached
+        value = compute()
+        stored = tuple(value) if isinstance(value, list) else value
+        cache.put(key, stored, result_size(text, stored))
+        return value
+
+    def _encode_with_special(
+        self,
+        text: str,
+        allowed_special: frozenset[str],
+        disallowed_special: frozenset[str],
+        limit: Optional[int],
+    ) -> list[int]:
+        if not allowed_special and not disallowed_special:
+            return self._encode_plain(text, limit)
+
+        _check_text_length(text)
+        # One native pass both rejects disallowed tokens and splits on allowed
+        # ones, instead of a Python regex scan per set plus a call per segment.
+        matcher = self._special_matcher(allowed_special, disallowed_special)
+        try:
+            tokens = self._native(self._backend.encode_with_special, text, matcher, limit)
+        except _disallowed_special_error() as exc:
+            raise_disallowed_special_token(exc.args[0])
+        if tokens is None:
+            self._raise_chunk_limit_exceeded()
+        return tokens
+
+    def _count_with_special(
+        self,
+        text: str,
+        allowed_special: frozenset[str],
+        disallowed_special: frozenset[str],
+        limit: Optional[int],
+    ) -> Optional[int]:
+        matcher = self._special_matcher(allowed_special, disallowed_special)
+        try:
+            return self._native(self._backend.count_with_special, text, matcher, limit)
+        except _disallowed_special_error() as exc:
+            raise_disallowed_special_token(exc.args[0])
+
+    def _truncate(
+        self, text: str, max_tokens: int, side: str, allowed_special: frozenset[str]
+    ) -> tuple[list[int], int, bool]:
+        """Return ``(tokens, covered_chars, truncated)`` for ``Encoding.truncate``."""
         if not allowed_special:
-            tokens = self._encode_plain(text)
-            self._check_chunk_limit(len(tokens))
-            return tokens
+            if side == "head":
+                return self._backend.encode_head(text, max_tokens)
+            return self._backend.encode_tail(text, max_tokens)
 
-        regex = _special_token_regex(allowed_special)
         tokens: list[int] = []
-        last_index = 0
-        for match in regex.finditer(text):
-            if match.start() > last_index:
-                tokens.extend(self._encode_plain(text[last_index : match.start()]))
-            tokens.append(self._special_tokens[match.group()])
-            last_index = match.end()
-        if last_index < len(text):
-            tokens.extend(self._encode_plain(text[last_index:]))
-
-        self._check_chunk_limit(len(tokens))
-        return tokens
+        covered = 0
+        if side == "head":
+            for segment, special in self._split_special(text, allowed_special):
+                head, chars, cut = self._backend.encode_head(segment, max_tokens - len(tokens))
+                tokens.extend(head)
+                covered += chars
+                if cut:
+                    return tokens, covered, True
+                if special is not None:
+                    if len(tokens) == max_tokens:
+                        return tokens, covered, True
+                    tokens.append(self._special_tokens[special])
+                    covered += len(special)
+            return tokens, covered, False
+
+        chunks: list[list[int]] = []
+        count = 0
+        for segment, special in reversed(self._split_special(text, allowed_special)):
+            if special is not None:
+                if count == max_tokens:
+                    return _join_reversed(chunks), covered, True
+                chunks.append([self._special_tokens[special]])
+                count += 1
+                covered += len(special)
+            tail, chars, cut = self._backend.encode_tail(segment, max_tokens - count)
+            chunks.append(tail)
+            count += len(tail)
+            covered += chars
+            if cut:
+                return _join_reversed(chunks), covered, True
+        return _join_reversed(chunks), covered, False
+
+    def _chunk(
+        self, text: str | Iterable[str], max_tokens: int, overlap: int
+    ) -> Iterator[TokenWindow]:
+        window: deque[_Piece] = deque()
+        window_tokens = 0
+        # Whether the window holds pieces that have not been emitted yet.
+        fresh = False
+        for piece in self._iter_pieces(text):
+            tokens = piece[2]
+            if len(tokens) > max_tokens:
+                if fresh:
+                    yield _make_window(window)
+                window.clear()
+                window_tokens = 0
+                fresh = False
+                yield from self._split_piece(piece, max_tokens)
+                continue
+
+            if window_tokens + len(tokens) > max_tokens:
+                if fresh:
+                    yield _make_window(window)
+                    fresh = False
+                kept = 0
+                keep = 0
+                for _, _, previous in reversed(window):
+                    if kept + len(previous) > overlap:
+                        break
+                    kept += len(previous)
+                    keep += 1
+                while len(window) > keep:
+                    window.popleft()
+                window_tokens = kept
+                while window and window_tokens + len(tokens) > max_tokens:
+                    window_tokens -= len(window.popleft()[2])
+
+            window.append(piece)
+            window_tokens += len(tokens)
+            fresh = True
+        if fresh:
+            yield _make_window(window)
+
+    def _iter_pieces(self, text: str | Iterable[str]) -> Iterator[_Piece]:
+        parts = (text,) if isinstance(text, str) else text
+        pending = ""
+        offset = 0
+        threshold = _CHUNK_SEGMENT_CHARS
+        for part in parts:
+            for index in range(0, len(part), _CHUNK_SEGMENT_CHARS):
+                pending += part[index : index + _CHUNK_SEGMENT_CHARS]
+                if len(pending) < threshold:
+                    continue
+                pending, offset = yield from self._encode_segment(pending, offset, final=False)
+                # A single piece longer than the segment is held back whole;
+                # wait for more input before splitting it again.
+                threshold = max(_CHUNK_SEGMENT_CHARS, 2 * len(pending))
+        yield from self._encode_segment(pending, offset, final=True)
+
+    def _encode_segment(
+        self, text: str, offset: int, *, final: bool
+    ) -> Generator[_Piece, None, tuple[str, int]]:
+        """Yield the pieces of ``text`` and return the held-back remainder.
+
+        Unless ``final``, pieces the next segment could still change (see
+        ``_stable_length``) are returned for re-tokenization instead of being
+        yielded.
+        """
+        pieces, text = self._encode_pieces(text)
+        limit = len(text) if final else self._stable_length(text)
+        position = 0
+        for char_len, tokens in pieces:
+            if position + char_len > limit:
+                break
+            yield offset + position, text[position : position + char_len], tokens
+            position += char_len
+        return text[position:], offset + position
+
+    @staticmethod
+    def _stable_length(text: str) -> int:
+        """Return how much of ``text`` keeps its pieces whatever is appended.
+
+        Matching a piece looks at most three characters past its end (the
+        longest contraction suffix: ``they'`` splits differently once ``re``
+        follows), except that whitespace is matched as a whole run. So pieces
+        ending at least three characters before the trailing whitespace are
+        final. Under NFC, appended combining marks can also compose with the
+        last starter and the marks after it, so those stay open as well.
+        """
+        end = len(text)
+        while end and unicodedata.combining(text[end - 1]):
+            end -= 1
+        return max(min(len(text.rstrip()) - 3, end - 1), 0)
+
+    def _encode_pieces(self, text: str) -> tuple[list[tuple[int, list[int]]], str]:
+        """Return ``(char_len, tokens)`` per piece and the text they span.
+
+        The text is sanitized and normalized as the backend sees it (see
+        ``_normalized``), so piece lengths line up with it.
+        """
+        text = self._normalized(text)
+        return self._backend.encode_pieces(text), text
+
+    def _split_special(
+        self, text: str, allowed_special: frozenset[str]
+    ) -> list[tuple[str, Optional[str]]]:
+        """Return ``(segment, special)`` pairs; ``special`` is ``None`` for the tail.
+
+        The split comes from the backend matcher, so overlapping tokens such as
+        ``<|a|>`` and ``<|a|>b`` resolve leftmost-longest, exactly as in ``encode``.
+        """
+        if not allowed_special:
+            return [(text, None)]
+        matcher = self._special_matcher(allowed_special, frozenset())
+        return self._native(matcher.split, text)
+
+    def _special_segments(
+        self, text: str, allowed_special: frozenset[str]
+    ) -> Iterator[tuple[list[tuple[int, list[int]]], str, Optional[str]]]:
+        """Like ``_split_special``, with each segment as ``(char_len, tokens)`` pieces.
+
+        Segments are normalized one at a time, as ``encode`` does, and yielded
+        in that form so the piece lengths line up with them.
+        """
+        for segment, special in self._split_special(text, allowed_special):
+            pieces, segment = self._encode_pieces(segment) if segment else ([], segment)
+            yield pieces, segment, special
+
+    def _split_piece(self, piece: _Piece, max_tokens: int) -> Iterator[TokenWindow]:
+        start, text, tokens = piece
+        data = text.encode("utf-8")
+        consumed = 0
+        char_start = 0
+        for index in range(0, len(tokens), max_tokens):
+            part = tokens[index : index + max_tokens]
+            consumed += len(self._backend.decode_bytes(part))
+            char_end = len(data[:consumed].decode("utf-8", "ignore"))
+            yield TokenWindow(
+                token_ids=part,
+                text=text[char_start:char_end],
+                start=start + char_start,
+                end=start + char_end,
+            )
+            char_start = char_end
 
-    def _encode_plain(self, text: str) -> list[int]:
+    def _encode_plain(self, text: str, token_limit: Optional[int] = None) -> list[int]:
+        """Encode ``text``; with ``token_limit`` set, stop and raise once it is exceeded."""
         if not text:
             return []
-        if len(text) >= 1_000_000:
-            raise ValueError("Input too long to encode safely")
-        try:
-            tokens = self._backend.encode(text)
-        except UnicodeEncodeError:
-            sanitized = self._sanitize_text(text)
-            tokens = self._backend.encode(sanitized)
-        return list(tokens)
+        _check_text_length(text)
+        return list(self._native(self._encode_backend, text, token_limit))
+
+    def _encode_backend(self, text: str, token_limit: Optional[int]) -> list[int]:
+        if token_limit is None:
+            return self._backend.encode(text)
+        tokens = self._backend.encode_till_limit(text, token_limit)
+        if tokens is None:
+            self._raise_chunk_limit_exceeded()
+        return tokens
+
+    def _encode_plain_batch(self, texts: list[str], num_threads: int) -> list[list[int]]:
+        for item in texts:
+            _check_text_length(item)
+        limit = self._runtime.chunk_limit or None
+
+        def encode_slice(items: Sequence[str]) -> list[Optional[list[int]]]:
+            return self._native_batch(self._backend.encode_batch, items, limit)
 
-    def _check_chunk_limit(self, total_tokens: int) -> None:
+        batch = self._runtime.map_batch(
+            encode_slice, texts, num_threads, [len(item) for item in texts]
+        )
+        if any(tokens is None for tokens in batch):
+            self._raise_chunk_limit_exceeded()
+        return batch
+
+    def _raise_chunk_limit_exceeded(self) -> NoReturn:
+        # Bounded encoding stops at the first token past the limit, so only a
+        # lower bound on the full count is known.
         limit = self._runtime.chunk_limit
-        if limit and total_tokens > limit:
-            errors.raise_token_limit(total_tokens, limit)
+        errors.raise_token_limit(limit + 1, limit, exact=False)
 
     def _token_to_bytes(self, token: int) -> bytes:
+        return self._tables.token_bytes(token)
+
+    def _encode_bytes(self, data: bytes) -> list[int]:
+        return self._backend.encode_bytes(data)
+
+    def _native(self, func, text: str, *args):
+        """Call ``func(text, *args)``, retrying once with lone surrogates replaced.
+
+        The backend rejects text that is not valid UTF-8, so valid input, the
+        common case, is never scanned or copied on the Python side.
+        """
         try:
-            chunk = self._rank_to_bytes[token]
-        except IndexError as exc:  # pragma: no cover - invalid token
-            raise KeyError(f"Token id {token} is out of range for {self.name}") from exc
-        if not chunk:
-            raise KeyError(f"Token id {token} is not defined for {self.name}")
-        return chunk
+            return func(text, *args)
+        except UnicodeEncodeError:
+            return func(self._sanitize_text(text), *args)
 
-    def _build_rank_tables(self) -> None:
-        max_mergeable = max(self._mergeable_ranks.values(), default=-1)
-        max_special = max(self._special_tokens.values(), default=-1)
-        self.max_token_value = max(max_mergeable, max_special)
-        size = self.max_token_value + 1 if self.max_token_value >= 0 else 0
-        self._rank_to_bytes: list[bytes] = [b""] * size
-        for token_bytes, rank in self._mergeable_ranks.items():
-            if rank >= len(self._rank_to_bytes):
-                self._rank_to_bytes.extend([b""] * (rank + 1 - len(self._rank_to_bytes)))
-            self._rank_to_bytes[rank] = token_bytes
-        for token_str, value in self._special_tokens.items():
-            if value >= len(self._rank_to_bytes):
-                self._rank_to_bytes.extend([b""] * (value + 1 - len(self._rank_to_bytes)))
-            self._rank_to_bytes[value] = token_str.encode("utf-8")
-        self.max_token_value = len(self._rank_to_bytes) - 1 if self._rank_to_bytes else -1
-        self._special_token_values = frozenset(self._special_tokens.values())
+    def _native_batch(self, func, texts: Sequence[str], *args):
+        try:
+            return func(texts, *args)
+        except UnicodeEncodeError:
+            return func([self._sanitize_text(text) for text in texts], *args)
 
-    def _encode_bytes(self, data: bytes) -> list[int]:
-        return _bpe_encode_bytes(self._mergeable_ranks, data)
+    def _normalized(self, text: str) -> str:
+        """Return ``text`` as the backend tokenizes it, with character offsets to match.
 
-    def _sanitize_text(self, text: str) -> str:
+        Encodings that normalize their input (NFC for ``voyage3_base``) get
+        the normalized string; lone surrogates are replaced as in ``_native``.
+        """
         try:
-            text.encode("utf-8")
-            return text
+            normalized = self._backend.normalize(text)
         except UnicodeEncodeError:
-            return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+            text = self._sanitize_text(text)
+            normalized = self._backend.normalize(text)
+        return text if normalized is None else normalized
+
+    def _sanitize_text(self, text: str) -> str:
+        """Replace lone surrogates with U+FFFD (surrogate pairs are joined).
+
+        Hot paths do not call this up front; they go through ``_native`` and
+        only sanitize after the backend has rejected the text.
+        """
+        if text.isascii():  # O(1): reads a flag on the string object
+            return text
+        return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+
+def _load_tokenizer(bindings, encoding_name: str, tables: _VocabularyTables):
+    if registry.is_legacy(encoding_name):
+        # The legacy vocabularies are not compiled into the extension; hand it
+        # the token bytes in rank order and let it build the BPE tables once.
+        token_table = tables.mergeable_ranks
+        if len(token_table) != token_table.slots:
+            raise ValueError(f"Vocabulary for '{encoding_name}' has gaps in its ranks")
+        tokens = [token_table.token_bytes(rank) for rank in range(token_table.slots)]
+        backend = bindings.load_legacy_encoding(encoding_name, tokens)
+    else:
+        backend = bindings.tokenizer_for_encoding(encoding_name)
+    return backend.with_special_tokens(dict(tables.special_tokens))
+
+
+def _shared_backend(encoding_name: str, tables: _VocabularyTables) -> tuple[object, str]:
+    """Return the process-wide backend for ``encoding_name`` and its version."""
+    shared = _BACKENDS.get(encoding_name)
+    if shared is not None:
+        return shared
+    with _CACHE_LOCK:
+        shared = _BACKENDS.get(encoding_name)
+        if shared is None:
+            bindings = _load_backend()
+            shared = (
+                _load_tokenizer(bindings, encoding_name, tables),
+                getattr(bindings, "RUST_BACKEND_VERSION", "unknown"),
+            )
+            _BACKENDS[encoding_name] = shared
+        return shared
 
 
 def build_encoding_from_model(model_name: str) -> Encoding:
+    """Build a new Encoding for ``model_name`` with its own runtime state."""
     config = TokenizerConfiguration.for_model(model_name)
     runtime = TokenizerRuntime(config)
 
-    encoding_name = config.encoding
-    metadata = registry.ENCODING_CONSTRUCTORS[encoding_name]()
-    bindings = _load_backend()
-    backend = bindings.tokenizer_for_model(model_name)
-    backend_version = getattr(bindings, "RUST_BACKEND_VERSION", "unknown")
+    tables = _load_tables(config.encoding)
+    backend, backend_version = _shared_backend(config.encoding, tables)
+    if runtime.piece_cache_size:
+        backend = runtime.configure_backend(backend)
 
     return Encoding(
-        name=metadata["name"],
         model=model_name,
         runtime=runtime,
         backend=backend,
         backend_version=backend_version,
-        pat_str=metadata["pat_str"],
-        mergeable_ranks=metadata["mergeable_ranks"],
-        special_tokens=metadata["special_tokens"],
+        tables=tables,
     )
 
 
 def build_encoding_from_name(encoding_name: str) -> Encoding:
+    """Build a new Encoding for ``encoding_name`` with its own runtime state."""
     encoding_key = encoding_name.lower()
     if encoding_key not in registry.ENCODING_CONSTRUCTORS:
         raise errors.UnsupportedModelError(
@@ -429,38 +1399,59 @@ def build_encoding_from_name(encoding_name: str) -> Encoding:
     config = TokenizerConfiguration(
         model_name=encoding_key,
         encoding=encoding_key,
-        special_tokens=registry.ENCODING_CONSTRUCTORS[encoding_key]()["special_tokens"],
+        special_tokens=registry.get_special_tokens(encoding_key),
     )
     config.validate()
     runtime = TokenizerRuntime(config)
 
-    metadata = registry.ENCODING_CONSTRUCTORS[encoding_key]()
-    bindings = _load_backend()
-    backend = bindings.tokenizer_for_encoding(encoding_name)
-    backend_version = getattr(bindings, "RUST_BACKEND_VERSION", "unknown")
+    tables = _load_tables(encoding_key)
+    backend, backend_version = _shared_backend(encoding_key, tables)
+    if runtime.piece_cache_size:
+        backend = runtime.configure_backend(backend)
 
     return Encoding(
-        name=metadata["name"],
         model=encoding_name,
         runtime=runtime,
         backend=backend,
         backend_version=backend_version,
-        pat_str=metadata["pat_str"],
-        mergeable_ranks=metadata["mergeable_ranks"],
-        special_tokens=metadata["special_tokens"],
+        tables=tables,
     )
 
 
-@functools.lru_cache(maxsize=128)
-def _special_token_regex(tokens: AbstractSet[str]):
-    if not tokens:
-        raise ValueError("Cannot build regex for empty token set")
-    try:
-        import regex as re  # type: ignore
-    except ImportError:  # pragma: no cover - fallback for environments without regex
-        import re  # type: ignore
-    pattern = "|".join(re.escape(token) for token in tokens)
-    return re.compile(f"({pattern})")
+def get_encoding(encoding_name: str) -> Encoding:
+    """Return an Encoding for ``encoding_name``.
+
+    The vocabulary tables and backend are built once per process and shared;
+    each call returns a new lightweight instance with its own runtime, so
+    metrics hooks, caches and thresholds set on it stay private to the caller.
+    """
+    return build_encoding_from_name(encoding_name)
+
+
+def encoding_for_model(model_name: str) -> Encoding:
+    """Return an Encoding for ``model_name``; see ``get_encoding``."""
+    return build_encoding_from_model(model_name)
+
+
+def _make_window(pieces: Iterable[_Piece]) -> TokenWindow:
+    pieces = list(pieces)
+    text = "".join(piece[1] for piece in pieces)
+    start = pieces[0][0]
+    return TokenWindow(
+        token_ids=[token for piece in pieces for token in piece[2]],
+        text=text,
+        start=start,
+        end=start + len(text),
+    )
+
+
+def _join_reversed(chunks: list[list[int]]) -> list[int]:
+    return [token for chunk in reversed(chunks) for token in chunk]
+
+
+def _check_text_length(text: str) -> None:
+    if len(text) >= 1_000_000:
+        raise ValueError("Input too long to encode safely")
 
 
 def raise_disallowed_special_token(token: str) -> NoReturn:
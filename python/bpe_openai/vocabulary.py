@@ -0,0 +1,160 @@
+"""Compact binary vocabulary format that can be shared between processes.
+
+``scripts/sync_tokenizer_data.py`` converts each ``*.tiktoken.gz`` file into a
+``*.tiktoken.bin`` file with the layout below (all integers little-endian)::
+
+    header    magic (8 bytes), version, slots, defined, reserved  (u32 each)
+    offsets   (slots + 1) x u32  token bytes of rank r are blob[offsets[r]:offsets[r + 1]]
+    by_bytes  defined x u32      ranks ordered by token bytes, for reverse lookups
+    blob      token bytes concatenated in rank order
+
+The file is memory-mapped read-only, so every process that loads the same
+vocabulary shares its pages through the OS page cache and no per-token Python
+objects are created until they are asked for.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Mapping, Optional, Union
+
+from ._util import to_little_endian
+
+MAGIC = b"BPEVOCAB"
+VERSION = 1
+SUFFIX = ".tiktoken.bin"
+
+_HEADER = struct.Struct("<8sIIII")
+
+
+def read_tiktoken(handle: BinaryIO) -> Dict[bytes, int]:
+    """Parse a gzip-compressed ``.tiktoken`` stream into a rank dictionary."""
+    mergeable: Dict[bytes, int] = {}
+    with gzip.open(handle, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            token_b64, rank_str = line.split(" ")
+            mergeable[base64.b64decode(token_b64)] = int(rank_str)
+    return mergeable
+
+
+def serialize(ranks: Mapping[bytes, int]) -> bytes:
+    """Encode a rank dictionary in the binary vocabulary format."""
+    slots = max(ranks.values(), default=-1) + 1
+    by_rank = [b""] * slots
+    for token, rank in ranks.items():
+        by_rank[rank] = token
+
+    offsets = array("I", [0])
+    blob = bytearray()
+    for token in by_rank:
+        blob += token
+        offsets.append(len(blob))
+    by_bytes = array("I", sorted(ranks.values(), key=by_rank.__getitem__))
+
+    header = _HEADER.pack(MAGIC, VERSION, slots, len(ranks), 0)
+    return (
+        header
+        + to_little_endian(offsets).tobytes()
+        + to_little_endian(by_bytes).tobytes()
+        + bytes(blob)
+    )
+
+
+def write(ranks: Mapping[bytes, int], path: Path) -> None:
+    """Atomically write ``ranks`` to ``path`` in the binary vocabulary format."""
+    partial = path.with_name(path.name + ".partial")
+    partial.write_bytes(serialize(ranks))
+    os.replace(partial, path)
+
+
+def _u32_view(view: memoryview) -> Union[memoryview, array]:
+    if sys.byteorder == "little":
+        return view.cast("I")
+    return to_little_endian(array("I", view.tobytes()))  # pragma: no cover - big-endian hosts
+
+
+class TokenTable(Mapping[bytes, int]):
+    """Read-only ``bytes -> rank`` mapping over a binary vocabulary buffer."""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        view = memoryview(buffer)
+        magic, version, slots, defined, _ = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unrecognised binary vocabulary format")
+
+        start = _HEADER.size
+        self._offsets = _u32_view(view[start : start + 4 * (slots + 1)])
+        start += 4 * (slots + 1)
+        self._by_bytes = _u32_view(view[start : start + 4 * defined])
+        start += 4 * defined
+        self._blob = view[start:]
+        self._buffer = buffer
+        self._defined = defined
+        self.slots = slots
+
+    @classmethod
+    def open(cls, path: Path) -> "TokenTable":
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    @classmethod
+    def from_ranks(cls, ranks: Mapping[bytes, int]) -> "TokenTable":
+        return cls(serialize(ranks))
+
+    def token_bytes(self, rank: int) -> bytes:
+        """Return the bytes for ``rank``; unused ranks map to ``b""``."""
+        if not 0 <= rank < self.slots:
+            raise IndexError(rank)
+        return self._blob[self._offsets[rank] : self._offsets[rank + 1]].tobytes()
+
+    def rank_of(self, token: bytes) -> Optional[int]:
+        low, high = 0, self._defined
+        while low < high:
+            middle = (low + high) // 2
+            rank = self._by_bytes[middle]
+            candidate = self.token_bytes(rank)
+            if candidate < token:
+                low = middle + 1
+            elif candidate > token:
+                high = middle
+            else:
+                return rank
+        return None
+
+    def to_dict(self) -> Dict[bytes, int]:
+        offsets = self._offsets
+        blob = self._blob
+        return {
+            blob[offsets[rank] : offsets[rank + 1]].tobytes(): rank
+            for rank in range(self.slots)
+            if offsets[rank] != offsets[rank + 1]
+        }
+
+    def __getitem__(self, token: bytes) -> int:
+        rank = self.rank_of(token)
+        if rank is None:
+            raise KeyError(token)
+        return rank
+
+    def __contains__(self, token: object) -> bool:
+        return isinstance(token, bytes) and self.rank_of(token) is not None
+
+    def __iter__(self) -> Iterator[bytes]:
+        for rank in range(self.slots):
+            token = self.token_bytes(rank)
+            if token:
+                yield token
+
+    def __len__(self) -> int:
+        return self._defined
@@ -0,0 +1,60 @@
+"""Sample texts and helpers shared by the unit, integration and performance tests."""
+
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+import pytest
+
+# Two sentences ending in a space, so repeating them gives well-formed prose.
+PROSE = "On ne voit bien qu'avec le cœur. L'essentiel est invisible pour les yeux. "
+
+# Short inputs covering the pretokenizer's edge cases: empty input, accents and
+# contractions, CJK, emoji, runs of spaces and newlines, digit groups and
+# trailing whitespace.
+SAMPLES = (
+    "",
+    "short chat turn",
+    "On ne voit bien qu'avec le cœur.",
+    "迅速な茶色の狐が怠惰な犬を飛び越える。",
+    "🌟🚀✨ Reaching for the stars",
+    "Hello world! Don't   stop\n\n  believing. Numbers: 1234567 and 3.14159",
+    "def f(x):\n    return x  \n\n\n    # trailing   ",
+)
+
+
+@pytest.fixture
+def prose() -> str:
+    return PROSE
+
+
+@pytest.fixture
+def mixed_text() -> str:
+    """Prose mixing Latin, CJK, Hangul and multi-byte emoji."""
+    return "On ne voit bien qu'avec le cœur. 迅速な茶色の狐 😀😀 보라, 세계는"
+
+
+@pytest.fixture
+def samples() -> list[str]:
+    return list(SAMPLES)
+
+
+@pytest.fixture(params=SAMPLES, ids=[f"sample_{index}" for index in range(len(SAMPLES))])
+def sample(request: pytest.FixtureRequest) -> str:
+    return request.param
+
+
+def _best_of(runs: int, func: Callable[[], object]) -> float:
+    """Return the fastest of ``runs`` timings of ``func()``, in seconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.fixture
+def best_of() -> Callable[[int, Callable[[], object]], float]:
+    return _best_of
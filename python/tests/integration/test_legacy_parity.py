@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+import bpe_openai as candidate
+
+
+FIXTURES = Path(__file__).resolve().parents[2] / "tests" / "performance" / "fixtures"
+LEGACY_ENCODINGS = ["gpt2", "r50k_base", "p50k_base", "p50k_edit"]
+
+
+try:  # pragma: no cover - optional dependency
+    import tiktoken
+except Exception:  # pragma: no cover
+    tiktoken = None
+
+
+def load_corpus() -> list[str]:
+    return [path.read_text(encoding="utf-8") for path in sorted(FIXTURES.glob("*.txt"))]
+
+
+@pytest.mark.skipif(tiktoken is None, reason="tiktoken not available")
+@pytest.mark.parametrize("encoding_name", LEGACY_ENCODINGS)
+def test_legacy_encoding_matches_tiktoken_on_benchmark_corpus(encoding_name: str) -> None:
+    try:
+        baseline = tiktoken.get_encoding(encoding_name)
+    except Exception as exc:  # pragma: no cover
+        pytest.skip(f"tiktoken unavailable: {exc}")
+
+    encoding = candidate.get_encoding(encoding_name)
+    for text in load_corpus():
+        expected = baseline.encode(text, disallowed_special=())
+        assert encoding.encode(text, disallowed_special=()) == expected
+        assert encoding.decode(expected) == text
@@ -16,5 +16,21 @@ def test_long_inputs_trigger_chunk_limit_error() -> None:
     with pytest.raises(candidate.TokenLimitError) as excinfo:  # type: ignore[attr-defined]
         encoding.encode(long_text)
 
-    assert "chunk limit" in str(excinfo.value).lower()
-    assert "210000" in str(excinfo.value)
+    error = excinfo.value
+    assert "chunk limit" in str(error).lower()
+    # Encoding stops once the limit is crossed, so the count is a lower bound.
+    assert not error.exact
+    assert error.chunk_limit < error.token_count <= 210_000
+    assert f"at least {error.token_count}" in str(error)
+
+
+def test_chunk_limit_applies_to_every_encode_path() -> None:
+    encoding = candidate.encoding_for_model("gpt-4o")
+    long_text = "一" * 210_000
+
+    with pytest.raises(candidate.TokenLimitError):  # type: ignore[attr-defined]
+        encoding.encode_ordinary(long_text)
+    with pytest.raises(candidate.TokenLimitError):  # type: ignore[attr-defined]
+        encoding.encode_batch(["short", long_text], num_threads=2)
+    with pytest.raises(candidate.TokenLimitError):  # type: ignore[attr-defined]
+        encoding.encode(long_text + "<|endoftext|>", allowed_special="all")
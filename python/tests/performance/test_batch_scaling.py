@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+import bpe_openai as candidate
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def read_prompt() -> str:
+    return (FIXTURES / "long_form_prompt.txt").read_text(encoding="utf-8")
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="needs at least 4 cores to observe scaling")
+def test_encode_batch_throughput_scales_with_threads(best_of) -> None:
+    encoding = candidate.encoding_for_model("gpt-4o")
+    # Each item is large enough that the Rust work dominates the per-call
+    # Python overhead, so the speed-up only shows if the GIL is released.
+    batch = [read_prompt() * 400] * 64
+
+    serial = best_of(3, lambda: encoding.encode_ordinary_batch(batch, num_threads=1))
+    parallel = best_of(3, lambda: encoding.encode_ordinary_batch(batch, num_threads=4))
+
+    assert parallel < serial / 1.5, (
+        f"Expected num_threads=4 to beat num_threads=1 by 1.5x, "
+        f"saw {serial * 1_000:.1f}ms vs {parallel * 1_000:.1f}ms"
+    )
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="needs at least 4 cores to observe scaling")
+def test_decode_batch_throughput_scales_with_threads(best_of) -> None:
+    encoding = candidate.encoding_for_model("gpt-4o")
+    tokens = encoding.encode(read_prompt() * 400)
+    batch = [tokens] * 64
+
+    serial = best_of(3, lambda: encoding.decode_batch(batch, num_threads=1))
+    parallel = best_of(3, lambda: encoding.decode_batch(batch, num_threads=4))
+
+    assert parallel <= serial * 1.1, (
+        f"decode_batch should not slow down with more threads, "
+        f"saw {serial * 1_000:.1f}ms vs {parallel * 1_000:.1f}ms"
+    )
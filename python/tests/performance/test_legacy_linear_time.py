@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+LEGACY_ENCODINGS = ["r50k_base", "p50k_base"]
+# Runs of one character or of whitespace defeat the pretokenizer's splits and
+# hand the whole run to BPE as a single piece, which is where a quadratic
+# encoder shows up.
+PATHOLOGICAL = {"letters": "a", "spaces": " ", "newlines": "\n", "digits": "7"}
+
+
+@pytest.mark.parametrize("encoding_name", LEGACY_ENCODINGS)
+@pytest.mark.parametrize("unit", PATHOLOGICAL.values(), ids=PATHOLOGICAL.keys())
+def test_legacy_encode_is_linear_on_long_runs(encoding_name: str, unit: str, best_of) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    small, large = unit * 25_000, unit * 100_000
+
+    small_s = best_of(3, lambda: encoding.encode_ordinary(small))
+    large_s = best_of(3, lambda: encoding.encode_ordinary(large))
+
+    # Four times the input should cost about four times as much; a quadratic
+    # encoder would need sixteen.
+    assert large_s < 8 * small_s + 0.005, (
+        f"expected linear scaling on {encoding_name}, saw {small_s * 1_000:.1f}ms for "
+        f"{len(small)} chars vs {large_s * 1_000:.1f}ms for {len(large)} chars"
+    )
+    assert encoding.decode(encoding.encode_ordinary(large)) == large
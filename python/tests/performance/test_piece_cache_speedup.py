@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import random
+
+import bpe_openai as candidate
+
+
+SYSTEM_PROMPT = (
+    "You are a customer support assistant for an online store. Answer briefly, "
+    "quote the order number, and reply with a JSON object containing the keys "
+    '"order_id", "status", "eta_days" and "next_action".'
+)
+TURNS = [
+    "Where is my order {order}? It was supposed to arrive on {day}.",
+    "I need to change the shipping address for order {order} to {city}.",
+    "Can I return item {sku} from order {order}? It arrived damaged.",
+]
+
+
+def templated_chat_corpus(conversations: int) -> list[str]:
+    rng = random.Random(1234)
+    corpus = []
+    for _ in range(conversations):
+        turn = rng.choice(TURNS).format(
+            order=rng.randrange(10_000, 99_999),
+            day=rng.choice(["Monday", "Tuesday", "Friday"]),
+            city=rng.choice(["Lisbon", "Osaka", "Denver"]),
+            sku=f"SKU-{rng.randrange(100, 999)}",
+        )
+        reply = (
+            '{"order_id": %d, "status": "in_transit", "eta_days": %d, '
+            '"next_action": "none"}' % (rng.randrange(10_000, 99_999), rng.randrange(1, 9))
+        )
+        corpus.append(f"<system>{SYSTEM_PROMPT}</system>\n<user>{turn}</user>\n{reply}\n")
+    return corpus
+
+
+def test_piece_cache_speeds_up_templated_chat(best_of) -> None:
+    corpus = templated_chat_corpus(2_000)
+    plain = candidate.build_encoding_from_name("o200k_base")
+    cached = candidate.build_encoding_from_name("o200k_base")
+    cached.set_piece_cache_size(8_192)
+
+    def encode_all(encoding) -> None:
+        for text in corpus:
+            encoding.encode_ordinary(text)
+
+    encode_all(cached)  # warm the cache
+    uncached_s = best_of(3, lambda: encode_all(plain))
+    cached_s = best_of(3, lambda: encode_all(cached))
+
+    stats = cached.piece_cache_stats()
+    assert stats is not None
+    hit_rate = stats["hits"] / (stats["hits"] + stats["misses"])
+    assert hit_rate > 0.9, f"expected a warm cache, saw {hit_rate:.1%} hits"
+    assert cached_s < uncached_s, (
+        f"piece cache should beat plain BPE on templated input, "
+        f"saw {uncached_s * 1_000:.1f}ms uncached vs {cached_s * 1_000:.1f}ms cached"
+    )
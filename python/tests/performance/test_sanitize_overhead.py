@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+ONE_MB = 1 << 20
+
+SAMPLES = {
+    "ascii": "The quick brown fox jumps over the lazy dog. ",
+    "latin": "Les élèves ont déjà étudié la leçon à côté du château. ",
+    "cjk": "東京は日本の首都であり、世界有数の大都市です。",
+    "emoji": "launch 🚀 party 🎉 ",
+}
+
+
+@pytest.mark.parametrize("sample", sorted(SAMPLES))
+def test_valid_input_is_not_copied_before_reaching_the_backend(sample: str, best_of) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = SAMPLES[sample] * (ONE_MB // len(SAMPLES[sample].encode("utf-8")))
+
+    # disallowed_special=() skips the special-token scan, so the wrapper adds
+    # only its own bookkeeping on top of the backend call. Runs alternate so
+    # drift in machine speed affects both timings alike.
+    wrapped, native = float("inf"), float("inf")
+    for _ in range(5):
+        wrapped = min(wrapped, best_of(1, lambda: encoding.count(text, disallowed_special=())))
+        native = min(native, best_of(1, lambda: encoding._backend.count(text)))
+    copy = best_of(5, lambda: text.encode("utf-8"))
+
+    overhead = wrapped - native
+    assert overhead < copy or wrapped < native * 1.05, (
+        f"{sample}: count() took {wrapped * 1e3:.2f}ms on 1 MB against {native * 1e3:.2f}ms "
+        f"in the backend; a UTF-8 validation copy costs {copy * 1e6:.0f}us"
+    )
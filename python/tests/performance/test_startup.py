@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[2]
+
+# Importing the package must stay cheap: no vocabulary is decoded until an
+# Encoding is requested. The budget is generous to absorb CI noise while still
+# catching an accidental eager load, which costs hundreds of milliseconds.
+IMPORT_BUDGET_MS = 250.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import bpe_openai
+elapsed_ms = (time.perf_counter() - start) * 1_000
+from bpe_openai import registry
+loaded = registry.load_token_table.cache_info().currsize
+bpe_openai.encoding_name_for_model("gpt-4o")
+bpe_openai.list_supported_models()
+if sys.argv[1:]:
+    bpe_openai.get_encoding(sys.argv[1])
+print(json.dumps({
+    "elapsed_ms": elapsed_ms,
+    "loaded_at_import": loaded,
+    "loaded_total": registry.load_token_table.cache_info().currsize,
+}))
+"""
+
+
+def run_probe(*args: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=PACKAGE_ROOT,
+        env={**os.environ, "PYTHONPATH": str(PACKAGE_ROOT)},
+    )
+    return json.loads(completed.stdout)
+
+
+def test_import_does_not_load_rank_tables() -> None:
+    report = run_probe()
+
+    assert report["loaded_at_import"] == 0
+    assert report["loaded_total"] == 0, "metadata lookups must not load rank tables"
+
+
+def test_import_time_within_budget() -> None:
+    elapsed = min(run_probe()["elapsed_ms"] for _ in range(3))
+
+    assert elapsed < IMPORT_BUDGET_MS, (
+        f"import bpe_openai took {elapsed:.1f}ms, budget is {IMPORT_BUDGET_MS}ms"
+    )
+
+
+def test_get_encoding_loads_only_requested_vocabulary() -> None:
+    report = run_probe("cl100k_base")
+
+    assert report["loaded_total"] == 1
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import bpe_openai as candidate
+
+
+def test_async_results_match_sync_calls(prose: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    large = prose * 200
+
+    async def run():
+        return await asyncio.gather(
+            encoding.encode_async(prose),
+            encoding.encode_async(large),
+            encoding.encode_batch_async([prose, large]),
+            encoding.count_async(large),
+            encoding.decode_async(encoding.encode(large)),
+        )
+
+    small_tokens, large_tokens, batch, count, decoded = asyncio.run(run())
+
+    assert small_tokens == encoding.encode(prose)
+    assert large_tokens == encoding.encode(large)
+    assert batch == [small_tokens, large_tokens]
+    assert count == len(large_tokens)
+    assert decoded == large
+
+
+def test_threshold_controls_offloading(prose: str) -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    caller = threading.get_ident()
+    seen: list[int] = []
+    encoding.set_metrics_hook(lambda payload: seen.append(threading.get_ident()))
+
+    async def run() -> None:
+        await encoding.encode_async(prose)
+        encoding.set_async_inline_threshold(0)
+        await encoding.encode_async(prose)
+
+    asyncio.run(run())
+
+    assert seen[0] == caller
+    assert seen[1] != caller
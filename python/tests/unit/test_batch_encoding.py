@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+def test_encode_batch_matches_per_item_encode(samples: list[str]) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    expected = [encoding.encode(item) for item in samples]
+
+    assert encoding.encode_batch(samples, num_threads=4) == expected
+    assert encoding.encode_ordinary_batch(samples, num_threads=4) == expected
+
+
+def test_encode_batch_with_allowed_special_matches_per_item_encode() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    batch = ["hello <|endoftext|> world", "no markers here"]
+
+    expected = [encoding.encode(item, allowed_special="all") for item in batch]
+
+    assert encoding.encode_batch(batch, allowed_special="all") == expected
+
+
+def test_encode_batch_rejects_disallowed_special() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.encode_batch(["fine", "not <|endoftext|> fine"])
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai.tokenizer import _CHUNK_SEGMENT_CHARS
+
+
+@pytest.fixture
+def text(prose: str) -> str:
+    return (prose.rstrip(" ") + "\n") * 50
+
+
+def test_windows_cover_text_without_overlap(text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    windows = list(encoding.chunk(text, 32))
+
+    assert all(len(window.token_ids) <= 32 for window in windows)
+    assert "".join(window.text for window in windows) == text
+    assert [token for window in windows for token in window.token_ids] == encoding.encode(text)
+    for window in windows:
+        assert text[window.start : window.end] == window.text
+
+
+def test_windows_share_overlap_tokens(text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    windows = list(encoding.chunk(text, 32, overlap=8))
+
+    assert all(len(window.token_ids) <= 32 for window in windows)
+    assert windows[0].start == 0 and windows[-1].end == len(text)
+    for previous, current in zip(windows, windows[1:]):
+        assert previous.start < current.start <= previous.end
+        shared = previous.end - current.start
+        assert len(encoding.encode(text[current.start : current.start + shared])) <= 8
+
+
+def test_iterable_input_matches_string_input(text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    parts = [text[index : index + 37] for index in range(0, len(text), 37)]
+
+    assert list(encoding.chunk(parts, 16)) == list(encoding.chunk(text, 16))
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+@pytest.mark.parametrize("split", ["they'|re", "they|'re", "can'|t", "1234|5678", "end.|\n\n"])
+def test_piece_straddling_a_segment_seam(encoding_name: str, split: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    head, tail = split.split("|")
+    padding = _CHUNK_SEGMENT_CHARS - len(head)
+    text = "word " * (padding // 5) + " " * (padding % 5) + head + tail + " and more."
+    assert text[:_CHUNK_SEGMENT_CHARS].endswith(head)
+
+    pieces = [(len(piece), tokens) for _, piece, tokens in encoding._iter_pieces(text)]
+    windows = list(encoding.chunk(text, 512))
+
+    assert pieces == encoding._encode_pieces(text)[0]
+    assert [token for window in windows for token in window.token_ids] == encoding.encode(text)
+    assert "".join(window.text for window in windows) == text
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "voyage3_base"])
+def test_decomposed_text_matches_encode(encoding_name: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    text = "Cafe\u0301 au lait, re\u0301sume\u0301 " * 4_000
+    # Split every part between a base letter and its combining mark.
+    parts = text.split("\u0301")
+    parts = [part + "\u0301" for part in parts[:-1]] + parts[-1:]
+    parts = [piece for part in parts for piece in (part[:-1], part[-1:])]
+
+    for source in (text, parts):
+        windows = list(encoding.chunk(source, 64))
+        tokens = [token for window in windows for token in window.token_ids]
+        assert tokens == encoding.encode(text)
+        assert "".join(window.text for window in windows) == encoding.decode(tokens)
+
+
+def test_oversized_piece_is_split_on_token_boundaries() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "intro " + " " * 200 + "outro"
+
+    windows = list(encoding.chunk(text, 4))
+
+    assert all(len(window.token_ids) <= 4 for window in windows)
+    assert "".join(window.text for window in windows) == text
+
+
+def test_chunk_handles_inputs_beyond_the_encode_guard() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "word " * 250_000
+
+    windows = encoding.chunk(text, 512, overlap=64)
+    first = next(windows)
+
+    assert len(first.token_ids) <= 512
+    assert sum(1 for _ in windows) > 0
+
+
+def test_chunk_validates_arguments(text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(ValueError):
+        encoding.chunk(text, 0)
+    with pytest.raises(ValueError):
+        encoding.chunk(text, 8, overlap=8)
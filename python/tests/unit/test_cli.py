@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+from array import array
+from pathlib import Path
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai import cli
+
+
+@pytest.fixture()
+def text(samples: list[str]) -> str:
+    return "\n".join(samples[1:5]) + "\n"
+
+
+@pytest.fixture()
+def corpus(tmp_path: Path, text: str) -> Path:
+    root = tmp_path / "logs"
+    (root / "nested").mkdir(parents=True)
+    (root / "a.txt").write_text(text, encoding="utf-8")
+    (root / "nested" / "b.txt").write_text(text * 3, encoding="utf-8")
+    return root
+
+
+def test_count_files_and_directories(
+    corpus: Path, text: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    assert cli.main(["count", str(corpus), "--jobs", "2"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    expected = [len(encoding.encode_ordinary(text)), len(encoding.encode_ordinary(text * 3))]
+    assert [int(line.split("\t")[0]) for line in lines] == expected + [sum(expected)]
+    assert lines[-1].endswith("\ttotal")
+
+
+def test_count_lines_as_jsonl(
+    corpus: Path, text: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    cli.main(["count", str(corpus / "a.txt"), "--lines", "--format", "jsonl", "--model", "gpt-4o"])
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    o200k = candidate.get_encoding("o200k_base")
+    lines = text.splitlines()
+    assert [record["line"] for record in records] == list(range(1, len(lines) + 1))
+    assert [record["tokens"] for record in records] == [o200k.count(line) for line in lines]
+
+
+def test_count_lines_treats_special_tokens_as_text(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    path = tmp_path / "special.txt"
+    lines = ["first <|endoftext|> line", "<|endoftext|>"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    encoding = candidate.get_encoding("cl100k_base")
+
+    assert cli.main(["count", str(path), "--lines"]) == 0
+
+    counts = [int(line.split("\t")[0]) for line in capsys.readouterr().out.splitlines()]
+    assert counts[:-1] == [len(encoding.encode_ordinary(line)) for line in lines]
+
+
+def test_encode_bin_round_trips_through_decode(
+    corpus: Path, text: str, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    output = tmp_path / "tokens.bin"
+    offsets = tmp_path / "tokens.idx"
+
+    cli.main(
+        [
+            "encode",
+            str(corpus / "a.txt"),
+            "--format",
+            "bin",
+            "-o",
+            str(output),
+            "--offsets",
+            str(offsets),
+        ]
+    )
+
+    tokens = array("I")
+    tokens.frombytes(output.read_bytes())
+    assert tokens.tolist() == encoding.encode_ordinary(text)
+    index = array("Q")
+    index.frombytes(offsets.read_bytes())
+    assert index.tolist() == [0, len(tokens)]
+
+    cli.main(["decode", str(output), "--format", "bin"])
+    assert capsys.readouterr().out == text
+
+
+def test_encode_jsonl_lines_and_decode(
+    corpus: Path, text: str, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    output = tmp_path / "tokens.jsonl"
+
+    cli.main(["encode", str(corpus / "a.txt"), "--lines", "-o", str(output)])
+    cli.main(["decode", str(output)])
+
+    decoded = [json.loads(line)["text"] for line in capsys.readouterr().out.splitlines()]
+    assert decoded == text.splitlines()
+
+
+def test_encode_npy(corpus: Path, text: str, tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    encoding = candidate.get_encoding("cl100k_base")
+    output = tmp_path / "tokens.npy"
+
+    cli.main(["encode", str(corpus / "a.txt"), "--format", "npy", "-o", str(output)])
+
+    assert np.load(output).tolist() == encoding.encode_ordinary(text)
+
+
+def test_encode_streams_blocks_and_keeps_the_shared_pool_size(
+    corpus: Path, text: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    from bpe_openai import executor
+
+    monkeypatch.setattr(cli, "_BLOCK_CHARS", 16)
+    workers = executor.max_workers()
+    encoding = candidate.get_encoding("cl100k_base")
+    batches: list[int] = []
+    write_batches = cli._TokenSink.write_batches
+
+    def spy(self, stream, **fields):
+        def counted():
+            for tokens in stream:
+                batches.append(len(tokens))
+                yield tokens
+
+        write_batches(self, counted(), **fields)
+
+    monkeypatch.setattr(cli._TokenSink, "write_batches", spy)
+
+    assert cli.main(["encode", str(corpus), "--jobs", "3"]) == 0
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["tokens"] for record in records] == [
+        encoding.encode_ordinary(text),
+        encoding.encode_ordinary(text * 3),
+    ]
+    assert len(batches) > len(records)  # written block by block, not per file
+    assert executor.max_workers() == workers
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+def test_decode_round_trips_and_matches_token_bytes(samples: list[str]) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    for text in samples:
+        tokens = encoding.encode(text)
+        assert encoding.decode(tokens) == text
+        assert encoding.decode_bytes(tokens) == text.encode("utf-8")
+        assert b"".join(encoding.decode_tokens_bytes(tokens)) == text.encode("utf-8")
+
+
+def test_decode_handles_special_tokens() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    tokens = encoding.encode("hi <|endoftext|>", allowed_special="all")
+
+    assert encoding.decode(tokens) == "hi <|endoftext|>"
+    assert encoding.decode_tokens_bytes([encoding.eot_token]) == [b"<|endoftext|>"]
+
+
+def test_decode_errors_argument_applies_to_partial_characters() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    tokens = [
+        token
+        for token in encoding.encode("😀")
+        if len(encoding.decode_single_token_bytes(token)) < 4
+    ]
+    if not tokens:
+        pytest.skip("emoji is a single token in this vocabulary")
+
+    assert "�" in encoding.decode(tokens[:1])
+    with pytest.raises(UnicodeDecodeError):
+        encoding.decode(tokens[:1], errors="strict")
+
+
+def test_decode_batch_matches_decode(samples: list[str]) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    batch = [encoding.encode(text) for text in samples]
+
+    assert encoding.decode_batch(batch, num_threads=2) == samples
+    assert encoding.decode_bytes_batch(batch) == [text.encode("utf-8") for text in samples]
+
+
+def test_decode_rejects_undefined_token() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(KeyError):
+        encoding.decode([encoding.max_token_value + 1])
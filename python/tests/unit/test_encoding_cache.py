@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bpe_openai as candidate
+
+
+def test_get_encoding_shares_vocabulary_and_backend() -> None:
+    first = candidate.get_encoding("cl100k_base")
+    second = candidate.get_encoding("CL100K_BASE")
+
+    assert first is not second
+    assert first._tables is second._tables
+    assert first._backend is second._backend
+    assert (
+        candidate.encoding_for_model("gpt-4o")._tables
+        is candidate.get_encoding("o200k_base")._tables
+    )
+
+
+def test_cache_is_thread_safe() -> None:
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        encodings = list(pool.map(lambda _: candidate.get_encoding("o200k_base"), range(32)))
+
+    assert all(encoding._backend is encodings[0]._backend for encoding in encodings)
+
+
+def test_get_encoding_callers_do_not_share_runtime_state() -> None:
+    first = candidate.get_encoding("cl100k_base")
+    first.set_metrics_hook(lambda payload: None)
+    first.set_piece_cache_size(64)
+    first.set_result_cache(1 << 20)
+    first.enable_stats()
+    first.set_async_inline_threshold(0)
+
+    second = candidate.get_encoding("cl100k_base")
+
+    assert second._runtime.metrics is None
+    assert second._runtime.piece_cache_size == 0
+    assert second._runtime.result_cache is None
+    assert second.stats() is None
+    assert second._runtime.async_inline_threshold > 0
+    assert second.encode("still plain") == first.encode("still plain")
+
+
+def test_built_encodings_share_vocabulary_but_not_runtime_state() -> None:
+    first = candidate.build_encoding_from_name("cl100k_base")
+    second = candidate.build_encoding_from_name("cl100k_base")
+    payloads: list[dict] = []
+
+    first.set_metrics_hook(payloads.append)
+    second.encode("not observed")
+    first.encode("observed")
+
+    assert first._tables is second._tables
+    assert len(payloads) == 1
+
+
+def test_mergeable_ranks_are_read_only() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(TypeError):
+        encoding._mergeable_ranks[b"new"] = 1  # type: ignore[index]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+
+import bpe_openai as candidate
+
+
+def test_token_by_token_decoding_never_emits_replacement_characters(mixed_text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    tokens = encoding.encode(mixed_text)
+    decoder = encoding.incremental_decoder()
+
+    pieces = [decoder.decode(token) for token in tokens]
+    pieces.append(decoder.flush())
+
+    assert "".join(pieces) == mixed_text
+    assert all("�" not in piece for piece in pieces)
+
+
+def test_stream_accepts_token_batches(mixed_text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    tokens = encoding.encode(mixed_text)
+    batches = [tokens[index : index + 3] for index in range(0, len(tokens), 3)]
+
+    assert "".join(encoding.incremental_decoder().stream(batches)) == mixed_text
+
+
+def test_flush_replaces_truncated_character() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    decoder = encoding.incremental_decoder()
+    data = "😀".encode("utf-8")
+    partial = [encoding.encode_single_token(bytes([byte])) for byte in data[:2]]
+
+    assert decoder.decode(partial) == ""
+    assert decoder.flush() == "�"
+
+
+def test_async_stream(mixed_text: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    tokens = encoding.encode(mixed_text)
+
+    async def produce():
+        for token in tokens:
+            yield token
+
+    async def collect() -> str:
+        return "".join([text async for text in encoding.incremental_decoder().astream(produce())])
+
+    assert asyncio.run(collect()) == mixed_text
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+import bpe_openai as candidate
+
+
+def random_deltas(text: str, rng: random.Random) -> list[str]:
+    deltas = []
+    index = 0
+    while index < len(text):
+        step = rng.randint(1, 6)
+        deltas.append(text[index : index + step])
+        index += step
+    return deltas
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+def test_incremental_encoding_matches_full_encode(sample: str, encoding_name: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    rng = random.Random(len(sample))
+
+    for _ in range(20):
+        encoder = encoding.incremental_encoder()
+        committed: list[int] = []
+        prefix = ""
+        for delta in random_deltas(sample, rng):
+            prefix += delta
+            update = encoder.append(delta)
+            committed.extend(update.committed)
+            full = encoding.encode_ordinary(prefix)
+            assert update.token_count == len(full)
+            assert encoder.tokens == full
+            assert full[: len(committed)] == committed
+        committed.extend(encoder.flush())
+        assert committed == encoding.encode_ordinary(sample)
+
+
+def test_committed_tokens_do_not_change() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    encoder = encoding.incremental_encoder()
+
+    encoder.append("Hello there, ")
+    stable = encoder.committed_tokens
+    encoder.append("general Kenobi")
+
+    assert encoder.committed_tokens[: len(stable)] == stable
+    assert encoder.append("") == (encoder.token_count, [])
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+@pytest.mark.parametrize(
+    "deltas",
+    [["they'", "re"], ["Well they", "'", "re here"], ["We", "'ll see"], ["I can'", "t go"]],
+)
+def test_contraction_split_across_deltas(encoding_name: str, deltas: list[str]) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    text = "".join(deltas)
+    pieces, _ = encoding._encode_pieces(text)
+    boundaries = {0}
+    for char_len, _ in pieces:
+        boundaries.add(max(boundaries) + char_len)
+
+    encoder = encoding.incremental_encoder()
+    for delta in deltas:
+        encoder.append(delta)
+        # Committed tokens must end on a piece boundary of the final text.
+        assert len(encoding.decode(encoder.committed_tokens)) in boundaries
+    encoder.flush()
+
+    assert encoder.committed_tokens == encoding.encode_ordinary(text)
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "voyage3_base"])
+def test_decomposed_text_matches_full_encode(encoding_name: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    # Combining marks often arrive in a later delta than their base letter.
+    text = "Cafe\u0301 na\u0131\u0308ve, re\u0301sume\u0301 " * 5 + "e\u0301\u0316" * 30
+    rng = random.Random(3)
+
+    for _ in range(10):
+        encoder = encoding.incremental_encoder()
+        prefix = ""
+        for delta in random_deltas(text, rng):
+            prefix += delta
+            encoder.append(delta)
+            assert encoder.tokens == encoding.encode_ordinary(prefix)
+        encoder.flush()
+        assert encoder.committed_tokens == encoding.encode_ordinary(text)
+
+
+def test_late_combining_mark_composes_with_an_earlier_letter() -> None:
+    encoding = candidate.get_encoding("voyage3_base")
+    # Under NFC the acute accent skips over the lower-ccc marks and joins the "e".
+    deltas = ["word e" + "\u0316" * 5, "\u0301 more"]
+
+    encoder = encoding.incremental_encoder()
+    for delta in deltas:
+        encoder.append(delta)
+    encoder.flush()
+
+    assert encoder.committed_tokens == encoding.encode_ordinary("".join(deltas))
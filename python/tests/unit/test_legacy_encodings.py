@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+LEGACY_ENCODINGS = ["gpt2", "r50k_base", "p50k_base", "p50k_edit"]
+
+
+@pytest.mark.parametrize("encoding_name", LEGACY_ENCODINGS)
+def test_legacy_encodings_round_trip(samples: list[str], encoding_name: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+
+    for text in samples:
+        tokens = encoding.encode(text)
+        assert encoding.decode(tokens) == text
+        assert encoding.count(text) == len(tokens)
+
+
+def test_legacy_models_resolve_to_native_backend() -> None:
+    encoding = candidate.encoding_for_model("text-davinci-003")
+
+    assert encoding.name == "p50k_base"
+    assert encoding.encode("<|endoftext|>", allowed_special="all") == [50_256]
+    assert encoding.encode("hello world") == candidate.get_encoding("p50k_base").encode("hello world")
+
+
+def test_gpt2_shares_r50k_vocabulary(samples: list[str]) -> None:
+    text = " ".join(samples)
+
+    assert candidate.get_encoding("gpt2").encode(text) == candidate.get_encoding("r50k_base").encode(text)
+
+
+def test_encode_single_piece_bytes_uses_backend() -> None:
+    encoding = candidate.get_encoding("r50k_base")
+    data = "hello".encode("utf-8")
+
+    assert encoding._encode_bytes(data) == encoding.encode("hello")
+
+
+def test_p50k_edit_exposes_fim_tokens() -> None:
+    encoding = candidate.get_encoding("p50k_edit")
+
+    assert encoding.encode("<|fim_prefix|>", allowed_special="all") == [50_281]
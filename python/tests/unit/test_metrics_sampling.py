@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai import metrics
+from bpe_openai.metrics import LATENCY_BUCKETS_MS, MetricsRecorder
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_encode_without_hook_builds_no_result() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+
+    encoding.encode("nothing to report")
+
+    assert encoding.last_result is None
+
+
+def test_sampling_reports_a_fraction_of_calls() -> None:
+    payloads: List[Dict[str, Any]] = []
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_metrics_hook(payloads.append, sample_rate=0.25)
+
+    random.seed(3)
+    for _ in range(400):
+        encoding.encode("sampled")
+
+    assert 50 < len(payloads) < 150
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"sample_rate": 0.0}, {"sample_rate": 1.5}, {"flush_interval": 0}]
+)
+def test_rejects_invalid_settings(kwargs) -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    with pytest.raises(ValueError):
+        encoding.set_metrics_hook(lambda payload: None, **kwargs)
+
+
+def test_aggregated_payloads_are_flushed_per_interval() -> None:
+    payloads: List[Dict[str, Any]] = []
+    clock = FakeClock()
+    recorder = MetricsRecorder(payloads.append, model="m", flush_interval=10.0, clock=clock)
+
+    recorder.record(5, 0.02)
+    recorder.record(7, 3.0)
+    assert payloads == []
+
+    clock.now = 10.0
+    recorder.record(1, 5_000.0)
+
+    assert len(payloads) == 1
+    summary = payloads[0]
+    assert summary["calls"] == 3
+    assert summary["total_tokens"] == 13
+    assert summary["max_elapsed_ms"] == 5_000.0
+    assert summary["interval_s"] == 10.0
+    buckets = summary["latency_ms_buckets"]
+    assert len(buckets) == len(LATENCY_BUCKETS_MS) + 1
+    assert buckets["0.025"] == 1 and buckets["5"] == 1 and buckets["+Inf"] == 1
+
+    recorder.flush()
+    assert len(payloads) == 1  # nothing new to send
+
+
+def test_flush_metrics_and_hook_replacement_send_pending_calls() -> None:
+    payloads: List[Dict[str, Any]] = []
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_metrics_hook(payloads.append, flush_interval=3_600)
+
+    for _ in range(3):
+        encoding.encode("aggregate me")
+    encoding.flush_metrics()
+    encoding.encode("one more")
+    encoding.set_metrics_hook(None)
+
+    assert [payload["calls"] for payload in payloads] == [3, 1]
+    assert payloads[0]["model"] == "cl100k_base"
+    assert payloads[0]["total_tokens"] == 3 * len(encoding.encode("aggregate me"))
+
+
+def test_final_window_is_sent_without_further_calls() -> None:
+    payloads: List[Dict[str, Any]] = []
+    delivered = threading.Event()
+
+    def hook(payload: Dict[str, Any]) -> None:
+        payloads.append(payload)
+        delivered.set()
+
+    recorder = MetricsRecorder(hook, model="m", flush_interval=0.05)
+    recorder.record(5, 0.02)
+    recorder.record(7, 3.0)
+
+    assert delivered.wait(5.0)
+    assert [payload["calls"] for payload in payloads] == [2]
+    recorder.flush()
+    assert len(payloads) == 1
+
+
+def test_pending_calls_are_flushed_at_exit() -> None:
+    payloads: List[Dict[str, Any]] = []
+    recorder = MetricsRecorder(payloads.append, model="m", flush_interval=3_600)
+    recorder.record(5, 0.02)
+
+    metrics._flush_at_exit()
+
+    assert [payload["calls"] for payload in payloads] == [1]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+np = pytest.importorskip("numpy")
+
+SAMPLES = [
+    "Lorem ipsum dolor sit amet.",
+    "",
+    "迅速な茶色の狐が怠惰な犬を飛び越える。",
+    "hello <|endoftext|> world",
+]
+
+
+def test_encode_to_numpy_matches_encode() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = SAMPLES[0]
+
+    array = encoding.encode_to_numpy(text)
+
+    assert array.dtype == np.uint32
+    assert array.tolist() == encoding.encode(text)
+
+
+def test_encode_batch_to_numpy_returns_flat_tokens_and_offsets() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    batch = SAMPLES[:3]
+
+    flat, offsets = encoding.encode_batch_to_numpy(batch, num_threads=2)
+
+    assert flat.dtype == np.uint32
+    assert offsets.dtype == np.uint64
+    assert len(offsets) == len(batch) + 1
+    for index, item in enumerate(batch):
+        start, end = int(offsets[index]), int(offsets[index + 1])
+        assert flat[start:end].tolist() == encoding.encode(item)
+
+
+def test_encode_batch_to_numpy_with_allowed_special() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    flat, offsets = encoding.encode_batch_to_numpy(SAMPLES, allowed_special="all")
+
+    expected = [encoding.encode(item, allowed_special="all") for item in SAMPLES]
+    assert offsets.tolist() == [0] + list(np.cumsum([len(tokens) for tokens in expected]))
+    assert flat.tolist() == [token for tokens in expected for token in tokens]
+
+
+def test_encode_batch_to_numpy_joins_slices_from_the_worker_pool(prose: str) -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_batch_inline_threshold(0)
+    batch = [prose * (index % 5) for index in range(32)]
+
+    flat, offsets = encoding.encode_batch_to_numpy(batch, num_threads=4)
+
+    expected = [encoding.encode(item) for item in batch]
+    assert offsets.tolist() == [0] + list(np.cumsum([len(tokens) for tokens in expected]))
+    assert flat.tolist() == [token for tokens in expected for token in tokens]
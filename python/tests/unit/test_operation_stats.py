@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai.stats import OperationStats, bucket_bounds, bucket_index
+
+
+def test_stats_are_disabled_by_default() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.encode("not timed")
+
+    assert encoding.stats() is None
+    with pytest.raises(RuntimeError):
+        encoding.export_stats()
+
+
+def test_operations_are_recorded_separately() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.enable_stats()
+
+    tokens = encoding.encode("hello world")
+    encoding.encode_ordinary("hello world")
+    encoding.count("hello world")
+    encoding.decode(tokens)
+    encoding.encode_batch(["a b", "c d", "e f"])
+    encoding.count_batch(["a b", "c d"])
+    encoding.decode_batch([tokens, tokens])
+
+    stats = encoding.stats()
+    assert list(stats) == [
+        "encode",
+        "count",
+        "decode",
+        "encode_batch",
+        "count_batch",
+        "decode_batch",
+    ]
+    assert stats["encode"]["calls"] == 2
+    assert stats["encode"]["tokens"] == 2 * len(tokens)
+    assert stats["encode"]["chars"] == 2 * len("hello world")
+    assert stats["count"]["tokens"] == len(tokens)
+    assert stats["decode"]["bytes"] == len("hello world".encode("utf-8"))
+    assert stats["decode"]["chars"] == 0 and stats["encode"]["bytes"] == 0
+    assert stats["encode_batch"]["calls"] == 1
+    assert stats["encode_batch"]["items"] == 3
+    assert stats["count_batch"]["items"] == 2
+    assert stats["decode_batch"]["tokens"] == 2 * len(tokens)
+
+
+def test_summary_reports_quantiles_throughput_and_sizes() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.enable_stats()
+    for _ in range(20):
+        encoding.encode("short")
+    encoding.encode("x" * 5_000)
+
+    summary = encoding.stats()["encode"]
+    latency = summary["latency_ms"]
+    assert list(latency) == ["mean", "p50", "p90", "p99", "p99.9", "max"]
+    assert 0 <= latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+    assert summary["busy_s"] > 0
+    assert summary["tokens_per_s"] == pytest.approx(summary["tokens"] / summary["busy_s"])
+    assert summary["input_size"]["64"] == 20
+    assert summary["input_size"]["16384"] == 1
+
+
+def test_batch_is_a_single_metrics_payload() -> None:
+    payloads: List[Dict[str, Any]] = []
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_metrics_hook(payloads.append)
+
+    batch = encoding.encode_batch(["one", "two", "three"])
+
+    assert len(payloads) == 1
+    assert payloads[0]["total_tokens"] == sum(len(tokens) for tokens in batch)
+
+
+def test_threads_are_merged_when_read() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.enable_stats()
+
+    def work() -> None:
+        for _ in range(50):
+            encoding.count("threaded")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    encoding.count("main")
+    assert encoding.stats()["count"]["calls"] >= 1
+    for thread in threads:
+        thread.join()
+    # A new thread folds the shards of the finished ones into the totals.
+    late = threading.Thread(target=encoding.count, args=("late",))
+    late.start()
+    late.join()
+
+    assert encoding.stats()["count"]["calls"] == 4 * 50 + 2
+
+
+def test_reenabling_starts_from_empty_stats() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.enable_stats()
+    encoding.encode("before")
+    encoding.enable_stats()
+
+    assert encoding.stats() == {}
+    encoding.enable_stats(False)
+    assert encoding.stats() is None
+
+
+def test_prometheus_export_to_callback_and_file(tmp_path) -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.enable_stats()
+    encoding.encode("exported")
+    received: List[str] = []
+
+    text = encoding.export_stats(received.append)
+    path = tmp_path / "bpe.prom"
+    encoding.export_stats(path)
+
+    assert received == [text]
+    assert path.read_text(encoding="utf-8") == text
+    assert "# TYPE bpe_openai_operation_latency_seconds histogram" in text
+    labels = 'encoding="cl100k_base",operation="encode"'
+    assert f'bpe_openai_operation_latency_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"bpe_openai_operation_latency_seconds_count{{{labels}}} 1" in text
+    assert f"bpe_openai_chars_total{{{labels}}} {len('exported')}" in text
+    assert f"bpe_openai_bytes_total{{{labels}}} 0" in text
+
+
+@pytest.mark.parametrize("value", [0, 1, 15, 16, 17, 31, 32, 1_000, 123_456_789])
+def test_histogram_buckets_bound_relative_error(value: int) -> None:
+    lowest, highest = bucket_bounds(bucket_index(value))
+
+    assert lowest <= value <= highest
+    assert highest - lowest <= max(1, value) / 16
+
+
+def test_quantiles_come_from_the_histogram() -> None:
+    stats = OperationStats()
+    for elapsed_ms in range(1, 101):
+        stats.observe("encode", 10, 1, elapsed_ms * 1_000_000, chars=10)
+
+    latency = stats.snapshot()["encode"]["latency_ms"]
+    assert latency["p50"] == pytest.approx(50, rel=0.07)
+    assert latency["p99"] == pytest.approx(99, rel=0.07)
+    assert latency["max"] == 100
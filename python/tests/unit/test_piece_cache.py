@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+import bpe_openai as candidate
+
+TEMPLATE = (
+    "System: You are a helpful assistant. Answer in JSON.\n"
+    'User: {{"order_id": {n}, "status": "shipped", "items": [{n}, {m}]}}\n'
+)
+
+
+def build(cache_size: int):
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_piece_cache_size(cache_size)
+    return encoding
+
+
+def test_cached_encoding_matches_uncached() -> None:
+    plain = build(0)
+    cached = build(256)
+    texts = [TEMPLATE.format(n=n, m=n * 7) for n in range(50)] + ["naïve café 東京 🚀", ""]
+
+    for _ in range(2):  # the second pass is served from the cache
+        assert [cached.encode(text) for text in texts] == [plain.encode(text) for text in texts]
+        assert [cached.count(text) for text in texts] == [plain.count(text) for text in texts]
+    assert cached.encode_batch(texts) == plain.encode_batch(texts)
+
+
+def test_repeated_pieces_are_counted_as_hits() -> None:
+    encoding = build(1_024)
+    text = TEMPLATE.format(n=1, m=2)
+
+    encoding.encode(text)
+    first = encoding.piece_cache_stats()
+    encoding.encode(text)
+    second = encoding.piece_cache_stats()
+
+    assert first is not None and second is not None
+    assert first["misses"] > 0
+    assert second["misses"] == first["misses"]
+    assert second["hits"] > first["hits"]
+    assert 0 < second["entries"] <= second["capacity"]
+
+
+def test_cache_is_disabled_by_default_and_can_be_turned_off() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    assert encoding.piece_cache_stats() is None
+
+    encoding.set_piece_cache_size(16)
+    assert encoding.piece_cache_stats() is not None
+    encoding.set_piece_cache_size(0)
+    assert encoding.piece_cache_stats() is None
+
+    with pytest.raises(ValueError):
+        encoding.set_piece_cache_size(-1)
+
+
+def test_metrics_hook_reports_piece_cache_statistics() -> None:
+    payloads: List[Dict[str, Any]] = []
+    encoding = build(64)
+    encoding.set_metrics_hook(payloads.append)
+
+    encoding.encode("hello hello hello")
+    encoding.set_piece_cache_size(0)
+    encoding.encode("hello")
+
+    assert set(payloads[0]["piece_cache"]) == {"hits", "misses", "entries", "capacity"}
+    assert "piece_cache" not in payloads[1]
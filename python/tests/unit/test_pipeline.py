@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai import pipeline
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def documents(samples: list[str], prose: str) -> list[str]:
+    return (samples[:4] + [prose * 20]) * 10
+
+
+def write_corpus(path: Path, documents: list[str]) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for index, text in enumerate(documents):
+            handle.write(json.dumps({"id": index, "text": text}) + "\n")
+
+
+def read_documents(output_dir: Path) -> list[list[int]]:
+    manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+    documents: list[list[int]] = []
+    for shard in manifest["shards"]:
+        tokens, offsets = pipeline.load_shard(output_dir, shard["name"])
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            documents.append(tokens[start:stop].tolist())
+    return documents
+
+
+def test_sharded_output_matches_encode(tmp_path: Path, documents: list[str]) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, documents)
+    encoding = candidate.get_encoding("cl100k_base")
+
+    report = pipeline.tokenize_corpus(
+        [corpus], tmp_path / "out", encoding="cl100k_base", jobs=2, shard_bytes=500, batch_size=3
+    )
+
+    assert report.shards > 1
+    assert report.documents == len(documents)
+    expected = [encoding.encode_ordinary(text) for text in documents]
+    assert read_documents(tmp_path / "out") == expected
+    assert report.tokens == sum(len(encoding.encode_ordinary(text)) for text in documents)
+
+
+def test_rerun_resumes_unfinished_shards(tmp_path: Path, documents: list[str]) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, documents)
+    output = tmp_path / "out"
+    first = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=500)
+
+    # Simulate an interruption: the last shard never recorded completion.
+    finished = sorted(output.glob("*.done"))
+    interrupted = json.loads(finished[-1].read_text(encoding="utf-8"))
+    finished[-1].unlink()
+    second = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=500)
+
+    assert second.shards_skipped == first.shards - 1
+    assert second.documents == interrupted["documents"]
+    assert len(read_documents(output)) == len(documents)
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda data: "",
+        lambda data: json.dumps(data)[:-10],
+        lambda data: json.dumps({key: value for key, value in data.items() if key != "tokens"}),
+        lambda data: json.dumps(dict(data, bytes_read=None)),
+        lambda data: json.dumps([data]),
+    ],
+    ids=["empty", "truncated", "missing-key", "null-field", "not-an-object"],
+)
+def test_incomplete_done_markers_count_as_unfinished(
+    tmp_path: Path, documents: list[str], damage
+) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, documents)
+    output = tmp_path / "out"
+    first = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=500)
+
+    marker = sorted(output.glob("*.done"))[0]
+    marker.write_text(damage(json.loads(marker.read_text(encoding="utf-8"))), encoding="utf-8")
+    second = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=500)
+
+    assert second.shards_skipped == first.shards - 1
+    assert json.loads(marker.read_text(encoding="utf-8"))["tokens"] >= 0
+    assert not list(output.glob("*.partial"))
+    assert len(read_documents(output)) == len(documents)
+
+
+def test_resume_retokenizes_when_the_shard_layout_changes(
+    tmp_path: Path, documents: list[str]
+) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, documents)
+    output = tmp_path / "out"
+    pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=1_000)
+
+    second = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=3_000)
+    third = pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=3_000)
+    encoding = candidate.get_encoding("cl100k_base")
+
+    assert second.shards_skipped == 0
+    assert second.documents == len(documents)
+    assert third.shards_skipped == third.shards
+    assert read_documents(output) == [encoding.encode_ordinary(text) for text in documents]
+
+
+def test_resume_retokenizes_when_the_encoding_changes(
+    tmp_path: Path, documents: list[str]
+) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, documents)
+    output = tmp_path / "out"
+    pipeline.tokenize_corpus([corpus], output, jobs=1, shard_bytes=1_000)
+
+    report = pipeline.tokenize_corpus(
+        [corpus], output, encoding="o200k_base", jobs=1, shard_bytes=1_000
+    )
+    encoding = candidate.get_encoding("o200k_base")
+
+    assert report.shards_skipped == 0
+    assert read_documents(output) == [encoding.encode_ordinary(text) for text in documents]
+
+
+def test_raw_lines_and_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    corpus = tmp_path / "lines.txt"
+    corpus.write_text("first line\nsecond line\n", encoding="utf-8")
+
+    assert pipeline.main([str(corpus), "-o", str(tmp_path / "out"), "--raw", "--quiet"]) == 0
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["documents"] == 2
+    encoding = candidate.get_encoding("cl100k_base")
+    assert read_documents(tmp_path / "out") == [
+        encoding.encode_ordinary("first line"),
+        encoding.encode_ordinary("second line"),
+    ]
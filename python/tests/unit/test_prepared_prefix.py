@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+import bpe_openai as candidate
+
+SYSTEM_PROMPT = (
+    "You are a careful assistant.\n\nRules:\n  1. Answer in JSON.\n  2. Cite sources.   \n"
+    "Examples: don't, won't, it's 12345 apples; naïve café 東京 🚀\n"
+)
+SUFFIXES = ["", "Hi", " there", "\n\nUser: what's up?", "s and more", "   ", "123", "\n"]
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    return candidate.get_encoding("cl100k_base")
+
+
+def test_prefix_encode_matches_full_encode_at_every_split(encoding) -> None:
+    rng = random.Random(7)
+    cuts = sorted(rng.sample(range(len(SYSTEM_PROMPT) + 1), 40)) + [0, len(SYSTEM_PROMPT)]
+    for cut in cuts:
+        prefix = encoding.prepare_prefix(SYSTEM_PROMPT[:cut])
+        for suffix in SUFFIXES + [SYSTEM_PROMPT[cut:]]:
+            text = SYSTEM_PROMPT[:cut] + suffix
+            assert prefix.encode(suffix) == encoding.encode(text), (cut, suffix)
+            assert prefix.count(suffix) == encoding.count(text)
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+@pytest.mark.parametrize(
+    "prompt, suffix",
+    [("they'", "re here"), ("They", "'RE"), ("I can'", "t go"), ("we'", "ll see"), ("it", "'s")],
+)
+def test_contraction_split_across_the_join(encoding_name: str, prompt: str, suffix: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    prompt = SYSTEM_PROMPT + prompt
+    # Without special tokens to guard, only the pieces themselves hold the tail open.
+    prefix = encoding.prepare_prefix(prompt, disallowed_special=())
+
+    assert prefix.encode(suffix) == encoding.encode(prompt + suffix, disallowed_special=())
+    # Reused tokens must end on a piece boundary of the joined text.
+    reused = len(encoding.decode(prefix.encode(suffix)[: prefix.token_count]))
+    pieces, _ = encoding._encode_pieces(prompt + suffix)
+    boundaries = [0]
+    for char_len, _ in pieces:
+        boundaries.append(boundaries[-1] + char_len)
+    assert reused in boundaries
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "voyage3_base"])
+@pytest.mark.parametrize(
+    "prompt, suffix",
+    [
+        ("Cafe\u0301 au lait", ""),
+        ("Caf", "e\u0301 au lait"),
+        ("Cafe", "\u0301 au lait"),
+        ("word e" + "\u0316" * 20, "\u0301 more"),
+        ("<|endoftext|>re\u0301sume\u0301", "\u0301"),
+    ],
+)
+def test_decomposed_prefix_matches_full_encode(
+    encoding_name: str, prompt: str, suffix: str
+) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    prompt = SYSTEM_PROMPT + prompt
+
+    for allowed_special in (frozenset(), "all"):
+        prefix = encoding.prepare_prefix(
+            prompt, allowed_special=allowed_special, disallowed_special=()
+        )
+        expected = encoding.encode(
+            prompt + suffix, allowed_special=allowed_special, disallowed_special=()
+        )
+        assert prefix.encode(suffix) == expected
+        assert prefix.count(suffix) == len(expected)
+
+
+def test_long_prefix_reuses_most_tokens(encoding) -> None:
+    prompt = SYSTEM_PROMPT * 20
+    prefix = encoding.prepare_prefix(prompt)
+
+    assert prefix.text == prompt
+    # Only the tail the suffix or a special token could reach is redone.
+    assert prefix.token_count > 0.95 * len(encoding.encode(prompt))
+    assert prefix.encode("Thanks!") == encoding.encode(prompt + "Thanks!")
+
+
+def test_special_token_split_across_the_join(encoding) -> None:
+    prefix = encoding.prepare_prefix("Document one.<|endof", allowed_special="all")
+
+    assert prefix.encode("text|>Document two.") == encoding.encode(
+        "Document one.<|endoftext|>Document two.", allowed_special="all"
+    )
+
+    guarded = encoding.prepare_prefix("Document one.<|endof")
+    with pytest.raises(ValueError, match="disallowed special token"):
+        guarded.encode("text|>")
+
+
+def test_allowed_special_tokens_inside_the_prefix(encoding) -> None:
+    prompt = "<|fim_prefix|>def f():\n    return 1<|fim_suffix|>\n" * 3
+    prefix = encoding.prepare_prefix(prompt, allowed_special="all")
+
+    for suffix in ["", "<|fim_middle|>", "x = 2"]:
+        expected = encoding.encode(prompt + suffix, allowed_special="all")
+        assert prefix.encode(suffix) == expected
+
+
+def test_disallowed_special_token_in_prefix_is_rejected_up_front(encoding) -> None:
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.prepare_prefix("system <|endoftext|> prompt")
+
+
+def test_chunk_limit_counts_the_prefix_tokens() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    prompt = "word " * 25
+    limit = len(encoding.encode(prompt + "end"))
+    encoding._runtime.config.chunk_limit = limit
+    prefix = encoding.prepare_prefix(prompt)
+
+    assert prefix.encode("end") == encoding.encode(prompt + "end")
+    with pytest.raises(candidate.TokenLimitError):
+        prefix.encode(" more" * 10)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai.cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_evicts_least_recently_used_entries_by_size() -> None:
+    cache = ResultCache(max_bytes=300)
+    cache.put("a", (1,), 100)
+    cache.put("b", (2,), 100)
+    cache.put("c", (3,), 100)
+    assert cache.get("a") == (1,)  # "b" is now the least recently used
+
+    cache.put("d", (4,), 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (1,) and cache.get("d") == (4,)
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 300
+
+
+def test_entries_larger_than_the_budget_are_not_cached() -> None:
+    cache = ResultCache(max_bytes=100)
+    cache.put("big", (1, 2, 3), 101)
+
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_dropped() -> None:
+    clock = FakeClock()
+    cache = ResultCache(max_bytes=1_000, ttl=10.0, clock=clock)
+    cache.put("key", 42, 50)
+
+    clock.now = 9.9
+    assert cache.get("key") == 42
+    clock.now = 10.0
+    assert cache.get("key") is None
+    assert cache.stats()["bytes"] == 0
+
+
+@pytest.mark.parametrize("kwargs", [{"max_bytes": 0}, {"max_bytes": 10, "ttl": 0}])
+def test_rejects_invalid_settings(kwargs) -> None:
+    with pytest.raises(ValueError):
+        ResultCache(**kwargs)
+
+
+def build():
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_result_cache(1 << 20)
+    return encoding
+
+
+def test_cached_encode_and_count_match_uncached() -> None:
+    encoding = build()
+    plain = candidate.get_encoding("cl100k_base")
+    text = "retry me <|endoftext|> please"
+
+    first = encoding.encode(text, allowed_special="all")
+    first.append(-1)  # callers own the returned list
+    second = encoding.encode(text, allowed_special="all")
+
+    assert second == plain.encode(text, allowed_special="all")
+    assert encoding.encode_ordinary(text) == plain.encode_ordinary(text)
+    assert encoding.count(text, allowed_special="all") == len(second)
+    assert encoding.result_cache_stats()["hits"] == 1
+
+
+def test_special_token_settings_are_part_of_the_key() -> None:
+    encoding = build()
+    text = "a <|endoftext|> b"
+    encoding.encode(text, allowed_special="all")
+
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.encode(text)
+    assert encoding.encode(text, disallowed_special=()) == encoding.encode_ordinary(text)
+
+
+def test_chunk_limit_is_part_of_the_key() -> None:
+    encoding = build()
+    text = "word " * 20
+    tokens = encoding.encode(text)
+    encoding.encode_ordinary(text)
+
+    encoding._runtime.config.chunk_limit = len(tokens) - 1
+    with pytest.raises(candidate.TokenLimitError):
+        encoding.encode(text)
+    with pytest.raises(candidate.TokenLimitError):
+        encoding.encode_ordinary(text)
+
+
+def test_metrics_hook_reports_result_cache_hit_rate() -> None:
+    payloads: List[Dict[str, Any]] = []
+    encoding = build()
+    encoding.set_metrics_hook(payloads.append)
+
+    encoding.encode("same text")
+    encoding.encode("same text")
+
+    assert payloads[-1]["result_cache"]["hits"] == 1
+    assert payloads[-1]["result_cache"]["hit_rate"] == 0.5
+
+    encoding.set_result_cache(0)
+    encoding.encode("same text")
+    assert "result_cache" not in payloads[-1]
+    assert encoding.result_cache_stats() is None
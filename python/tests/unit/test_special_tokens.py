@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai.errors import TokenLimitError
+
+PROMPT = "<|fim_prefix|>def add(a, b):\n<|fim_suffix|>\n    return c<|fim_middle|><|endoftext|>"
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    return candidate.get_encoding("cl100k_base")
+
+
+def reference_encode(encoding, text: str, allowed: set[str]) -> list[int]:
+    """Split on allowed tokens by hand and encode each segment as ordinary text."""
+    tokens: list[int] = []
+    segment = ""
+    index = 0
+    while index < len(text):
+        special = next((token for token in allowed if text.startswith(token, index)), None)
+        if special is None:
+            segment += text[index]
+            index += 1
+            continue
+        tokens += encoding.encode_ordinary(segment) + [encoding.encode_single_token(special)]
+        segment = ""
+        index += len(special)
+    return tokens + encoding.encode_ordinary(segment)
+
+
+def test_allowed_special_tokens_match_segment_by_segment_encoding(encoding) -> None:
+    tokens = encoding.encode(PROMPT, allowed_special="all")
+
+    assert tokens == reference_encode(encoding, PROMPT, encoding.special_tokens_set)
+    assert encoding.count(PROMPT, allowed_special="all") == len(tokens)
+    assert encoding.decode(tokens) == PROMPT
+
+
+def test_disallowed_token_is_reported_with_allowed_ones_in_the_same_text(encoding) -> None:
+    text = "ok <|endoftext|> then <|endofprompt|>"
+    allowed = {"<|endoftext|>"}
+
+    with pytest.raises(ValueError, match="disallowed special token '<\\|endofprompt\\|>'"):
+        encoding.encode(text, allowed_special=allowed)
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.count(text, allowed_special=allowed)
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.is_within_token_limit(text, 1_000, allowed_special=allowed)
+
+    assert encoding.encode(text, allowed_special=allowed, disallowed_special=()) == (
+        encoding.encode_ordinary("ok ")
+        + [encoding.encode_single_token("<|endoftext|>")]
+        + encoding.encode_ordinary(" then <|endofprompt|>")
+    )
+
+
+def test_disallowed_token_past_the_chunk_limit_is_still_reported() -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding._runtime.config.chunk_limit = 4
+    text = "word " * 50 + "<|endoftext|>"
+
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.encode(text)
+    with pytest.raises(TokenLimitError):
+        encoding.encode(text, disallowed_special=())
+
+
+def test_is_within_token_limit_counts_special_tokens(encoding) -> None:
+    text = "hi<|endoftext|>"
+    total = encoding.count(text, allowed_special="all")
+
+    assert encoding.is_within_token_limit(text, total, allowed_special="all")
+    assert not encoding.is_within_token_limit(text, total - 1, allowed_special="all")
+
+
+def test_matchers_are_reused_across_calls(encoding) -> None:
+    encoding.encode("a<|endoftext|>b", allowed_special="all")
+    cached = dict(encoding._matchers)
+    encoding.encode("c<|endoftext|>d", allowed_special="all")
+
+    assert encoding._matchers == cached
+
+
+
+@pytest.fixture(scope="module")
+def overlapping(encoding):
+    """``encoding`` plus ``<|a|>`` and ``<|a|>b``, one a prefix of the other."""
+    from bpe_openai.tokenizer import Encoding, _VocabularyTables
+
+    specials = {**encoding._special_tokens, "<|a|>": 100_300, "<|a|>b": 100_301}
+    tables = _VocabularyTables(
+        name=encoding.name,
+        pat_str=encoding._pat_str,
+        token_table=encoding._mergeable_ranks,
+        special_tokens=specials,
+    )
+    return Encoding(
+        model=encoding.name,
+        runtime=encoding._runtime,
+        backend=encoding._backend.with_special_tokens(specials),
+        backend_version=encoding._backend_version,
+        tables=tables,
+    )
+
+
+def test_overlapping_special_tokens_match_leftmost_longest_everywhere(overlapping) -> None:
+    text = "x <|a|>b y <|a|> z <|a|>bb"
+    # Longest match first, whatever order the allowed set iterates in.
+    expected = reference_encode(overlapping, text, ["<|a|>b", "<|a|>"])
+
+    assert expected.count(100_301) == 2 and expected.count(100_300) == 1
+    assert overlapping.encode(text, allowed_special="all") == expected
+    assert overlapping.count(text, allowed_special="all") == len(expected)
+    for budget in range(len(expected) + 1):
+        head = overlapping.truncate(text, budget, allowed_special="all")
+        tail = overlapping.truncate(text, budget, side="tail", allowed_special="all")
+        assert head.token_ids == expected[:budget]
+        assert tail.token_ids == expected[len(expected) - budget :]
+    prefix = overlapping.prepare_prefix(text, allowed_special="all")
+    assert prefix.encode(" tail") == overlapping.encode(text + " tail", allowed_special="all")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    return candidate.get_encoding("cl100k_base")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["lone \ud800 high", "lone \udfff low", "\ud83d", "naïve \udc00 café"],
+)
+def test_lone_surrogates_encode_as_replacement_character(encoding, text) -> None:
+    expected = text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+    assert encoding.encode(text) == encoding.encode(expected)
+    assert encoding.encode_ordinary(text) == encoding.encode_ordinary(expected)
+    assert encoding.count(text) == len(encoding.encode(expected))
+    assert encoding.encode_batch([text, "ok"]) == encoding.encode_batch([expected, "ok"])
+    assert encoding.decode(encoding.encode(text)) == expected
+
+
+def test_surrogate_pairs_are_joined(encoding) -> None:
+    pair = "\ud83d\ude00"  # U+1F600 written as a UTF-16 surrogate pair
+
+    assert encoding.encode(pair) == encoding.encode("\U0001F600")
+
+
+def test_valid_text_is_passed_through_unchanged(encoding) -> None:
+    ascii_text = "plain ascii"
+    assert encoding._sanitize_text(ascii_text) is ascii_text
+    for text in ("naïve café", "日本語", "emoji \U0001F600"):
+        assert encoding._sanitize_text(text) == text
+
+
+def test_encode_single_token_replaces_lone_surrogates(encoding) -> None:
+    tokens = encoding.encode("�")
+
+    if len(tokens) == 1:
+        assert encoding.encode_single_token("\ud800") == tokens[0]
+    else:
+        with pytest.raises(KeyError):
+            encoding.encode_single_token("\ud800")
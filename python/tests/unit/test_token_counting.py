@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+def test_count_matches_encode_length(samples: list[str]) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    for text in samples:
+        assert encoding.count(text) == len(encoding.encode(text))
+    expected = [len(encoding.encode(text)) for text in samples]
+    assert encoding.count_batch(samples, num_threads=2) == expected
+
+
+def test_count_with_special_tokens_matches_encode() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "<|endoftext|>system<|endofprompt|> prompt<|endoftext|>"
+
+    expected = len(encoding.encode(text, allowed_special="all"))
+
+    assert encoding.count(text, allowed_special="all") == expected
+    assert encoding.count_batch([text], allowed_special="all") == [expected]
+    with pytest.raises(ValueError, match="disallowed special token"):
+        encoding.count(text)
+    assert encoding.count(text, disallowed_special=()) == len(encoding.encode_ordinary(text))
+
+
+def test_is_within_token_limit(samples: list[str]) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = " ".join(samples) * 10
+    total = encoding.count(text)
+
+    assert encoding.is_within_token_limit(text, total)
+    assert not encoding.is_within_token_limit(text, total - 1)
+    assert encoding.is_within_token_limit("", 0)
+
+
+def test_is_within_token_limit_counts_special_tokens() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "hello<|endoftext|>"
+    total = encoding.count(text, allowed_special="all")
+
+    assert encoding.is_within_token_limit(text, total, allowed_special="all")
+    assert not encoding.is_within_token_limit(text, total - 1, allowed_special="all")
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import pytest
+
+import bpe_openai as candidate
+
+
+@pytest.fixture
+def text(prose: str) -> str:
+    return prose * 20
+
+
+@pytest.mark.parametrize("max_tokens", [0, 1, 7, 50])
+def test_head_matches_prefix_of_full_encoding(text: str, max_tokens: int) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    result = encoding.truncate(text, max_tokens)
+
+    assert list(result.token_ids) == encoding.encode(text)[:max_tokens]
+    assert result.truncated
+    assert result.text == text[: result.char_offset]
+    assert encoding.decode(result.token_ids).startswith(result.text)
+
+
+@pytest.mark.parametrize("max_tokens", [1, 7, 50])
+def test_tail_matches_suffix_of_full_encoding(text: str, max_tokens: int) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    result = encoding.truncate(text, max_tokens, side="tail")
+
+    assert list(result.token_ids) == encoding.encode(text)[-max_tokens:]
+    assert result.truncated
+    assert result.text == text[result.char_offset :]
+    assert encoding.decode(result.token_ids).endswith(result.text)
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+@pytest.mark.parametrize("max_tokens", [1, 5, 100])
+def test_tail_of_long_digit_run(prose: str, encoding_name: str, max_tokens: int) -> None:
+    # Digits group in threes from the start of the run, so a window that
+    # starts inside the run must not be split from there.
+    encoding = candidate.get_encoding(encoding_name)
+    text = prose + "Total: " + "1000" * 350 + "7"
+
+    result = encoding.truncate(text, max_tokens, side="tail")
+
+    assert list(result.token_ids) == encoding.encode(text)[-max_tokens:]
+    assert result.text == text[result.char_offset :]
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "voyage3_base"])
+@pytest.mark.parametrize("side", ["head", "tail"])
+def test_decomposed_input_matches_encode(encoding_name: str, side: str) -> None:
+    encoding = candidate.get_encoding(encoding_name)
+    text = "Cafe\u0301 au lait, s'il vous pla\u0131\u0302t. " * 10 + "e\u0301" * 200
+
+    result = encoding.truncate(text, 25, side=side)
+
+    expected = encoding.encode(text)
+    assert list(result.token_ids) == (expected[:25] if side == "head" else expected[-25:])
+    decoded = encoding.decode(result.token_ids)
+    assert decoded.startswith(result.text) if side == "head" else decoded.endswith(result.text)
+
+
+@pytest.mark.parametrize("side", ["head", "tail"])
+def test_budget_larger_than_text_keeps_everything(side: str) -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "short text"
+
+    result = encoding.truncate(text, 1_000, side=side)
+    assert encoding.last_result is result
+
+    assert list(result.token_ids) == encoding.encode(text)
+    assert not result.truncated
+    assert result.text == text
+
+
+def test_truncate_accepts_inputs_beyond_the_encode_guard() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "word " * 250_000
+
+    head = encoding.truncate(text, 10)
+    tail = encoding.truncate(text, 10, side="tail")
+
+    assert len(head.token_ids) == 10 and head.truncated
+    assert len(tail.token_ids) == 10 and tail.truncated
+
+
+def test_truncate_with_allowed_special_tokens() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+    text = "system<|endofprompt|> a prompt that is cut<|endoftext|>"
+    expected = encoding.encode(text, allowed_special="all")
+
+    head = encoding.truncate(text, 3, allowed_special="all")
+    tail = encoding.truncate(text, 3, side="tail", allowed_special="all")
+
+    assert list(head.token_ids) == expected[:3]
+    assert list(tail.token_ids) == expected[-3:]
+    assert tail.text.endswith("<|endoftext|>")
+
+
+def test_truncate_rejects_disallowed_special_in_kept_text() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(ValueError):
+        encoding.truncate("hello <|endoftext|>", 100)
+
+
+def test_truncate_validates_arguments() -> None:
+    encoding = candidate.get_encoding("cl100k_base")
+
+    with pytest.raises(ValueError):
+        encoding.truncate("text", -1)
+    with pytest.raises(ValueError):
+        encoding.truncate("text", 1, side="middle")  # type: ignore[arg-type]
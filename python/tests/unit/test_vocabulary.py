@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import io
+
+import pytest
+
+from bpe_openai import vocabulary
+
+RANKS = {b"a": 0, b"b": 1, b"ab": 2, b"\xff": 4, b"abab": 5}
+
+
+def test_token_table_round_trips_ranks(tmp_path) -> None:
+    path = tmp_path / f"toy{vocabulary.SUFFIX}"
+    vocabulary.write(RANKS, path)
+
+    table = vocabulary.TokenTable.open(path)
+
+    assert len(table) == len(RANKS)
+    assert table.slots == 6
+    assert table.to_dict() == RANKS
+    assert dict(table) == RANKS
+    for token, rank in RANKS.items():
+        assert table[token] == rank
+        assert table.token_bytes(rank) == token
+    assert table.token_bytes(3) == b""
+    assert b"ba" not in table
+    assert table.get(b"zz") is None
+    with pytest.raises(IndexError):
+        table.token_bytes(6)
+
+
+def test_read_tiktoken_parses_gzip_stream() -> None:
+    lines = "".join(f"{base64.b64encode(token).decode()} {rank}\n" for token, rank in RANKS.items())
+    handle = io.BytesIO(gzip.compress(lines.encode("utf-8")))
+
+    assert vocabulary.read_tiktoken(handle) == RANKS
+
+
+def test_token_table_rejects_unknown_format() -> None:
+    with pytest.raises(ValueError):
+        vocabulary.TokenTable(b"\x00" * 64)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+import threading
+
+import pytest
+
+import bpe_openai as candidate
+from bpe_openai import executor
+
+
+def test_slices_are_contiguous_and_balanced() -> None:
+    weights = [1] * 10 + [100] + [1] * 10
+
+    bounds = executor._slices(weights, 3)
+
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(weights)
+    assert all(left[1] == right[0] for left, right in zip(bounds, bounds[1:]))
+    assert len(bounds) <= 3
+
+
+def test_small_batches_run_inline() -> None:
+    calls: list[int] = []
+
+    def record(items):
+        calls.append(threading.get_ident())
+        return list(items)
+
+    assert executor.map_slices(record, [1, 2, 3], 4, [1, 1, 1], inline_threshold=10) == [1, 2, 3]
+    assert calls == [threading.get_ident()]
+
+
+def test_large_batches_are_split_across_the_shared_pool() -> None:
+    calls: list[int] = []
+
+    def record(items):
+        calls.append(len(items))
+        return [item * 2 for item in items]
+
+    items = list(range(64))
+    assert executor.map_slices(record, items, 4, [10] * 64, inline_threshold=10) == [i * 2 for i in items]
+    assert len(calls) == min(4, executor.max_workers())
+    assert sum(calls) == len(items)
+
+
+def test_pool_is_reused_across_calls() -> None:
+    assert executor.shared_executor() is executor.shared_executor()
+
+
+def test_batch_results_match_serial_encoding(prose: str) -> None:
+    encoding = candidate.build_encoding_from_name("cl100k_base")
+    encoding.set_batch_inline_threshold(0)
+    batch = [prose * (index + 1) for index in range(16)]
+
+    expected = [encoding.encode(item) for item in batch]
+
+    assert encoding.encode_ordinary_batch(batch, num_threads=4) == expected
+    assert encoding.encode_batch(batch, num_threads=4, allowed_special="all") == expected
+    assert encoding.count_batch(batch, num_threads=4) == [len(tokens) for tokens in expected]
+    assert encoding.decode_batch(expected, num_threads=4) == batch
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_pool_is_recreated_after_fork() -> None:
+    parent = executor.shared_executor()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        ok = executor._EXECUTOR is None and executor.shared_executor() is not parent
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
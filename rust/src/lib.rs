@@ -1,14 +1,51 @@
-use pyo3::exceptions::PyValueError;
+use std::collections::hash_map::RandomState;
+use std::collections::HashMap;
+use std::hash::BuildHasher;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, OnceLock, PoisonError};
+
+use aho_corasick::{AhoCorasick, MatchKind};
+use bpe::byte_pair_encoding::{find_hash_factor_for_dictionary, BytePairEncoding};
+
+use pyo3::create_exception;
+use pyo3::exceptions::{PyKeyError, PyValueError};
 use pyo3::prelude::*;
+use pyo3::types::PyBytes;
 
 type CoreTokenizer = bpe_openai::Tokenizer;
 
+create_exception!(_bindings, DisallowedSpecialTokenError, PyValueError);
+
+// gpt2, r50k and p50k share one pretokenization pattern. The `\s+(?!\S)`
+// lookahead from tiktoken is expressed as a pattern whose last character is
+// dropped, which keeps pretokenization linear.
+const LEGACY_PATTERNS: &[(&str, bool)] = &[
+    (
+        "'(?:[sdmt]|ll|ve|re)| ?\\p{L}+| ?\\p{N}+| ?[^\\s\\p{L}\\p{N}]+|\\s+$",
+        false,
+    ),
+    ("\\s+\\s", true),
+    ("\\s", false),
+];
+
+const LEGACY_ENCODINGS: &[&str] = &["gpt2", "r50k_base", "p50k_base", "p50k_edit"];
+
+static LEGACY_TOKENIZERS: OnceLock<Mutex<HashMap<String, &'static CoreTokenizer>>> = OnceLock::new();
+
+fn legacy_tokenizers() -> &'static Mutex<HashMap<String, &'static CoreTokenizer>> {
+    LEGACY_TOKENIZERS.get_or_init(Default::default)
+}
+
 fn resolve_tokenizer(lower_name: &str) -> Option<&'static CoreTokenizer> {
     match lower_name {
         "cl100k_base" => Some(bpe_openai::cl100k_base()),
         "o200k_base" => Some(bpe_openai::o200k_base()),
         "voyage3_base" => Some(bpe_openai::voyage3_base()),
-        _ => None,
+        _ => legacy_tokenizers()
+            .lock()
+            .expect("legacy tokenizer registry poisoned")
+            .get(lower_name)
+            .copied(),
     }
 }
 
@@ -21,38 +58,791 @@ fn model_alias(lower_name: &str) -> Option<&'static str> {
     }
 }
 
+fn native_bytes<'py, T: Copy, const N: usize>(
+    py: Python<'py>,
+    values: &[T],
+    to_ne_bytes: fn(T) -> [u8; N],
+) -> PyResult<Bound<'py, PyBytes>> {
+    PyBytes::new_with(py, values.len() * N, |buffer| {
+        for (chunk, value) in buffer.chunks_exact_mut(N).zip(values) {
+            chunk.copy_from_slice(&to_ne_bytes(*value));
+        }
+        Ok(())
+    })
+}
+
+const PIECE_CACHE_SHARDS: usize = 16;
+/// Longer pieces rarely repeat and would crowd out the short ones that do.
+const MAX_CACHED_PIECE_BYTES: usize = 64;
+
+struct CacheSlot {
+    key: Box<[u8]>,
+    tokens: Box<[u32]>,
+    referenced: bool,
+}
+
+/// One independently locked part of a `PieceCache`, evicting with CLOCK:
+/// the hand clears reference bits until it finds an entry that has not been
+/// read since it last passed, which approximates LRU without reordering on
+/// every hit.
+struct ClockShard {
+    index: HashMap<Box<[u8]>, usize>,
+    slots: Vec<CacheSlot>,
+    hand: usize,
+    capacity: usize,
+}
+
+impl ClockShard {
+    fn new(capacity: usize) -> Self {
+        ClockShard {
+            index: HashMap::new(),
+            slots: Vec::new(),
+            hand: 0,
+            capacity,
+        }
+    }
+
+    fn get(&mut self, key: &[u8]) -> Option<&[u32]> {
+        let slot = &mut self.slots[*self.index.get(key)?];
+        slot.referenced = true;
+        Some(&slot.tokens)
+    }
+
+    fn insert(&mut self, key: &[u8], tokens: &[u32]) {
+        if self.index.contains_key(key) {
+            return;
+        }
+        let slot = CacheSlot {
+            key: key.into(),
+            tokens: tokens.into(),
+            referenced: false,
+        };
+        if self.slots.len() < self.capacity {
+            self.index.insert(slot.key.clone(), self.slots.len());
+            self.slots.push(slot);
+            return;
+        }
+        while self.slots[self.hand].referenced {
+            self.slots[self.hand].referenced = false;
+            self.hand = (self.hand + 1) % self.capacity;
+        }
+        let evicted = std::mem::replace(&mut self.slots[self.hand], slot);
+        self.index.remove(&evicted.key);
+        self.index.insert(self.slots[self.hand].key.clone(), self.hand);
+        self.hand = (self.hand + 1) % self.capacity;
+    }
+}
+
+/// Bounded, thread-safe cache from pretokenized piece bytes to their tokens.
+struct PieceCache {
+    shards: Box<[Mutex<ClockShard>]>,
+    hasher: RandomState,
+    capacity: usize,
+    hits: AtomicU64,
+    misses: AtomicU64,
+}
+
+impl PieceCache {
+    fn new(capacity: usize) -> Self {
+        let shards = PIECE_CACHE_SHARDS.min(capacity);
+        let per_shard = capacity.div_ceil(shards);
+        PieceCache {
+            shards: (0..shards).map(|_| Mutex::new(ClockShard::new(per_shard))).collect(),
+            hasher: RandomState::new(),
+            capacity: per_shard * shards,
+            hits: AtomicU64::new(0),
+            misses: AtomicU64::new(0),
+        }
+    }
+
+    fn shard(&self, key: &[u8]) -> std::sync::MutexGuard<'_, ClockShard> {
+        let index = self.hasher.hash_one(key) as usize % self.shards.len();
+        // A panic while holding the lock cannot leave a slot half-written in
+        // a way that breaks lookups, so a poisoned shard stays usable.
+        self.shards[index].lock().unwrap_or_else(PoisonError::into_inner)
+    }
+
+    /// Applies `read` to the cached tokens for `key`, if present.
+    fn read<R>(&self, key: &[u8], read: impl FnOnce(&[u32]) -> R) -> Option<R> {
+        let found = self.shard(key).get(key).map(read);
+        let counter = if found.is_some() { &self.hits } else { &self.misses };
+        counter.fetch_add(1, Ordering::Relaxed);
+        found
+    }
+
+    fn insert(&self, key: &[u8], tokens: &[u32]) {
+        self.shard(key).insert(key, tokens);
+    }
+
+    fn len(&self) -> usize {
+        self.shards
+            .iter()
+            .map(|shard| shard.lock().unwrap_or_else(PoisonError::into_inner).slots.len())
+            .sum()
+    }
+}
+
+/// A tokenizer plus the optional piece cache every encode path goes through.
+#[derive(Clone, Copy)]
+struct Encoder<'a> {
+    tokenizer: &'static CoreTokenizer,
+    cache: Option<&'a PieceCache>,
+}
+
+impl Encoder<'_> {
+    fn cache_for(&self, piece: &str) -> Option<&PieceCache> {
+        self.cache.filter(|_| piece.len() <= MAX_CACHED_PIECE_BYTES)
+    }
+
+    /// Runs the BPE merge for `piece`, unless the cache already has its tokens.
+    fn with_piece<R>(&self, piece: &str, use_tokens: impl Fn(&[u32]) -> R) -> R {
+        let bytes = piece.as_bytes();
+        let Some(cache) = self.cache_for(piece) else {
+            return use_tokens(&self.tokenizer.bpe.encode_via_backtracking(bytes));
+        };
+        if let Some(result) = cache.read(bytes, &use_tokens) {
+            return result;
+        }
+        let tokens = self.tokenizer.bpe.encode_via_backtracking(bytes);
+        cache.insert(bytes, &tokens);
+        use_tokens(&tokens)
+    }
+
+    fn encode_piece(&self, piece: &str) -> Vec<u32> {
+        self.with_piece(piece, <[u32]>::to_vec)
+    }
+
+    fn encode(&self, text: &str) -> Vec<u32> {
+        if self.cache.is_none() {
+            return self.tokenizer.encode(text);
+        }
+        let normalized = self.tokenizer.normalize(text);
+        let mut tokens = Vec::new();
+        for piece in self.tokenizer.split(normalized.as_str()) {
+            tokens.extend(self.encode_piece(piece));
+        }
+        tokens
+    }
+
+    fn count(&self, text: &str) -> usize {
+        if self.cache.is_none() {
+            return self.tokenizer.count(text);
+        }
+        let normalized = self.tokenizer.normalize(text);
+        self.tokenizer
+            .split(normalized.as_str())
+            .map(|piece| self.with_piece(piece, <[u32]>::len))
+            .sum()
+    }
+
+    fn count_till_limit(&self, text: &str, token_limit: usize) -> Option<usize> {
+        let normalized = self.tokenizer.normalize(text);
+        if self.cache.is_none() {
+            return self.tokenizer.count_till_limit(&normalized, token_limit);
+        }
+        let mut total = 0;
+        for piece in self.tokenizer.split(normalized.as_str()) {
+            total += match self.cache_for(piece) {
+                Some(_) => self.with_piece(piece, <[u32]>::len),
+                None => self.tokenizer.bpe.count_till_limit(piece.as_bytes(), token_limit - total)?,
+            };
+            if total > token_limit {
+                return None;
+            }
+        }
+        Some(total)
+    }
+}
+
+/// Encodes `text`, giving up as soon as more than `token_limit` tokens are
+/// produced. Pieces that cannot overflow the remaining budget on their own are
+/// encoded directly; longer ones are counted with an early exit first, so the
+/// work done before rejecting is bounded by the limit rather than the input.
+fn encode_till_limit(encoder: &Encoder, text: &str, token_limit: usize) -> Option<Vec<u32>> {
+    let tokenizer = encoder.tokenizer;
+    let normalized = tokenizer.normalize(text);
+    let mut tokens = Vec::new();
+    for piece in tokenizer.split(normalized.as_str()) {
+        let remaining = token_limit - tokens.len();
+        if piece.len() > remaining {
+            tokenizer.bpe.count_till_limit(piece.as_bytes(), remaining)?;
+        }
+        tokens.extend(encoder.encode_piece(piece));
+    }
+    Some(tokens)
+}
+
+fn encode_bounded(encoder: &Encoder, text: &str, token_limit: Option<usize>) -> Option<Vec<u32>> {
+    match token_limit {
+        Some(limit) => encode_till_limit(encoder, text, limit),
+        None => Some(encoder.encode(text)),
+    }
+}
+
+/// Appends the first `budget` tokens of `piece` to `tokens`, returning how
+/// many bytes of the piece they cover.
+fn take_head(encoder: &Encoder, piece: &str, budget: usize, tokens: &mut Vec<u32>) -> usize {
+    let bpe = &encoder.tokenizer.bpe;
+    let encoded = encoder.encode_piece(piece);
+    if encoded.len() <= budget {
+        tokens.extend_from_slice(&encoded);
+        return piece.len();
+    }
+    let kept = &encoded[..budget];
+    tokens.extend_from_slice(kept);
+    kept.iter().map(|&token| bpe.token_bytes(token).len()).sum()
+}
+
+/// The first `max_tokens` tokens of `text`, the number of characters they
+/// fully cover, and whether anything was left over. Pieces are split lazily,
+/// so only the part of `text` that fits the budget is encoded. Like `encode`,
+/// this works on the normalized text, and the character count refers to it.
+fn encode_head(encoder: &Encoder, text: &str, max_tokens: usize) -> (Vec<u32>, usize, bool) {
+    let normalized = encoder.tokenizer.normalize(text);
+    let text = normalized.as_str();
+    let mut tokens = Vec::new();
+    let mut covered = 0;
+    for piece in encoder.tokenizer.split(text) {
+        let budget = max_tokens - tokens.len();
+        if budget == 0 {
+            break;
+        }
+        let taken = take_head(encoder, piece, budget, &mut tokens);
+        covered += taken;
+        if taken < piece.len() {
+            break;
+        }
+    }
+    let truncated = covered < text.len();
+    while !text.is_char_boundary(covered) {
+        covered -= 1;
+    }
+    (tokens, text[..covered].chars().count(), truncated)
+}
+
+/// The first position at or after `from` where a piece boundary does not
+/// depend on where splitting started: a whitespace character other than a
+/// line break that follows a non-whitespace one. No pattern alternative
+/// matches across such a position, and none looks behind, so splitting from
+/// there yields exactly the pieces a split of the whole text would.
+fn stable_boundary(text: &str, from: usize) -> Option<usize> {
+    let mut previous: Option<char> = None;
+    for (offset, ch) in text[from..].char_indices() {
+        if let Some(prev) = previous {
+            if !prev.is_whitespace() && ch.is_whitespace() && ch != '\r' && ch != '\n' {
+                return Some(from + offset);
+            }
+        }
+        previous = Some(ch);
+    }
+    None
+}
+
+/// The last `max_tokens` tokens of `text`, the number of characters they
+/// fully cover (counted from the end), and whether anything was left over.
+///
+/// Pretokenization only runs forwards, so a window at the end of the text is
+/// split from its first stable boundary; a split from an arbitrary offset
+/// could regroup the pieces that follow it (digit runs, contractions). The
+/// window doubles until it yields enough tokens, ending in a full split when
+/// the text has no usable boundary. As in `encode_head`, the text is
+/// normalized first and the character count refers to the normalized text.
+fn encode_tail(encoder: &Encoder, text: &str, max_tokens: usize) -> (Vec<u32>, usize, bool) {
+    let normalized = encoder.tokenizer.normalize(text);
+    let text = normalized.as_str();
+    let bpe = &encoder.tokenizer.bpe;
+    let mut window = max_tokens.saturating_mul(8).max(256);
+    loop {
+        let mut start = text.len().saturating_sub(window);
+        while !text.is_char_boundary(start) {
+            start -= 1;
+        }
+        let from = if start == 0 {
+            0
+        } else {
+            match stable_boundary(text, start) {
+                Some(boundary) => boundary,
+                None => {
+                    window = window.saturating_mul(2);
+                    continue;
+                }
+            }
+        };
+        let pieces: Vec<&str> = encoder.tokenizer.split(&text[from..]).collect();
+
+        let mut chunks: Vec<Vec<u32>> = Vec::new();
+        let mut count = 0;
+        let mut covered = 0;
+        for piece in pieces.iter().rev() {
+            if count == max_tokens {
+                break;
+            }
+            let encoded = encoder.encode_piece(piece);
+            let budget = max_tokens - count;
+            if encoded.len() <= budget {
+                covered += piece.len();
+                count += encoded.len();
+                chunks.push(encoded);
+            } else {
+                let kept = encoded[encoded.len() - budget..].to_vec();
+                covered += kept.iter().map(|&token| bpe.token_bytes(token).len()).sum::<usize>();
+                count += kept.len();
+                chunks.push(kept);
+            }
+        }
+
+        if count == max_tokens || from == 0 {
+            let tokens: Vec<u32> = chunks.into_iter().rev().flatten().collect();
+            let truncated = covered < text.len();
+            let mut offset = text.len() - covered;
+            while !text.is_char_boundary(offset) {
+                offset += 1;
+            }
+            return (tokens, text[offset..].chars().count(), truncated);
+        }
+        window = window.saturating_mul(2);
+    }
+}
+
+/// Finds allowed and disallowed special tokens in one Aho-Corasick pass.
+///
+/// Matches are leftmost-longest, so the result does not depend on the order
+/// the tokens were given in. A token that is both allowed and disallowed is
+/// treated as disallowed, matching the order tiktoken checks them in.
+#[pyclass(module = "bpe_openai._bindings", frozen)]
+pub struct SpecialMatcher {
+    automaton: Option<AhoCorasick>,
+    patterns: Vec<String>,
+    /// Token id per pattern; `None` marks a disallowed token.
+    ids: Vec<Option<u32>>,
+}
+
+impl SpecialMatcher {
+    /// Calls `visit(segment, special)` for the text before each allowed
+    /// special token, passing the token's id and text (`None` for the
+    /// trailing segment), until it returns `false`. The scan still runs to the end afterwards, so a
+    /// disallowed token anywhere in `text` is reported as `Err(pattern)`.
+    fn scan<'t>(
+        &self,
+        text: &'t str,
+        mut visit: impl FnMut(&'t str, Option<(u32, &'t str)>) -> bool,
+    ) -> Result<(), usize> {
+        let mut active = true;
+        let mut last = 0;
+        if let Some(automaton) = &self.automaton {
+            for found in automaton.find_iter(text) {
+                let index = found.pattern().as_usize();
+                let Some(id) = self.ids[index] else {
+                    return Err(index);
+                };
+                if active {
+                    let special = &text[found.start()..found.end()];
+                    active = visit(&text[last..found.start()], Some((id, special)));
+                }
+                last = found.end();
+            }
+        }
+        if active {
+            visit(&text[last..], None);
+        }
+        Ok(())
+    }
+
+    fn disallowed(&self, index: usize) -> PyErr {
+        DisallowedSpecialTokenError::new_err(self.patterns[index].clone())
+    }
+}
+
+#[pymethods]
+impl SpecialMatcher {
+    /// The first disallowed special token in `text`, if any.
+    pub fn find_disallowed(&self, py: Python<'_>, text: &str) -> Option<String> {
+        py.allow_threads(|| self.scan(text, |_, _| false))
+            .err()
+            .map(|index| self.patterns[index].clone())
+    }
+
+    /// Splits `text` into `(segment, special)` pairs around the allowed
+    /// special tokens; the last pair has `special` set to `None`.
+    pub fn split(&self, py: Python<'_>, text: &str) -> PyResult<Vec<(String, Option<String>)>> {
+        py.allow_threads(|| {
+            let mut parts = Vec::new();
+            self.scan(text, |segment, special| {
+                parts.push((segment.to_owned(), special.map(|(_, token)| token.to_owned())));
+                true
+            })?;
+            Ok(parts)
+        })
+        .map_err(|index| self.disallowed(index))
+    }
+}
+
+fn undefined_token(token: u32) -> PyErr {
+    PyKeyError::new_err(format!("Token id {token} is not defined for this encoding"))
+}
+
 #[pyclass(module = "bpe_openai._bindings")]
 pub struct PyTokenizer {
     tokenizer: &'static CoreTokenizer,
+    special_tokens: Arc<HashMap<u32, Vec<u8>>>,
+    piece_cache: Option<Arc<PieceCache>>,
+}
+
+impl PyTokenizer {
+    fn new(tokenizer: &'static CoreTokenizer) -> Self {
+        PyTokenizer {
+            tokenizer,
+            special_tokens: Arc::default(),
+            piece_cache: None,
+        }
+    }
+
+    fn encoder(&self) -> Encoder<'_> {
+        Encoder {
+            tokenizer: self.tokenizer,
+            cache: self.piece_cache.as_deref(),
+        }
+    }
+
+    fn token_bytes(&self, token: u32) -> Option<&[u8]> {
+        if let Some(bytes) = self.special_tokens.get(&token) {
+            return Some(bytes);
+        }
+        let bpe = &self.tokenizer.bpe;
+        ((token as usize) < bpe.num_tokens()).then(|| bpe.token_bytes(token))
+    }
+
+    fn decode_into(&self, tokens: &[u32]) -> Result<Vec<u8>, u32> {
+        let mut out = Vec::with_capacity(tokens.len() * 4);
+        for &token in tokens {
+            out.extend_from_slice(self.token_bytes(token).ok_or(token)?);
+        }
+        Ok(out)
+    }
 }
 
 #[pymethods]
 impl PyTokenizer {
-    pub fn encode(&self, text: &str) -> Vec<u32> {
-        self.tokenizer.encode(text)
+    pub fn encode(&self, py: Python<'_>, text: &str) -> Vec<u32> {
+        let encoder = self.encoder();
+        py.allow_threads(|| encoder.encode(text))
     }
 
-    pub fn decode(&self, tokens: Vec<u32>) -> PyResult<String> {
-        self.tokenizer
-            .decode(&tokens)
-            .ok_or_else(|| PyValueError::new_err("Token sequence cannot be decoded as UTF-8"))
+    pub fn encode_till_limit(&self, py: Python<'_>, text: &str, token_limit: usize) -> Option<Vec<u32>> {
+        let encoder = self.encoder();
+        py.allow_threads(|| encode_till_limit(&encoder, text, token_limit))
     }
 
-    pub fn count(&self, text: &str) -> usize {
-        self.tokenizer.count(text)
+    /// Items that exceed `token_limit` come back as `None`. Batches run on
+    /// one thread; the Python side fans slices out over its worker pool.
+    #[pyo3(signature = (texts, token_limit=None))]
+    pub fn encode_batch(
+        &self,
+        py: Python<'_>,
+        texts: Vec<String>,
+        token_limit: Option<usize>,
+    ) -> Vec<Option<Vec<u32>>> {
+        let encoder = self.encoder();
+        py.allow_threads(|| {
+            texts.iter().map(|text| encode_bounded(&encoder, text.as_str(), token_limit)).collect()
+        })
     }
 
-    pub fn count_till_limit(&self, text: &str, token_limit: usize) -> Option<usize> {
-        let normalized = self.tokenizer.normalize(text);
-        self.tokenizer.count_till_limit(&normalized, token_limit)
+    #[pyo3(signature = (text, token_limit=None))]
+    pub fn encode_to_bytes<'py>(
+        &self,
+        py: Python<'py>,
+        text: &str,
+        token_limit: Option<usize>,
+    ) -> PyResult<Option<Bound<'py, PyBytes>>> {
+        let encoder = self.encoder();
+        match py.allow_threads(|| encode_bounded(&encoder, text, token_limit)) {
+            Some(tokens) => native_bytes(py, &tokens, u32::to_ne_bytes).map(Some),
+            None => Ok(None),
+        }
     }
 
-    pub fn pretokenize(&self, text: &str) -> Vec<String> {
-        self.tokenizer
-            .split(text)
-            .map(|piece| piece.to_string())
+    /// Returns `None` if any item exceeds `token_limit`.
+    #[pyo3(signature = (texts, token_limit=None))]
+    pub fn encode_batch_to_bytes<'py>(
+        &self,
+        py: Python<'py>,
+        texts: Vec<String>,
+        token_limit: Option<usize>,
+    ) -> PyResult<Option<(Bound<'py, PyBytes>, Bound<'py, PyBytes>)>> {
+        let encoder = self.encoder();
+        let encoded = py.allow_threads(|| {
+            let batch: Option<Vec<Vec<u32>>> = texts
+                .iter()
+                .map(|text| encode_bounded(&encoder, text.as_str(), token_limit))
+                .collect();
+            batch.map(|batch| {
+                let mut offsets = Vec::with_capacity(batch.len() + 1);
+                offsets.push(0u64);
+                let mut flat = Vec::with_capacity(batch.iter().map(Vec::len).sum());
+                for tokens in batch {
+                    flat.extend_from_slice(&tokens);
+                    offsets.push(flat.len() as u64);
+                }
+                (flat, offsets)
+            })
+        });
+        let Some((flat, offsets)) = encoded else {
+            return Ok(None);
+        };
+        Ok(Some((
+            native_bytes(py, &flat, u32::to_ne_bytes)?,
+            native_bytes(py, &offsets, u64::to_ne_bytes)?,
+        )))
+    }
+
+    pub fn with_special_tokens(&self, special_tokens: HashMap<String, u32>) -> PyTokenizer {
+        let special_tokens = special_tokens
+            .into_iter()
+            .map(|(token, id)| (id, token.into_bytes()))
+            .collect();
+        PyTokenizer {
+            tokenizer: self.tokenizer,
+            special_tokens: Arc::new(special_tokens),
+            piece_cache: self.piece_cache.clone(),
+        }
+    }
+
+    /// A tokenizer sharing this one's vocabulary with its own piece cache of
+    /// up to `capacity` entries; `0` disables caching.
+    pub fn with_piece_cache(&self, capacity: usize) -> PyTokenizer {
+        PyTokenizer {
+            tokenizer: self.tokenizer,
+            special_tokens: self.special_tokens.clone(),
+            piece_cache: (capacity > 0).then(|| Arc::new(PieceCache::new(capacity))),
+        }
+    }
+
+    /// `{"hits", "misses", "entries", "capacity"}`, or `None` without a cache.
+    pub fn piece_cache_stats(&self) -> Option<HashMap<&'static str, u64>> {
+        let cache = self.piece_cache.as_deref()?;
+        Some(HashMap::from([
+            ("hits", cache.hits.load(Ordering::Relaxed)),
+            ("misses", cache.misses.load(Ordering::Relaxed)),
+            ("entries", cache.len() as u64),
+            ("capacity", cache.capacity as u64),
+        ]))
+    }
+
+    /// Builds a matcher for `allowed` and `disallowed` special tokens. Allowed
+    /// tokens this tokenizer does not define are ignored, as in tiktoken.
+    pub fn special_matcher(
+        &self,
+        allowed: Vec<String>,
+        disallowed: Vec<String>,
+    ) -> PyResult<SpecialMatcher> {
+        let by_bytes: HashMap<&[u8], u32> = self
+            .special_tokens
+            .iter()
+            .map(|(&id, bytes)| (bytes.as_slice(), id))
+            .collect();
+        let mut patterns: Vec<String> = Vec::new();
+        let mut ids = Vec::new();
+        for token in disallowed {
+            if !token.is_empty() && !patterns.contains(&token) {
+                patterns.push(token);
+                ids.push(None);
+            }
+        }
+        for token in allowed {
+            if let Some(&id) = by_bytes.get(token.as_bytes()) {
+                if !patterns.contains(&token) {
+                    patterns.push(token);
+                    ids.push(Some(id));
+                }
+            }
+        }
+        let automaton = if patterns.is_empty() {
+            None
+        } else {
+            let automaton = AhoCorasick::builder()
+                .match_kind(MatchKind::LeftmostLongest)
+                .build(&patterns)
+                .map_err(|err| PyValueError::new_err(format!("Invalid special tokens: {err}")))?;
+            Some(automaton)
+        };
+        Ok(SpecialMatcher { automaton, patterns, ids })
+    }
+
+    /// Encodes `text`, turning allowed special tokens into their ids in the
+    /// same pass that looks for disallowed ones. Returns `None` once more than
+    /// `token_limit` tokens are produced.
+    #[pyo3(signature = (text, matcher, token_limit=None))]
+    pub fn encode_with_special(
+        &self,
+        py: Python<'_>,
+        text: &str,
+        matcher: &SpecialMatcher,
+        token_limit: Option<usize>,
+    ) -> PyResult<Option<Vec<u32>>> {
+        let encoder = self.encoder();
+        py.allow_threads(|| {
+            let mut tokens = Vec::new();
+            let mut within = true;
+            matcher.scan(text, |segment, special| {
+                if !segment.is_empty() {
+                    let remaining = token_limit.map(|limit| limit - tokens.len());
+                    match encode_bounded(&encoder, segment, remaining) {
+                        Some(encoded) => tokens.extend(encoded),
+                        None => within = false,
+                    }
+                }
+                if within {
+                    tokens.extend(special.map(|(id, _)| id));
+                    within = token_limit.map_or(true, |limit| tokens.len() <= limit);
+                }
+                within
+            })?;
+            Ok(within.then_some(tokens))
+        })
+        .map_err(|index| matcher.disallowed(index))
+    }
+
+    /// Counts the tokens `encode_with_special` would return, or `None` once
+    /// the count exceeds `token_limit`.
+    #[pyo3(signature = (text, matcher, token_limit=None))]
+    pub fn count_with_special(
+        &self,
+        py: Python<'_>,
+        text: &str,
+        matcher: &SpecialMatcher,
+        token_limit: Option<usize>,
+    ) -> PyResult<Option<usize>> {
+        let encoder = self.encoder();
+        py.allow_threads(|| {
+            let mut total = 0;
+            let mut within = true;
+            matcher.scan(text, |segment, special| {
+                if !segment.is_empty() {
+                    let counted = match token_limit {
+                        Some(limit) => encoder.count_till_limit(segment, limit - total),
+                        None => Some(encoder.count(segment)),
+                    };
+                    match counted {
+                        Some(count) => total += count,
+                        None => within = false,
+                    }
+                }
+                if within {
+                    total += usize::from(special.is_some());
+                    within = token_limit.map_or(true, |limit| total <= limit);
+                }
+                within
+            })?;
+            Ok(within.then_some(total))
+        })
+        .map_err(|index| matcher.disallowed(index))
+    }
+
+    pub fn decode(&self, py: Python<'_>, tokens: Vec<u32>) -> PyResult<String> {
+        let bytes = py
+            .allow_threads(|| self.decode_into(&tokens))
+            .map_err(undefined_token)?;
+        String::from_utf8(bytes)
+            .map_err(|_| PyValueError::new_err("Token sequence cannot be decoded as UTF-8"))
+    }
+
+    pub fn decode_bytes<'py>(&self, py: Python<'py>, tokens: Vec<u32>) -> PyResult<Bound<'py, PyBytes>> {
+        let bytes = py
+            .allow_threads(|| self.decode_into(&tokens))
+            .map_err(undefined_token)?;
+        Ok(PyBytes::new(py, &bytes))
+    }
+
+    pub fn decode_bytes_batch<'py>(
+        &self,
+        py: Python<'py>,
+        batch: Vec<Vec<u32>>,
+    ) -> PyResult<Vec<Bound<'py, PyBytes>>> {
+        let decoded: Vec<_> =
+            py.allow_threads(|| batch.iter().map(|tokens| self.decode_into(tokens)).collect());
+        decoded
+            .into_iter()
+            .map(|bytes| Ok(PyBytes::new(py, &bytes.map_err(undefined_token)?)))
             .collect()
     }
+
+    pub fn decode_tokens_bytes<'py>(
+        &self,
+        py: Python<'py>,
+        tokens: Vec<u32>,
+    ) -> PyResult<Vec<Bound<'py, PyBytes>>> {
+        tokens
+            .into_iter()
+            .map(|token| {
+                let bytes = self.token_bytes(token).ok_or_else(|| undefined_token(token))?;
+                Ok(PyBytes::new(py, bytes))
+            })
+            .collect()
+    }
+
+    pub fn encode_bytes(&self, py: Python<'_>, data: &[u8]) -> Vec<u32> {
+        let bpe = &self.tokenizer.bpe;
+        py.allow_threads(|| bpe.encode_via_backtracking(data))
+    }
+
+    pub fn count(&self, py: Python<'_>, text: &str) -> usize {
+        let encoder = self.encoder();
+        py.allow_threads(|| encoder.count(text))
+    }
+
+    pub fn count_batch(&self, py: Python<'_>, texts: Vec<String>) -> Vec<usize> {
+        let encoder = self.encoder();
+        py.allow_threads(|| texts.iter().map(|text| encoder.count(text.as_str())).collect())
+    }
+
+    pub fn count_till_limit(&self, py: Python<'_>, text: &str, token_limit: usize) -> Option<usize> {
+        let encoder = self.encoder();
+        py.allow_threads(|| encoder.count_till_limit(text, token_limit))
+    }
+
+    /// `text` as the tokenizer sees it (NFC for voyage3), or `None` when
+    /// normalization leaves it unchanged.
+    pub fn normalize(&self, py: Python<'_>, text: &str) -> Option<String> {
+        let tokenizer = self.tokenizer;
+        py.allow_threads(|| {
+            let normalized = tokenizer.normalize(text);
+            (normalized.as_str() != text).then(|| normalized.as_str().to_owned())
+        })
+    }
+
+    pub fn encode_head(&self, py: Python<'_>, text: &str, max_tokens: usize) -> (Vec<u32>, usize, bool) {
+        let encoder = self.encoder();
+        py.allow_threads(|| encode_head(&encoder, text, max_tokens))
+    }
+
+    pub fn encode_tail(&self, py: Python<'_>, text: &str, max_tokens: usize) -> (Vec<u32>, usize, bool) {
+        let encoder = self.encoder();
+        py.allow_threads(|| encode_tail(&encoder, text, max_tokens))
+    }
+
+    /// Normalizes and pretokenizes `text` and encodes each piece, returning
+    /// `(char_len, tokens)` pairs so callers can map tokens back to character
+    /// spans of the normalized text.
+    pub fn encode_pieces(&self, py: Python<'_>, text: &str) -> Vec<(usize, Vec<u32>)> {
+        let encoder = self.encoder();
+        py.allow_threads(|| {
+            let normalized = encoder.tokenizer.normalize(text);
+            encoder
+                .tokenizer
+                .split(normalized.as_str())
+                .map(|piece| (piece.chars().count(), encoder.encode_piece(piece)))
+                .collect()
+        })
+    }
+
+    pub fn pretokenize(&self, py: Python<'_>, text: &str) -> Vec<String> {
+        let tokenizer = self.tokenizer;
+        py.allow_threads(|| {
+            let normalized = tokenizer.normalize(text);
+            tokenizer.split(normalized.as_str()).map(|piece| piece.to_string()).collect()
+        })
+    }
 }
 
 #[pyfunction]
@@ -61,20 +851,50 @@ fn tokenizer_for_model(name: &str) -> PyResult<PyTokenizer> {
     let tokenizer = resolve_tokenizer(&lower)
         .or_else(|| model_alias(&lower).and_then(resolve_tokenizer))
         .ok_or_else(|| PyValueError::new_err(format!("Unsupported model '{name}'")))?;
-    Ok(PyTokenizer { tokenizer })
+    Ok(PyTokenizer::new(tokenizer))
 }
 
 #[pyfunction]
 fn tokenizer_for_encoding(name: &str) -> PyResult<PyTokenizer> {
     let lower = name.to_lowercase();
     resolve_tokenizer(&lower)
-        .map(|tok| PyTokenizer { tokenizer: tok })
+        .map(PyTokenizer::new)
         .ok_or_else(|| PyValueError::new_err(format!("Unsupported encoding '{name}'")))
 }
 
+#[pyfunction]
+fn load_legacy_encoding(py: Python<'_>, name: &str, tokens: Vec<Vec<u8>>) -> PyResult<PyTokenizer> {
+    let lower = name.to_lowercase();
+    if !LEGACY_ENCODINGS.contains(&lower.as_str()) {
+        return Err(PyValueError::new_err(format!("Unsupported legacy encoding '{name}'")));
+    }
+    if let Some(tokenizer) = resolve_tokenizer(&lower) {
+        return Ok(PyTokenizer::new(tokenizer));
+    }
+    // Build outside the registry lock: the GIL is released while the
+    // dictionary is hashed, and a racing builder simply loses the insert.
+    let tokenizer = py
+        .allow_threads(|| {
+            // The dictionary arrives at runtime, so pick a hash factor that keeps
+            // every token hash unique instead of trusting the default of one.
+            let hash_factor = find_hash_factor_for_dictionary(tokens.iter().cloned());
+            let bpe = BytePairEncoding::from_dictionary(tokens, Some(hash_factor));
+            CoreTokenizer::new_lookahead(bpe, LEGACY_PATTERNS, false)
+        })
+        .map_err(|err| PyValueError::new_err(format!("Invalid pretokenizer for '{name}': {err}")))?;
+    let tokenizer = *legacy_tokenizers()
+        .lock()
+        .expect("legacy tokenizer registry poisoned")
+        .entry(lower)
+        .or_insert_with(|| Box::leak(Box::new(tokenizer)));
+    Ok(PyTokenizer::new(tokenizer))
+}
+
 #[pyfunction]
 fn supported_encodings() -> Vec<&'static str> {
-    vec!["cl100k_base", "o200k_base", "voyage3_base"]
+    let mut encodings = vec!["cl100k_base", "o200k_base", "voyage3_base"];
+    encodings.extend_from_slice(LEGACY_ENCODINGS);
+    encodings
 }
 
 #[pyfunction]
@@ -94,10 +914,13 @@ fn supported_models() -> Vec<&'static str> {
 }
 
 #[pymodule]
-fn _bindings(_py: Python<'_>, module: &Bound<'_, PyModule>) -> PyResult<()> {
+fn _bindings(py: Python<'_>, module: &Bound<'_, PyModule>) -> PyResult<()> {
     module.add_class::<PyTokenizer>()?;
+    module.add_class::<SpecialMatcher>()?;
+    module.add("DisallowedSpecialTokenError", py.get_type::<DisallowedSpecialTokenError>())?;
     module.add_function(wrap_pyfunction!(tokenizer_for_model, module)?)?;
     module.add_function(wrap_pyfunction!(tokenizer_for_encoding, module)?)?;
+    module.add_function(wrap_pyfunction!(load_legacy_encoding, module)?)?;
     module.add_function(wrap_pyfunction!(supported_encodings, module)?)?;
     module.add_function(wrap_pyfunction!(supported_models, module)?)?;
     module.add("RUST_BACKEND_VERSION", env!("CARGO_PKG_VERSION"))?;
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
-"""Copy tokenizer data files into the Python package for packaging builds."""
+"""Copy tokenizer data files into the Python package for packaging builds.
+
+Each ``*.tiktoken.gz`` file is also compiled into the binary ``*.tiktoken.bin``
+format that the package memory-maps at runtime.
+"""
 
 from __future__ import annotations
 
 import shutil
+import sys
 from pathlib import Path
 
 
@@ -11,6 +16,10 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 SOURCE_DIR = REPO_ROOT / "vendor" / "rust-gems" / "crates" / "bpe-openai" / "data"
 TARGET_DIR = REPO_ROOT / "python" / "bpe_openai" / "data"
 
+sys.path.insert(0, str(REPO_ROOT / "python"))
+
+from bpe_openai import vocabulary  # noqa: E402
+
 
 def main() -> None:
     if not SOURCE_DIR.is_dir():
@@ -23,6 +32,10 @@ def main() -> None:
 
     for path in SOURCE_DIR.glob("*.tiktoken.gz"):
         shutil.copy2(path, TARGET_DIR / path.name)
+        with open(path, "rb") as handle:
+            ranks = vocabulary.read_tiktoken(handle)
+        stem = path.name[: -len(".tiktoken.gz")]
+        vocabulary.write(ranks, TARGET_DIR / f"{stem}{vocabulary.SUFFIX}")
 
 
 if __name__ == "__main__":